@@ -4,6 +4,7 @@ from typing import List
 
 from app.services.knowledge_graph.kg_search_service import KGSearchService
 from app.services.knowledge_graph.kg_helper_service import KGHelperService
+from app.services.knowledge_graph.kg_token_budget import kg_token_budget
 from app.models.knowledge_graph.agent_response import (
     NoveltyAnalysis,
     MethodologyAnalysis,
@@ -26,19 +27,23 @@ async def novelty_analyzer(draft_text: str, db: AsyncSession):
     It extracts the core claim, searches for related concepts in the knowledge graph,
     and then uses an LLM to score the novelty and provide feedback.
     """
+    # Long drafts are trimmed to the prompt budget (head and tail kept).
+    draft = kg_token_budget.fit("draft", draft_text)
+
     # 1. Understand: Extract the main claim from the draft.
     claim_extraction_prompt = f"""
     Analyze the following research draft and extract the single, most important claim or finding.
     Respond with a JSON object with a single key "response".
     Draft:
     ---
-    {draft_text}
+    {draft}
     ---
     What is the primary claim?
     """
     main_claim_response = await kg_helper_service._generate_structured_content(
         claim_extraction_prompt, 
-        response_model=SingleStringResponse
+        response_model=SingleStringResponse,
+        call_site="novelty_claim"
     )
     main_claim = main_claim_response.response if main_claim_response else ""
     print("main claim")
@@ -52,7 +57,7 @@ async def novelty_analyzer(draft_text: str, db: AsyncSession):
     context_limited = context_from_kg[:3] if len(context_from_kg) > 3 else context_from_kg
 
     # Join them into a single string separated by newlines
-    context_str = "\n".join(context_limited)
+    context_str = kg_token_budget.fit("kg_context", "\n".join(context_limited))
     print(context_str)
 
     # 3. Compare: Use LLM to judge novelty based on the claim and KG context.
@@ -73,7 +78,8 @@ async def novelty_analyzer(draft_text: str, db: AsyncSession):
     """
     novelty_analysis = await kg_helper_service._generate_structured_content(
         judgement_prompt, 
-        response_model=NoveltyAnalysis
+        response_model=NoveltyAnalysis,
+        call_site="novelty_judgement"
     )
     
     if (novelty_analysis) and (novelty_analysis.supporting_claim_text is not None):
@@ -90,18 +96,21 @@ async def methodology_analyzer(draft_text: str, db: AsyncSession) -> Methodology
     Analyzes the alignment between the methodology and claims in a research draft.
     It extracts both components, searches for context, and uses an LLM to assess alignment.
     """
+    draft = kg_token_budget.fit("draft", draft_text)
+
     # 1. Understand: Extract methodology and claim.
     extraction_prompt = f"""
     From the draft below, extract the methodology and the main claim it supports.
     Draft:
     ---
-    {draft_text}
+    {draft}
     ---
     Respond with a JSON object with keys "method_text" and "claim_text".
     """
     extracted_texts = await kg_helper_service._generate_structured_content(
         extraction_prompt, 
-        response_model=MethodClaimResponse
+        response_model=MethodClaimResponse,
+        call_site="methodology_extraction"
     )
     method_text = extracted_texts.method_text if extracted_texts else ""
     claim_text = extracted_texts.claim_text if extracted_texts else ""
@@ -109,7 +118,10 @@ async def methodology_analyzer(draft_text: str, db: AsyncSession) -> Methodology
     # 2. Search: Find related information for both method and claim.
     method_context = await kg_search_service.search_and_explain(method_text, db)
     claim_context = await kg_search_service.search_and_explain(claim_text, db)
-    context_str = "Method Context:\n" + "\n".join(method_context) + "\n\nClaim Context:\n" + "\n".join(claim_context)
+    context_str = (
+        "Method Context:\n" + kg_token_budget.fit("kg_context", "\n".join(method_context))
+        + "\n\nClaim Context:\n" + kg_token_budget.fit("kg_context", "\n".join(claim_context))
+    )
 
     # 3. Compare: Use LLM to judge alignment.
     judgement_prompt = f"""
@@ -128,7 +140,8 @@ async def methodology_analyzer(draft_text: str, db: AsyncSession) -> Methodology
     """
     methodology_analysis = await kg_helper_service._generate_structured_content(
         judgement_prompt, 
-        response_model=MethodologyAnalysis
+        response_model=MethodologyAnalysis,
+        call_site="methodology_judgement"
     )
     output = MethodologyAnalysisOutput(method_text="", claim_text="", status="", feedback="")
     if methodology_analysis:
@@ -151,18 +164,21 @@ async def significance_analyzer(draft_text: str, db: AsyncSession) -> Significan
     Assesses if the research draft clearly articulates its significance or contribution.
     It looks for impact statements, searches for context on the research gap, and provides feedback.
     """
+    draft = kg_token_budget.fit("draft", draft_text)
+
     # 1. Understand: Extract the contribution statement.
     extraction_prompt = f"""
     What is the stated contribution or the significance or the draft below? Identify the text answering: "Why does the research matter?"
     Draft:
     ---
-    {draft_text}
+    {draft}
     ---
     Extract the sentence(s) that describe the significance. Respond with a JSON object with a single key "response".
     """
     contribution_text_response = await kg_helper_service._generate_structured_content(
         extraction_prompt, 
-        response_model=SingleStringResponse
+        response_model=SingleStringResponse,
+        call_site="significance_extraction"
     )
     contribution_text = contribution_text_response.response if contribution_text_response else ""
 
@@ -172,7 +188,7 @@ async def significance_analyzer(draft_text: str, db: AsyncSession) -> Significan
     
     Draft:
     ---
-    {draft_text}
+    {draft}
     ---
     Stated Contribution: "{contribution_text}"
 
@@ -184,7 +200,8 @@ async def significance_analyzer(draft_text: str, db: AsyncSession) -> Significan
     """
     significance_analysis = await kg_helper_service._generate_structured_content(
         judgement_prompt, 
-        response_model=SignificanceAnalysis
+        response_model=SignificanceAnalysis,
+        call_site="significance_judgement"
     )
     if not significance_analysis:
         significance_analysis = SignificanceAnalysis(
@@ -200,18 +217,21 @@ async def contradiction_detector(draft_text: str, db: AsyncSession) -> Contradic
     Detects direct contradictions between claims in the draft and the existing knowledge graph.
     It extracts claims, searches for conflicting information, and reports any discrepancies.
     """
+    draft = kg_token_budget.fit("draft", draft_text)
+
     # 1. Understand: Extract all key claims from the draft.
     extraction_prompt = f"""
     Extract all distinct claims or findings from the research draft below.
     Draft:
     ---
-    {draft_text}
+    {draft}
     ---
     Return a JSON object with a "claims" key containing a list of maximum 5 strings, where each string is a claim.
     """
     claims_response = await kg_helper_service._generate_structured_content(
         extraction_prompt, 
-        response_model=ClaimListResponse
+        response_model=ClaimListResponse,
+        call_site="contradiction_claims"
     )
     claims = claims_response.claims if claims_response else []
 
@@ -225,7 +245,7 @@ async def contradiction_detector(draft_text: str, db: AsyncSession) -> Contradic
         if not context_from_kg or "No matching paragraphs" in context_from_kg[0]:
             continue
             
-        context_str = "\n".join(context_from_kg)
+        context_str = kg_token_budget.fit("kg_context", "\n".join(context_from_kg))
 
         # 3. Compare: Use LLM to identify and format direct contradictions.
         judgement_prompt = f"""
@@ -244,7 +264,8 @@ async def contradiction_detector(draft_text: str, db: AsyncSession) -> Contradic
         # We expect a list of contradictions, as one claim might contradict multiple sources.
         contradictions_response = await kg_helper_service._generate_structured_content(
             judgement_prompt, 
-            response_model=ContradictionAnalysis
+            response_model=ContradictionAnalysis,
+            call_site="contradiction_judgement"
         )
         contradictions_response.draft_finding = claim
 
@@ -1,6 +1,7 @@
 from google.adk.agents import Agent
 from app.models.knowledge_graph.agent_response import SequenceClassificationResponse, SectionsPresent
 from app.services.knowledge_graph.kg_helper_service import KGHelperService
+from app.services.knowledge_graph.kg_token_budget import kg_token_budget
 
 class SectionClassifierAgent(Agent):
     kg_helper_service: KGHelperService
@@ -14,7 +15,9 @@ class SectionClassifierAgent(Agent):
         Analyzes the draft text to classify which sections are present.
         The agent uses an LLM to determine the presence of key research paper sections.
         """
-        
+        # Long drafts keep the start of paragraphs from every part, so no section is cut off.
+        draft_outline = kg_token_budget.fit("draft_outline", draft_text)
+
         # The prompt instructs the LLM to act as a classifier and return a specific JSON structure.
         prompt = f"""
         You are an expert research assistant. Your task is to analyze a research paper draft and identify which standard sections are present.
@@ -27,7 +30,7 @@ class SectionClassifierAgent(Agent):
 
         Draft Text:
         ---
-        {draft_text}
+        {draft_outline}
         ---
         
         Based on your analysis, provide a boolean value for each section's presence. Respond with a JSON object that conforms to the SectionsPresent schema.
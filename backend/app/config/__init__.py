@@ -1,2 +1,3 @@
 from .db_config import *
-from .storage_config import *
\ No newline at end of file
+from .storage_config import *
+from .kg_config import *
\ No newline at end of file
@@ -0,0 +1,100 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Maximum number of Round 3 paragraphs processed concurrently per file.
+# Each in-flight paragraph holds one Gemini call (plus citation parsing), so this
+# bounds the fan-out against the Vertex AI quota.
+KG_ROUND3_CONCURRENCY = int(os.getenv("KG_ROUND3_CONCURRENCY", "8"))
+
+# Batched Round 3: paragraphs of one section are packed into a single extraction
+# call up to this many estimated paragraph tokens (0 = one call per paragraph),
+# and at most KG_ROUND3_BATCH_MAX_PARAGRAPHS paragraphs per call.
+KG_ROUND3_BATCH_TOKENS = int(os.getenv("KG_ROUND3_BATCH_TOKENS", "3000"))
+KG_ROUND3_BATCH_MAX_PARAGRAPHS = int(os.getenv("KG_ROUND3_BATCH_MAX_PARAGRAPHS", "8"))
+
+# Reference-list entries the local parser cannot handle are sent to Gemini in
+# batches of up to this many estimated tokens.
+KG_REFERENCE_BATCH_TOKENS = int(os.getenv("KG_REFERENCE_BATCH_TOKENS", "8000"))
+
+EMBEDDING_MODEL_NAME = "text-embedding-004"
+# Dimension of ps_kg_entity.content_vec; must match the model (and migration 008).
+EMBEDDING_DIMENSIONS = 768
+
+# HNSW candidate list size for vector searches (pgvector hnsw.ef_search, raised to
+# the number of results when lower). Higher values trade latency for recall.
+KG_HNSW_EF_SEARCH = int(os.getenv("KG_HNSW_EF_SEARCH", "100"))
+
+# In-process cache of per-file KG adjacency (NumPy CSR arrays) used by the search
+# traversals: total edges held (0 disables it) and how long a graph is trusted
+# before it is reloaded, which bounds staleness from writers in other processes.
+KG_GRAPH_CACHE_MAX_EDGES = int(os.getenv("KG_GRAPH_CACHE_MAX_EDGES", "5000000"))
+KG_GRAPH_CACHE_TTL_SECONDS = int(os.getenv("KG_GRAPH_CACHE_TTL_SECONDS", "600"))
+
+# Embedding batcher limits. Vertex AI accepts up to 250 texts and 20k tokens per
+# text-embedding-004 request; the token limit is kept below that because token
+# counts are estimated locally.
+EMBEDDING_BATCH_MAX_TEXTS = int(os.getenv("EMBEDDING_BATCH_MAX_TEXTS", "250"))
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "15000"))
+EMBEDDING_BATCH_MAX_LATENCY_MS = int(os.getenv("EMBEDDING_BATCH_MAX_LATENCY_MS", "20"))
+
+# Search query embeddings kept in memory (LRU, 0 disables) and for how long.
+QUERY_EMBEDDING_CACHE_ENTRIES = int(os.getenv("QUERY_EMBEDDING_CACHE_ENTRIES", "1024"))
+QUERY_EMBEDDING_CACHE_TTL_SECONDS = int(os.getenv("QUERY_EMBEDDING_CACHE_TTL_SECONDS", "3600"))
+
+# Process-local LRU in front of the ps_kg_embedding table (float32 vectors, ~3 KB each; 0 disables).
+EMBEDDING_STORE_MEMORY_ENTRIES = int(os.getenv("EMBEDDING_STORE_MEMORY_ENTRIES", "4096"))
+
+# Number of buffered entity + relationship rows that triggers a multi-row INSERT
+# during ingestion.
+KG_BULK_WRITE_BATCH_SIZE = int(os.getenv("KG_BULK_WRITE_BATCH_SIZE", "500"))
+
+# Background ingestion workers: files ingested in parallel by the job queue.
+KG_INGESTION_WORKERS = int(os.getenv("KG_INGESTION_WORKERS", "2"))
+# Paragraph progress is persisted every N completed paragraphs.
+KG_PROGRESS_FLUSH_EVERY = int(os.getenv("KG_PROGRESS_FLUSH_EVERY", "10"))
+# Construction commits a checkpoint after each run of whole sections holding at least
+# this many paragraphs (small sections are grouped so Round 3 keeps enough parallelism).
+KG_CHECKPOINT_MIN_PARAGRAPHS = int(os.getenv("KG_CHECKPOINT_MIN_PARAGRAPHS", "16"))
+
+# Docling conversion worker processes, each holding a warm DocumentConverter.
+KG_CONVERSION_WORKERS = int(os.getenv("KG_CONVERSION_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+# Chunk size for streaming uploaded files from storage into a conversion worker
+# (GCS requires a multiple of 256 KiB).
+KG_DOWNLOAD_CHUNK_BYTES = int(os.getenv("KG_DOWNLOAD_CHUNK_BYTES", str(8 * 1024 * 1024)))
+
+# Referenced-paper resolution: minimum title trigram similarity for two references
+# to be the same paper (a higher bar applies when the first authors differ).
+KG_PAPER_MATCH_THRESHOLD = float(os.getenv("KG_PAPER_MATCH_THRESHOLD", "0.8"))
+KG_PAPER_MATCH_THRESHOLD_AUTHOR_MISMATCH = float(os.getenv("KG_PAPER_MATCH_THRESHOLD_AUTHOR_MISMATCH", "0.95"))
+
+GENERATIVE_MODEL_NAME = "gemini-2.0-flash"
+
+# Prompt token budgets per call site (estimated tokens, 0 = no limit); inputs over
+# budget are trimmed by kg_token_budget: paper front matter for Round 1 metadata,
+# head + tail for Round 2 sections and agent drafts, head for ranked KG context.
+PROMPT_BUDGET_PAPER_METADATA = int(os.getenv("PROMPT_BUDGET_PAPER_METADATA", "4000"))
+PROMPT_BUDGET_SECTION_SUMMARY = int(os.getenv("PROMPT_BUDGET_SECTION_SUMMARY", "2000"))
+PROMPT_BUDGET_DRAFT = int(os.getenv("PROMPT_BUDGET_DRAFT", "8000"))
+PROMPT_BUDGET_KG_CONTEXT = int(os.getenv("PROMPT_BUDGET_KG_CONTEXT", "3000"))
+
+# Client-side Vertex AI admission (see kg_rate_limiter): requests and tokens per
+# minute per quota (0 = unlimited), the ceiling of the adaptive concurrency window,
+# and retries with jittered exponential backoff for 429s and transient errors.
+GENERATIVE_RPM = int(os.getenv("GENERATIVE_RPM", "500"))
+GENERATIVE_TPM = int(os.getenv("GENERATIVE_TPM", "1000000"))
+EMBEDDING_RPM = int(os.getenv("EMBEDDING_RPM", "600"))
+EMBEDDING_TPM = int(os.getenv("EMBEDDING_TPM", "0"))
+VERTEX_MAX_CONCURRENCY = int(os.getenv("VERTEX_MAX_CONCURRENCY", "32"))
+VERTEX_RETRY_ATTEMPTS = int(os.getenv("VERTEX_RETRY_ATTEMPTS", "6"))
+VERTEX_RETRY_BASE_DELAY_MS = int(os.getenv("VERTEX_RETRY_BASE_DELAY_MS", "1000"))
+VERTEX_RETRY_MAX_DELAY_MS = int(os.getenv("VERTEX_RETRY_MAX_DELAY_MS", "60000"))
+
+# Structured-output response cache (in-memory LRU in front of a local SQLite file).
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+LLM_CACHE_SQLITE_PATH = os.getenv("LLM_CACHE_SQLITE_PATH", ".cache/llm_response_cache.sqlite3")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
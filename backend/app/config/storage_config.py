@@ -1,15 +1,25 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from google.cloud import storage
 import os
 from dotenv import load_dotenv
 
 
 load_dotenv()
 
+# Object store for uploaded files: "gcs" (the GCP_BUCKET bucket) or "local" (files
+# under LOCAL_STORAGE_DIR, no cloud bucket needed).
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "gcs").lower()
 BUCKET_NAME = os.getenv("GCP_BUCKET")
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", ".storage")
 
+# On-disk read-through cache in front of GCS, keyed by object generation
+# (0 disables it). Shared by the API process and the conversion workers.
+STORAGE_CACHE_DIR = os.getenv("STORAGE_CACHE_DIR", ".cache/blobs")
+STORAGE_CACHE_MAX_BYTES = int(os.getenv("STORAGE_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
 
-
-# Initialize the GCS client. It handles authentication automatically.
-storage_client = storage.Client()
-bucket = storage_client.bucket(BUCKET_NAME)
\ No newline at end of file
+# Uploads: files sent to storage in parallel per request, and files above
+# UPLOAD_RESUMABLE_THRESHOLD_BYTES go as resumable uploads in UPLOAD_CHUNK_BYTES
+# chunks (GCS requires a multiple of 256 KiB) so a failed chunk is retried alone.
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(8 * 1024 * 1024)))
+UPLOAD_RESUMABLE_THRESHOLD_BYTES = int(os.getenv("UPLOAD_RESUMABLE_THRESHOLD_BYTES", str(8 * 1024 * 1024)))
+# Downloads are streamed to the client in ranged reads of this size.
+DOWNLOAD_CHUNK_BYTES = int(os.getenv("DOWNLOAD_CHUNK_BYTES", str(1024 * 1024)))
@@ -10,6 +10,11 @@ from .routers.agent import agent_controller
 from .routers.pitfall import pitfall_controller
 from .routers.citation import citation_result_controller
 from .routers.significance import significance_analysis_controller
+from .routers.metrics import metrics_controller
+from .services.knowledge_graph.kg_ingestion_job_service import kg_ingestion_job_service
+from .services.knowledge_graph.kg_conversion_service import kg_conversion_service
+from .services.metrics.metrics_service import MetricsMiddleware, instrument_engine
+from .config.db_config import async_engine
 
 
 load_dotenv()
@@ -39,6 +44,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Request latency per route, and the route label for the database statements it runs
+app.add_middleware(MetricsMiddleware)
+instrument_engine(async_engine)
 
 
 url_prefix = "/ps"
@@ -49,6 +57,24 @@ app.include_router(agent_controller.router, prefix=url_prefix)
 app.include_router(pitfall_controller.router, prefix=url_prefix)
 app.include_router(citation_result_controller.router, prefix=url_prefix)
 app.include_router(significance_analysis_controller.router, prefix=url_prefix)
+# Served at the root, where Prometheus scrapes by default
+app.include_router(metrics_controller.router)
+
+
+@app.on_event("startup")
+async def start_kg_ingestion_workers():
+    """
+    Warms the docling conversion processes, then starts the background KG
+    ingestion workers and resumes unfinished jobs.
+    """
+    await kg_conversion_service.start()
+    await kg_ingestion_job_service.start()
+
+
+@app.on_event("shutdown")
+async def stop_kg_ingestion_workers():
+    await kg_ingestion_job_service.stop()
+    kg_conversion_service.shutdown()
 
 
 # A simple root endpoint
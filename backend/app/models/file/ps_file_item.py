@@ -13,6 +13,8 @@ class PSFileItemDB(Base):
     file_url  = Column(Text)
     file_path = Column(Text)
     mime_type  = Column(String(100))
+    content_hash = Column(String(64), index=True)  # SHA-256 hex digest of the uploaded bytes
+    kg_file_guid = Column(UUID(as_uuid=True), index=True)  # file whose KG entities hold this content; set once ingested
     created_date = Column(DateTime(timezone=True), server_default=func.now())
     last_update = Column(DateTime(timezone=True),  server_default=func.now(), onupdate=func.now())
 
@@ -22,10 +24,12 @@ class PSFileItemBase(BaseModel):
     mime_type:str
 
 class PSFileItemCreate(PSFileItemBase):
-    pass
+    content_hash: str | None = None
 
 class PSFileItem(PSFileItemBase):
     guid: uuid.UUID
+    content_hash: str | None = None
+    kg_file_guid: uuid.UUID | None = None
     created_date: datetime
     last_update: datetime
 
@@ -5,4 +5,8 @@ from .paper_segement import *
 from .api_dto import *
 from .agent_response import *
 from .agent_dto import *
-from .citation_search_dto import *
\ No newline at end of file
+from .citation_search_dto import *
+from .ps_kg_ingestion_job import *
+from .ps_kg_embedding import *
+from .ps_kg_paper_index import *
+from .ps_kg_ingestion_checkpoint import *
@@ -7,6 +7,11 @@ class KGSearchQuery(BaseModel):
     session_guid: uuid.UUID
 
 
+class KGReingestRequest(BaseModel):
+    file_guid: uuid.UUID
+    previous_file_guid: uuid.UUID | None = None
+
+
 class CitationDto(BaseModel):
     highlighted_text: str
 
@@ -95,6 +95,15 @@ class ParagraphAnalysis(BaseModel):
     """Analysis of a single paragraph, extracting multiple entities."""
     classified_entities: List[ClassifiedEntity] = Field(description="A list of all entities and relationships found in the paragraph.")
 
+class IndexedParagraphAnalysis(BaseModel):
+    """Entities of one paragraph within a batched Round 3 call."""
+    paragraph_index: int = Field(description="The number from the paragraph's [Paragraph N] header.")
+    classified_entities: List[ClassifiedEntity] = Field(description="A list of all entities and relationships found in this paragraph.")
+
+class ParagraphBatchAnalysis(BaseModel):
+    """Analysis of several paragraphs in one call, keyed by paragraph index."""
+    paragraphs: List[IndexedParagraphAnalysis] = Field(description="One entry per paragraph in the input.")
+
 # --- Round 4 Schema ---
 class ReferenceDetails(BaseModel):
     """Parsed details of a cited reference."""
@@ -110,4 +119,21 @@ class ReferenceDetails(BaseModel):
                 'year': {'description': 'The publication year.'},
             }
         }
-    )
\ No newline at end of file
+    )
+
+class IndexedReferenceDetails(ReferenceDetails):
+    """Details of one reference-list entry within a batched parsing call."""
+    reference_index: int = Field(description="The number from the entry's [Reference N] header.")
+
+class ReferenceDetailsBatch(BaseModel):
+    """Details of several reference-list entries parsed in one call."""
+    references: List[IndexedReferenceDetails] = Field(description="One entry per reference in the input.")
+
+# --- Document Conversion ---
+class ConvertedDocument(BaseModel):
+    """Result of converting an uploaded file (PDFs with docling in a conversion worker)."""
+    markdown: str
+    sections: Optional[SectionChunkList] = None
+    content_hash: Optional[str] = None  # SHA-256 of the downloaded file
+    size_bytes: Optional[int] = None
+    peak_rss_bytes: Optional[int] = None  # conversion worker's peak RSS for this document
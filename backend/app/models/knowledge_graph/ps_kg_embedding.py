@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, DateTime, func
+from pydantic import BaseModel
+from app.config.db_config import Base
+from pgvector.sqlalchemy import Vector
+
+
+class PSKgEmbeddingDB(Base):
+    __tablename__ = "ps_kg_embedding"
+
+    content_hash = Column(String(64), primary_key=True)  # SHA-256 of the whitespace-normalized text
+    model_name = Column(String(100), primary_key=True)  # vectors from different models never mix
+    content_vec = Column(Vector())
+    created_date = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# ===== Pydantic Schemas =====
+
+class PSKgEmbedding(BaseModel):
+    content_hash: str
+    model_name: str
+    content_vec: list[float] | None = None
+
+    class Config:
+        orm_mode = True
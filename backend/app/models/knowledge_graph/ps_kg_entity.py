@@ -6,6 +6,7 @@ from pydantic import BaseModel
 from app.config.db_config import Base
 from sqlalchemy.sql import func
 from pgvector.sqlalchemy import Vector
+from app.config.kg_config import EMBEDDING_DIMENSIONS
 
 
 
@@ -16,8 +17,10 @@ class PSKgEntityDB(Base):
     entity_type = Column(String(100), index=True)
     file_guid = Column(UUID(as_uuid=True), index=True)
     content = Column(Text)
-    content_vec = Column(Vector())  # no dimension specified, supports dynamic embedding sizes
+    content_vec = Column(Vector(EMBEDDING_DIMENSIONS))  # fixed dimension so it can carry HNSW indexes (migration 008)
     name = Column(String(255), index=True)
+    fingerprint = Column(String(64), index=True)  # hash of the source text (Section/Paragraph), used for incremental re-ingestion
+    embedding_hash = Column(String(64), index=True)  # ps_kg_embedding.content_hash the content_vec was taken from
 
 
 # ===== Pydantic Schemas =====
@@ -27,6 +30,8 @@ class PSKgEntityBase(BaseModel):
     file_guid: uuid.UUID | None = None
     content: str | None = None
     name: str | None = None
+    fingerprint: str | None = None
+    embedding_hash: str | None = None
 
 
 class PSKgEntityCreate(PSKgEntityBase):
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, String, Integer, DateTime, func
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+from app.config.db_config import Base
+
+
+class PSKgIngestionCheckpointDB(Base):
+    """
+    Progress of a KG construction that has committed part of its work. Written in the
+    same transaction as the rows it describes and deleted once the file is complete.
+    """
+    __tablename__ = "ps_kg_ingestion_checkpoint"
+
+    file_guid = Column(UUID(as_uuid=True), primary_key=True)
+    content_hash = Column(String(64))  # content the checkpoint was built from; a mismatch discards it
+    paper_guid = Column(UUID(as_uuid=True))  # ResearchPaper entity committed by Round 1
+    rounds_completed = Column(Integer, default=0)
+    sections_completed = Column(Integer, default=0)  # leading sections whose Round 2 + Round 3 rows are committed
+    paragraphs_completed = Column(Integer, default=0)
+    created_date = Column(DateTime(timezone=True), server_default=func.now())
+    last_update = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+# ===== Pydantic Schemas =====
+
+class PSKgIngestionCheckpoint(BaseModel):
+    file_guid: uuid.UUID
+    content_hash: str | None = None
+    paper_guid: uuid.UUID | None = None
+    rounds_completed: int | None = None
+    sections_completed: int | None = None
+    paragraphs_completed: int | None = None
+    last_update: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
@@ -0,0 +1,65 @@
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, JSON, func
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, ConfigDict
+from app.config.db_config import Base
+
+
+class PSKgIngestionJobDB(Base):
+    __tablename__ = "ps_kg_ingestion_job"
+
+    guid = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    status = Column(String(50), nullable=False, default="pending", index=True)  # pending | running | completed | failed
+    created_date = Column(DateTime(timezone=True), server_default=func.now())
+    last_update = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class PSKgIngestionJobFileDB(Base):
+    __tablename__ = "ps_kg_ingestion_job_file"
+
+    guid = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    job_guid = Column(UUID(as_uuid=True), nullable=False, index=True)
+    file_guid = Column(UUID(as_uuid=True), nullable=False, index=True)
+    mode = Column(String(50), nullable=False, default="construct")  # construct | reingest
+    previous_file_guid = Column(UUID(as_uuid=True))  # reingest only: file whose KG the revision replaces
+    status = Column(String(50), nullable=False, default="pending", index=True)  # pending | running | completed | failed
+    current_round = Column(Integer, default=0)
+    paragraphs_done = Column(Integer, default=0)
+    paragraphs_total = Column(Integer, default=0)
+    errors = Column(JSON, default=list)
+    peak_rss_bytes = Column(BigInteger)  # conversion worker's peak RSS while converting this file
+    started_date = Column(DateTime(timezone=True))
+    finished_date = Column(DateTime(timezone=True))
+    created_date = Column(DateTime(timezone=True), server_default=func.now())
+    last_update = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+# ===== Pydantic Schemas =====
+
+class PSKgIngestionJobFile(BaseModel):
+    guid: uuid.UUID
+    file_guid: uuid.UUID
+    mode: str
+    previous_file_guid: uuid.UUID | None = None
+    status: str
+    current_round: int | None = None
+    paragraphs_done: int | None = None
+    paragraphs_total: int | None = None
+    errors: list[str] | None = None
+    peak_rss_bytes: int | None = None
+    started_date: Optional[datetime] = None
+    finished_date: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PSKgIngestionJob(BaseModel):
+    guid: uuid.UUID
+    status: str
+    created_date: datetime
+    last_update: datetime
+    files: list[PSKgIngestionJobFile] = []
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, String, Text, Integer, DateTime, func
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+from pydantic import BaseModel
+from app.config.db_config import Base
+
+
+class PSKgPaperIndexDB(Base):
+    """Entity-resolution index: one row per canonical ResearchPaper entity."""
+    __tablename__ = "ps_kg_paper_index"
+
+    paper_guid = Column(UUID(as_uuid=True), primary_key=True)  # ps_kg_entity.guid of the ResearchPaper
+    file_guid = Column(UUID(as_uuid=True), index=True)  # set when the paper was ingested from an uploaded file
+    norm_title = Column(Text, nullable=False)
+    first_author = Column(String(255))  # normalized surname of the first author
+    year = Column(Integer)
+    author_year_key = Column(String(300), index=True)  # blocking key: "<surname>:<year>"
+    title_key = Column(String(300), index=True)  # blocking key: first significant title words
+    created_date = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# ===== Pydantic Schemas =====
+
+class PSKgPaperIndex(BaseModel):
+    paper_guid: uuid.UUID
+    file_guid: uuid.UUID | None = None
+    norm_title: str
+    first_author: str | None = None
+    year: int | None = None
+    author_year_key: str | None = None
+    title_key: str | None = None
+
+    class Config:
+        orm_mode = True
@@ -1,12 +1,10 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.file.ps_file_item import PSFileItemCreate, PSFileItem
+from app.models.file.ps_file_item import PSFileItem
 from app.config.db_config import get_db
 from app.services.session.session_service import SessionService
-from app.config.storage_config import bucket, BUCKET_NAME
-from app.services.file_upload.file_upload_service import FileUploadService
-from io import BytesIO
+from app.services.file_upload.file_upload_service import FileUploadService, RangeNotSatisfiable, parse_range_header, etag_matches, stream_blob
 
 # 1. Create a router object
 router = APIRouter(
@@ -24,19 +22,8 @@ async def upload_file_to_gcs(
 ):
     """Uploads a file to Google Cloud Storage."""
     try:
-        # Create a Blob object with the desired file name in GCS
-        blob = bucket.blob(file.filename)
-
-        # Upload the file stream directly from the FastAPI UploadFile object
-        # The .file attribute provides the file-like object
-        blob.upload_from_file(file.file, content_type=file.content_type)
-        
-        file_upload = PSFileItemCreate(
-            file_name=file.filename,
-            file_url=f"gs://{BUCKET_NAME}/{file.filename}",
-            mime_type=file.content_type
-        )
-        
+        # Streams to GCS in a worker thread, hashing the content as it goes
+        file_upload = await file_upload_service.upload_file(file)
         return await file_upload_service.create_file_upload_record(db=db, file_upload=file_upload)
     except Exception as e:
         print("error", e)
@@ -50,32 +37,13 @@ async def upload_multiple_files_to_gcs(
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Uploads multiple files to Google Cloud Storage and saves metadata to the database.
-    Returns a list of uploaded file metadata.
+    Uploads multiple files to Google Cloud Storage in parallel and saves their
+    metadata to the database. Returns a list of uploaded file metadata.
     """
-    uploaded_files = []
-
     try:
-        for file in files:
-            # Create a Blob object for each file
-            blob = bucket.blob(file.filename)
-
-            # Upload the file to GCS
-            blob.upload_from_file(file.file, content_type=file.content_type)
-
-            # Create DB record
-            file_upload = PSFileItemCreate(
-                file_name=file.filename,
-                file_url=f"gs://{BUCKET_NAME}/{file.filename}",
-                mime_type=file.content_type
-            )
-
-            uploaded_file = await file_upload_service.create_file_upload_record(
-                db=db, file_upload=file_upload
-            )
-            uploaded_files.append(uploaded_file)
-
-        return uploaded_files
+        # Files upload in parallel off the event loop; all records are saved in one transaction
+        file_uploads = await file_upload_service.upload_files(files)
+        return await file_upload_service.create_file_upload_records(db=db, file_uploads=file_uploads)
 
     except Exception as e:
         print("error", e)
@@ -102,28 +70,66 @@ async def get_all_files(
 @router.get("/{guid}")
 async def get_file_from_gcs(
     guid: str,
+    request: Request,
     db: AsyncSession = Depends(get_db)
 ):
-    """Retrieves a file from Google Cloud Storage."""
+    """
+    Streams a file from storage in chunks. Supports single byte ranges
+    (Range / If-Range) and conditional requests (If-None-Match); the ETag is the
+    file's content hash, so a cached copy is revalidated without contacting storage.
+    """
     try:
         file_record = await file_upload_service.get_file_by_guid(db=db, guid=guid)
         if not file_record:
             raise HTTPException(status_code=404, detail="File not found")
 
-        blob = bucket.blob(file_record.file_name)
-        if not blob.exists():
-            raise HTTPException(status_code=404, detail="File not found in GCS")
-
-        # Download the file to a BytesIO object
-        file_stream = BytesIO()
-        blob.download_to_file(file_stream)
-        file_stream.seek(0)  # Rewind the stream to the beginning
-
+        headers = {
+            "Accept-Ranges": "bytes",
+            "Content-Disposition": f"attachment; filename={file_record.file_name}",
+        }
+        etag = f'"{file_record.content_hash}"' if file_record.content_hash else None
+        if etag:
+            headers["ETag"] = etag
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers=headers)
+
+        # One metadata request for the size (and the pinned generation); the content is
+        # then read in ranged chunks as the client consumes it.
+        blob_info = await file_upload_service.get_blob_info(file_record.file_name)
+        if blob_info is None:
+            raise HTTPException(status_code=404, detail="File not found in storage")
+        if not etag:
+            etag = f'"{blob_info.etag}"'
+            headers["ETag"] = etag
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers=headers)
+
+        size = blob_info.size
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if if_range and not etag_matches(if_range, etag):
+            range_header = None # The client's partial copy is stale; send the whole file
+        try:
+            byte_range = parse_range_header(range_header, size)
+        except RangeNotSatisfiable:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+
+        start, end = byte_range or (0, size - 1)
+        status_code = 206 if byte_range else 200
+        if byte_range:
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(max(0, end - start + 1))
+
+        body = await stream_blob(blob_info, start, end)
         return StreamingResponse(
-            file_stream,
+            body,
+            status_code=status_code,
             media_type=file_record.mime_type,
-            headers={"Content-Disposition": f"attachment; filename={file_record.file_name}"}
+            headers=headers
         )
+    except HTTPException:
+        raise
     except Exception as e:
         print("error", e)
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
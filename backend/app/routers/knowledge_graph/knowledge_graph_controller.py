@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Body
+from fastapi import APIRouter, Depends, Body, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import List
@@ -7,16 +7,16 @@ from app.models.knowledge_graph.api_dto import *
 from app.models.citation.ps_citation_result import PSCitationResultCreate, PSCitationResult
 from app.services.citation.citation_result_service import CitationResultService
 from app.config.db_config import get_db
-from app.services.knowledge_graph.knowledge_graph_service import KGService
 from app.services.knowledge_graph.kg_search_service import KGSearchService
 from app.services.knowledge_graph.kg_citation_search_service import KGCitationSearchService
+from app.services.knowledge_graph.kg_ingestion_job_service import kg_ingestion_job_service
+from app.models.knowledge_graph.ps_kg_ingestion_job import PSKgIngestionJob
 
 router = APIRouter(
     prefix="/kg",
     tags=["KnowledgeGraph"]
 )
 
-kg_service = KGService()
 kg_search_service = KGSearchService()
 kg_citation_search_service = KGCitationSearchService()
 citation_result_service = CitationResultService()
@@ -27,9 +27,65 @@ async def construct_kg(
     file_guids: List[uuid.UUID] = Body(..., embed=True),
     db: AsyncSession = Depends(get_db)
 ):
-    """Endpoint to construct knowledge graph given a list of file guids"""
-    await kg_service.construct_kg_from_files(file_guids, db)
-    return {"message": "Document added to the Postulate knowledge graph."}
+    """
+    Queues knowledge graph construction for a list of file guids.
+    Returns immediately with a job guid; poll /kg/jobs/{job_guid} for per-file progress.
+    """
+    job = await kg_ingestion_job_service.create_job(db, file_guids)
+    return {
+        "message": "Document queued for the Postulate knowledge graph.",
+        "job_guid": job.guid
+    }
+
+
+@router.post("/reingest")
+async def reingest_kg(
+    request: KGReingestRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Queues an incremental re-ingestion of a revised paper.
+
+    - `file_guid`: the file holding the revised content.
+    - `previous_file_guid`: optional; the earlier upload whose knowledge graph is updated
+      and handed over to `file_guid`. Omit it to update the file's own knowledge graph.
+
+    Only changed or new sections and paragraphs are re-extracted; stale entities are retired.
+    """
+    job = await kg_ingestion_job_service.create_job(
+        db, [request.file_guid], mode="reingest", previous_file_guid=request.previous_file_guid
+    )
+    return {
+        "message": "Document queued for re-ingestion.",
+        "job_guid": job.guid
+    }
+
+
+@router.get("/jobs/{job_guid}", response_model=PSKgIngestionJob)
+async def get_construct_job(
+    job_guid: uuid.UUID,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Returns the status of a knowledge graph construction job.
+    Each file reports its current round, paragraphs done/total and any errors.
+    """
+    job = await kg_ingestion_job_service.get_job(db, job_guid)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/jobs/{job_guid}/resume")
+async def resume_construct_job(
+    job_guid: uuid.UUID,
+    db: AsyncSession = Depends(get_db)
+):
+    """Re-queues the failed files of a construction job."""
+    queued = await kg_ingestion_job_service.resume_job(db, job_guid)
+    if queued is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"message": f"{queued} file(s) re-queued.", "job_guid": job_guid}
 
 @router.post("/search")
 async def search_kg(
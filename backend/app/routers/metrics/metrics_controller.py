@@ -0,0 +1,73 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.services.metrics.metrics_service import metrics_registry
+from app.services.knowledge_graph.kg_rate_limiter import generative_rate_limiter, embedding_rate_limiter
+from app.services.knowledge_graph.kg_llm_cache_service import kg_llm_cache_service
+from app.services.knowledge_graph.kg_embedding_store import kg_embedding_store
+from app.services.knowledge_graph.kg_graph_cache import kg_graph_cache
+from app.services.knowledge_graph.kg_query_embedding_cache import kg_query_embedding_cache
+from app.services.storage.storage_backend import storage_backend
+
+router = APIRouter(
+    tags=["Metrics"]
+)
+
+RATE_LIMITERS = (generative_rate_limiter, embedding_rate_limiter)
+
+
+def _limiter_stat(key: str):
+    return lambda: {(limiter.name,): limiter.stats()[key] for limiter in RATE_LIMITERS}
+
+
+# Values the services already count are read at scrape time: running totals as
+# counters, current levels and ratios as gauges.
+metrics_registry.collected_counter("vertex_calls_total", "Vertex AI attempts admitted by the rate limiter.", ("quota",), _limiter_stat("calls"))
+metrics_registry.collected_counter("vertex_rate_limited_total", "Vertex AI attempts rejected with a 429.", ("quota",), _limiter_stat("rate_limited"))
+metrics_registry.collected_counter("vertex_retries_total", "Vertex AI attempts retried after a 429 or transient error.", ("quota",), _limiter_stat("retries"))
+metrics_registry.collected_counter("vertex_failures_total", "Vertex AI calls that failed after retries.", ("quota",), _limiter_stat("failures"))
+metrics_registry.gauge("vertex_concurrency_limit", "Current adaptive concurrency window.", ("quota",), _limiter_stat("concurrency_limit"))
+metrics_registry.gauge("vertex_in_flight", "Vertex AI calls in flight.", ("quota",), _limiter_stat("in_flight"))
+metrics_registry.collected_counter(
+    "llm_cache_hits_total", "LLM response cache hits by tier.", ("tier",),
+    lambda: {(tier,): hits for tier, hits in kg_llm_cache_service.stats()["hits"].items()}
+)
+metrics_registry.collected_counter("llm_cache_misses_total", "LLM response cache misses.", (), lambda: {(): kg_llm_cache_service.misses})
+metrics_registry.collected_counter(
+    "embedding_store_lookups_total", "Embedding store lookups by where the vector came from.", ("source",),
+    lambda: {(source,): value for source, value in kg_embedding_store.stats().items() if source != "hit_rate"}
+)
+metrics_registry.collected_counter(
+    "query_embedding_cache_lookups_total", "Search query embedding lookups by result (expired entries count as misses too).", ("result",),
+    lambda: {(result,): kg_query_embedding_cache.stats()[key] for result, key in (("hit", "hits"), ("miss", "misses"), ("expired", "expired"))}
+)
+metrics_registry.gauge(
+    "query_embedding_cache_hit_rate", "Share of search query embeddings served from the cache.", (),
+    lambda: {(): kg_query_embedding_cache.stats()["hit_rate"]}
+)
+metrics_registry.gauge(
+    "kg_graph_cache_size", "Files, nodes, edges and bytes held by the in-process graph cache.", ("unit",),
+    lambda: {(unit,): value for unit, value in kg_graph_cache.stats().items() if unit in ("files", "nodes", "edges", "bytes")}
+)
+metrics_registry.gauge(
+    "kg_graph_cache_bytes_per_million_edges", "Graph cache memory per million edges.", (),
+    lambda: {(): kg_graph_cache.stats()["bytes_per_million_edges"]}
+)
+metrics_registry.collected_counter(
+    "kg_graph_cache_lookups_total", "Graph cache lookups by result.", ("result",),
+    lambda: {("hit",): kg_graph_cache.hits, ("miss",): kg_graph_cache.misses}
+)
+metrics_registry.collected_counter(
+    "kg_graph_cache_invalidations_total", "Cached file graphs dropped by ingestion commits.", (),
+    lambda: {(): kg_graph_cache.invalidations}
+)
+if hasattr(storage_backend, "stats"):
+    metrics_registry.collected_counter(
+        "storage_cache_lookups_total", "Blob cache lookups by result.", ("result",),
+        lambda: {("hit",): storage_backend.hits, ("miss",): storage_backend.misses}
+    )
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Exposes ingestion, search, LLM, embedding and database metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
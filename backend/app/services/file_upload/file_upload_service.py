@@ -1,10 +1,141 @@
+import os
+import re
+import asyncio
+import hashlib
+from typing import AsyncIterator, BinaryIO, Optional
+from fastapi import UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from app.config.storage_config import (
+    UPLOAD_CONCURRENCY,
+    UPLOAD_CHUNK_BYTES,
+    UPLOAD_RESUMABLE_THRESHOLD_BYTES,
+    DOWNLOAD_CHUNK_BYTES,
+)
 from app.models.file.ps_file_item import PSFileItemCreate, PSFileItemDB
+from app.services.storage.storage_backend import BlobInfo, storage_backend
 
-class FileUploadService:
 
-    # TODO: Create a method to upload a file to google cloud storage and retrieve the file name, file url and mime_type
+class HashingReader:
+    """
+    File-like wrapper that computes a SHA-256 digest of the bytes read through it,
+    so the content hash is produced while the upload streams to storage.
+    Bytes are hashed only the first time their offset is read, which keeps the
+    digest correct when the storage client seeks back to retry a chunk.
+    """
+
+    def __init__(self, file_obj: BinaryIO):
+        self._file = file_obj
+        self._sha256 = hashlib.sha256()
+        self._hashed_upto = 0
+
+    def read(self, size: int = -1) -> bytes:
+        start = self._file.tell()
+        data = self._file.read(size)
+        end = start + len(data)
+        if end > self._hashed_upto:
+            self._sha256.update(data[max(0, self._hashed_upto - start):])
+            self._hashed_upto = end
+        return data
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._file.seek(offset, whence)
+
+    def hexdigest(self) -> str:
+        return self._sha256.hexdigest()
+
+
+def _file_size(file_obj: BinaryIO) -> int:
+    position = file_obj.tell()
+    size = file_obj.seek(0, os.SEEK_END)
+    file_obj.seek(position)
+    return size
+
+
+def _upload_blob(file_obj: BinaryIO, file_name: str, content_type: Optional[str], size: Optional[int]) -> str:
+    """
+    Streams a file to storage and returns its SHA-256. Blocking; run it in a worker
+    thread. Large files are uploaded resumably in UPLOAD_CHUNK_BYTES chunks.
+    """
+    if size is None:
+        size = _file_size(file_obj)
+    chunk_size = UPLOAD_CHUNK_BYTES if size > UPLOAD_RESUMABLE_THRESHOLD_BYTES else None
+    reader = HashingReader(file_obj)
+    storage_backend.upload(reader, file_name, content_type=content_type, size=size, chunk_size=chunk_size)
+    return reader.hexdigest()
+
+
+class RangeNotSatisfiable(Exception):
+    """The Range header has no byte range inside the file."""
+
+
+def parse_range_header(range_header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    Returns the inclusive (start, end) byte range of a single-range "bytes=" header,
+    or None when the whole file should be sent (no header, an unsupported unit, an
+    invalid range, or several ranges, which a server may answer with the full file).
+    Raises RangeNotSatisfiable when the range lies outside the file.
+    """
+    if not range_header:
+        return None
+    match = re.fullmatch(r"\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*", range_header)
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable(range_header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None # Invalid range spec; ignored like an absent header
+    if start >= size:
+        raise RangeNotSatisfiable(range_header)
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match / If-Range header against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in tags
+
+
+async def stream_blob(info: BlobInfo, start: int, end: int, chunk_size: int = DOWNLOAD_CHUNK_BYTES) -> AsyncIterator[bytes]:
+    """
+    Opens a ranged stream over bytes [start, end] of a stored object. The first chunk
+    is read before returning, so a missing object fails here rather than mid-response;
+    the rest is read lazily in worker threads, one chunk at a time.
+    """
+    reader = storage_backend.iter_range(info.name, start, end, info, chunk_size)
+    try:
+        first = await asyncio.to_thread(next, reader, b"") if end >= start else b""
+    except BaseException:
+        reader.close()
+        raise
+
+    async def chunks():
+        try:
+            chunk = first
+            while chunk:
+                yield chunk
+                chunk = await asyncio.to_thread(next, reader, b"")
+        finally:
+            reader.close()
+
+    return chunks()
+
+
+class FileUploadService:
 
     async def get_file_by_guid(self, db: AsyncSession, guid: str) -> PSFileItemDB:
         """
@@ -22,6 +153,86 @@ class FileUploadService:
         )
         return result.scalars().all()
 
+    async def get_ingested_file_by_hash(self, db: AsyncSession, content_hash: str) -> PSFileItemDB | None:
+        """
+        Retrieves a file with the given content hash whose knowledge graph has been built.
+        """
+        result = await db.execute(
+            select(PSFileItemDB)
+            .where(
+                PSFileItemDB.content_hash == content_hash,
+                PSFileItemDB.kg_file_guid.is_not(None)
+            )
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_file_by_hash(self, db: AsyncSession, content_hash: str) -> PSFileItemDB | None:
+        """
+        Retrieves a file with the given content hash, preferring one whose knowledge graph has been built.
+        """
+        result = await db.execute(
+            select(PSFileItemDB)
+            .where(PSFileItemDB.content_hash == content_hash)
+            .order_by(PSFileItemDB.kg_file_guid.is_(None), PSFileItemDB.created_date)
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_file_by_name(self, db: AsyncSession, file_name: str) -> PSFileItemDB | None:
+        """
+        Retrieves the most recent file record stored under the given object name.
+        """
+        result = await db.execute(
+            select(PSFileItemDB)
+            .where(PSFileItemDB.file_name == file_name)
+            .order_by(PSFileItemDB.created_date.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def upload_file(self, file: UploadFile) -> PSFileItemCreate:
+        """
+        Uploads a file to storage off the event loop, hashing it as it streams, and
+        returns the record to save for it.
+        """
+        content_hash = await asyncio.to_thread(
+            _upload_blob, file.file, file.filename, file.content_type, getattr(file, "size", None)
+        )
+        return PSFileItemCreate(
+            file_name=file.filename,
+            file_url=storage_backend.url(file.filename),
+            mime_type=file.content_type,
+            content_hash=content_hash
+        )
+
+    async def upload_path(self, path: str, file_name: str, content_type: Optional[str] = None) -> PSFileItemCreate:
+        """Uploads a local file to storage as `file_name` and returns the record to save for it."""
+        def upload() -> str:
+            with open(path, "rb") as f:
+                return _upload_blob(f, file_name, content_type, None)
+
+        content_hash = await asyncio.to_thread(upload)
+        return PSFileItemCreate(
+            file_name=file_name,
+            file_url=storage_backend.url(file_name),
+            mime_type=content_type or "application/octet-stream",
+            content_hash=content_hash
+        )
+
+    async def upload_files(self, files: list[UploadFile], concurrency: int = UPLOAD_CONCURRENCY) -> list[PSFileItemCreate]:
+        """
+        Uploads several files in parallel, at most `concurrency` at a time.
+        Records are returned in the order of `files`.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def upload(file: UploadFile) -> PSFileItemCreate:
+            async with semaphore:
+                return await self.upload_file(file)
+
+        return list(await asyncio.gather(*(upload(file) for file in files)))
+
     async def create_file_upload_record(self, db: AsyncSession, file_upload: PSFileItemCreate) -> PSFileItemDB:
         """
         Creates a new session in the database.
@@ -31,3 +242,18 @@ class FileUploadService:
         await db.commit()
         await db.refresh(db_session)
         return db_session
+
+    async def create_file_upload_records(self, db: AsyncSession, file_uploads: list[PSFileItemCreate]) -> list[PSFileItemDB]:
+        """
+        Creates the records of several uploaded files in one transaction.
+        """
+        db_items = [PSFileItemDB(**file_upload.dict()) for file_upload in file_uploads]
+        db.add_all(db_items)
+        await db.commit()
+        for db_item in db_items:
+            await db.refresh(db_item)
+        return db_items
+
+    async def get_blob_info(self, file_name: str) -> Optional[BlobInfo]:
+        """Fetches a stored object's metadata (size, etag, generation), or None if it does not exist."""
+        return await asyncio.to_thread(storage_backend.stat, file_name)
@@ -0,0 +1,89 @@
+import uuid
+import asyncio
+from typing import Optional
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.kg_config import KG_BULK_WRITE_BATCH_SIZE
+from app.models.knowledge_graph.ps_kg_entity import PSKgEntityCreate, PSKgEntityDB
+from app.models.knowledge_graph.ps_kg_relationship import PSKgRelationshipCreate, PSKgRelationshipDB
+from app.services.knowledge_graph.kg_graph_cache import kg_graph_cache
+
+
+class KGBulkWriter:
+    """
+    Buffers KG entity and relationship rows for one ingestion and writes them with
+    multi-row INSERTs instead of one flush per entity.
+
+    Guids are generated client-side, so callers can link relationships to an entity
+    immediately, before its row reaches the database. Adding rows never awaits, which
+    keeps the buffer consistent when many Round 3 tasks share one writer; the shared
+    AsyncSession is only touched under `lock`.
+    """
+
+    def __init__(self, db: AsyncSession, batch_size: int = KG_BULK_WRITE_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+        self.lock = asyncio.Lock()
+        self._entities: list[dict] = []
+        self._relationships: list[dict] = []
+        self.entities_written = 0
+        self.relationships_written = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._entities) + len(self._relationships)
+
+    def add_entity(self, entity_type: str, content: str, content_vec: list[float], name: str, file_guid: Optional[uuid.UUID], fingerprint: Optional[str] = None, embedding_hash: Optional[str] = None) -> PSKgEntityDB:
+        """Buffers an entity row and returns a transient PSKgEntityDB carrying its guid."""
+        new_entity = PSKgEntityCreate(
+            entity_type=entity_type,
+            file_guid=file_guid,
+            content=content,
+            content_vec=content_vec,
+            name=name,
+            fingerprint=fingerprint,
+            embedding_hash=embedding_hash
+        )
+        row = {"guid": uuid.uuid4(), **new_entity.dict()}
+        self._entities.append(row)
+        return PSKgEntityDB(**row)
+
+    def add_relationship(self, source_guid: uuid.UUID, target_guid: uuid.UUID, relationship_type: str):
+        """Buffers a relationship row."""
+        new_rel = PSKgRelationshipCreate(
+            source_entity_guid=source_guid,
+            target_entity_guid=target_guid,
+            relationship_type=relationship_type
+        )
+        self._relationships.append({"guid": uuid.uuid4(), **new_rel.dict()})
+
+    async def maybe_flush(self):
+        """Flushes once the buffer has reached batch_size rows."""
+        if self.pending >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        """Writes all buffered rows. Does not commit."""
+        async with self.lock:
+            entities, self._entities = self._entities, []
+            relationships, self._relationships = self._relationships, []
+            # Entities first so the batch reads naturally, although there are no FKs.
+            if entities:
+                # Cached graphs of these files are dropped once the rows commit
+                kg_graph_cache.mark_dirty(self.db, *{row["file_guid"] for row in entities})
+                await self.db.execute(insert(PSKgEntityDB), entities)
+                self.entities_written += len(entities)
+            if relationships:
+                await self.db.execute(insert(PSKgRelationshipDB), relationships)
+                self.relationships_written += len(relationships)
+
+    async def execute(self, statement):
+        """Runs a statement (e.g. a lookup or DELETE) on the shared session under the lock."""
+        async with self.lock:
+            return await self.db.execute(statement)
+
+    async def commit(self):
+        """Flushes the buffer and commits the session."""
+        await self.flush()
+        async with self.lock:
+            await self.db.commit()
@@ -7,10 +7,10 @@ from app.models.knowledge_graph.ps_kg_entity import PSKgEntityDB
 from app.models.knowledge_graph.ps_kg_relationship import PSKgRelationshipDB
 from app.models.knowledge_graph.citation_search_dto import CitationResult, RelatedEntity
 from app.services.knowledge_graph.kg_helper_service import KGHelperService
-from vertexai.language_models import TextEmbeddingModel
-
-EMBEDDING_MODEL_NAME = "text-embedding-004"
-embedding_model = TextEmbeddingModel.from_pretrained(EMBEDDING_MODEL_NAME)
+from app.services.knowledge_graph.kg_query_embedding_cache import kg_query_embedding_cache
+from app.services.knowledge_graph.kg_graph_cache import FileGraph, kg_graph_cache
+from app.services.knowledge_graph.kg_vector_search import PARAGRAPH_TYPES, CLAIM_LIKE_TYPES, entity_type_clause, set_ef_search
+from app.services.metrics.metrics_service import PhaseTimer
 
 class KGCitationSearchService:
     def __init__(self):
@@ -23,8 +23,10 @@ class KGCitationSearchService:
         2. Contextual Graph Traversal (Upward & Downward)
         3. Result Synthesis
         """
+        phases = PhaseTimer("citation")
         # Step 1: Find seed nodes via semantic search
         seed_nodes = await self._find_seed_nodes(query, db, k)
+        phases.mark("seed")
         
         if not seed_nodes:
             return []
@@ -44,25 +46,25 @@ class KGCitationSearchService:
         Finds the top-k most relevant entities of specific types using vector similarity.
         """
         # Generate query embedding
-        embedding_response = await embedding_model.get_embeddings_async([query])
-        query_embedding = embedding_response[0].values
-        
-        # Define target entity types for high-relevance results
-        target_types = ["Paragraph", "Claim", "Methodology", "Key Concept", "Result"]
+        query_embedding = await kg_query_embedding_cache.embed(query)
         
-        # Perform vector similarity search
-        stmt = (
-            select(
-                PSKgEntityDB,
-                PSKgEntityDB.content_vec.cosine_distance(query_embedding).label("distance")
+        # Target entity types for high-relevance results, searched one partial
+        # HNSW index at a time and merged by distance
+        await set_ef_search(db, k=k)
+        rows = []
+        for entity_types in (PARAGRAPH_TYPES, CLAIM_LIKE_TYPES):
+            stmt = (
+                select(
+                    PSKgEntityDB,
+                    PSKgEntityDB.content_vec.cosine_distance(query_embedding).label("distance")
+                )
+                .where(entity_type_clause(entity_types), PSKgEntityDB.content_vec.is_not(None))
+                .order_by("distance")
+                .limit(k)
             )
-            .where(PSKgEntityDB.entity_type.in_(target_types))
-            .order_by("distance")
-            .limit(k)
-        )
-        
-        result = await db.execute(stmt)
-        rows = result.all()
+            result = await db.execute(stmt)
+            rows.extend(result.all())
+        rows = sorted(rows, key=lambda row: row[1])[:k]
         
         # Convert distance to similarity score (1 - distance)
         seed_nodes = [(row[0], 1 - row[1]) for row in rows]
@@ -75,14 +77,19 @@ class KGCitationSearchService:
         and downward to find related entities.
         """
         seed_node, relevance_score = seed_node_tuple
+        phases = PhaseTimer("citation")
+        # Traversals run in the cached graph of the seed's file when there is one
+        graph = None
+        if kg_graph_cache.enabled and seed_node.file_guid:
+            graph = await kg_graph_cache.get_file_graph(db, seed_node.file_guid)
         
         # Step 2.1: Upward Traversal - Find Context Paragraph
-        context_paragraph = await self._find_context_paragraph(seed_node, db)
+        context_paragraph = await self._find_context_paragraph(seed_node, db, graph)
         if not context_paragraph:
             return None
         
         # Step 2.1: Upward Traversal - Find Source Paper
-        paper_entity = await self._find_source_paper(context_paragraph, db)
+        paper_entity = await self._find_source_paper(context_paragraph, db, graph)
         if not paper_entity:
             return None
         
@@ -90,13 +97,15 @@ class KGCitationSearchService:
         paper_metadata = self._parse_paper_metadata(paper_entity.content)
         
         # Step 2.2: Downward Traversal - Find Related Entities
-        related_entities = await self._find_related_entities(context_paragraph, db)
+        related_entities = await self._find_related_entities(context_paragraph, db, graph)
+        phases.mark("traverse")
         
         # Step 2.2 (Additional): Connect Related Entities into Context Summary
         context_summary = await self.helper_service.connect_related_entities(
             paragraph_text=context_paragraph.content,
             related_entities=related_entities
         )
+        phases.mark("synthesize")
         
         # Step 3: Result Synthesis
         return CitationResult(
@@ -109,7 +118,17 @@ class KGCitationSearchService:
             context_summary=context_summary
         )
 
-    async def _find_context_paragraph(self, seed_node: PSKgEntityDB, db: AsyncSession) -> PSKgEntityDB | None:
+    def _graph_parent(self, graph: FileGraph, guid: uuid.UUID, entity_type: str, relationship_type: str | None = None) -> uuid.UUID | None:
+        """Guid of the first parent of `guid` in the file graph with the given entity (and relationship) type."""
+        node = graph.node_id(guid)
+        if node is None:
+            return None
+        for parent, rel_type in graph.parents(node):
+            if graph.entity_type(parent) == entity_type and relationship_type in (None, rel_type):
+                return graph.guid(parent)
+        return None
+
+    async def _find_context_paragraph(self, seed_node: PSKgEntityDB, db: AsyncSession, graph: FileGraph | None = None) -> PSKgEntityDB | None:
         """
         Finds the parent Paragraph entity for a seed node.
         If seed is already a Paragraph, returns it directly.
@@ -117,6 +136,10 @@ class KGCitationSearchService:
         """
         if seed_node.entity_type == "Paragraph":
             return seed_node
+
+        if graph is not None:
+            paragraph_guid = self._graph_parent(graph, seed_node.guid, "Paragraph")
+            return await db.get(PSKgEntityDB, paragraph_guid) if paragraph_guid else None
         
         # Find parent paragraph via reverse relationships
         # The paragraph is the SOURCE of relationships like STATES, USES, PRESENTS, DISCUSSES
@@ -136,10 +159,15 @@ class KGCitationSearchService:
         paragraph = result.scalar_one_or_none()
         return paragraph
 
-    async def _find_source_paper(self, paragraph: PSKgEntityDB, db: AsyncSession) -> PSKgEntityDB | None:
+    async def _find_source_paper(self, paragraph: PSKgEntityDB, db: AsyncSession, graph: FileGraph | None = None) -> PSKgEntityDB | None:
         """
         Traverses upward from Paragraph -> Section -> ResearchPaper
         """
+        if graph is not None:
+            section_guid = self._graph_parent(graph, paragraph.guid, "Section", "CONTAINS_PARAGRAPH")
+            paper_guid = section_guid and self._graph_parent(graph, section_guid, "ResearchPaper", "HAS_SECTION")
+            return await db.get(PSKgEntityDB, paper_guid) if paper_guid else None
+
         # Find parent Section via CONTAINS_PARAGRAPH relationship
         stmt = (
             select(PSKgEntityDB)
@@ -178,11 +206,35 @@ class KGCitationSearchService:
         paper = result.scalar_one_or_none()
         return paper
 
-    async def _find_related_entities(self, paragraph: PSKgEntityDB, db: AsyncSession) -> list[RelatedEntity]:
+    async def _find_related_entities(self, paragraph: PSKgEntityDB, db: AsyncSession, graph: FileGraph | None = None) -> list[RelatedEntity]:
         """
         Traverses 1-level deep from the paragraph to find all connected child entities.
         Collects Citations, Claims, Results, Methodologies, and Key Concepts.
         """
+        related_types = ["Citation", "Claim", "Result", "Methodology", "Key Concept"]
+        if graph is not None:
+            node = graph.node_id(paragraph.guid)
+            children = [
+                (graph.guid(child), rel_type)
+                for child, rel_type in (graph.children(node) if node is not None else [])
+                if graph.entity_type(child) in related_types
+            ]
+            if not children:
+                return []
+            result = await db.execute(
+                select(PSKgEntityDB.guid, PSKgEntityDB.entity_type, PSKgEntityDB.content)
+                .where(PSKgEntityDB.guid.in_([guid for guid, _ in children]))
+            )
+            entities = {row.guid: row for row in result.all()}
+            return [
+                RelatedEntity(
+                    entity_type=entities[guid].entity_type,
+                    content=entities[guid].content,
+                    relationship_type=rel_type
+                )
+                for guid, rel_type in children if guid in entities
+            ]
+
         # Find all entities connected FROM the paragraph (paragraph is source)
         stmt = (
             select(PSKgEntityDB, PSKgRelationshipDB.relationship_type)
@@ -193,11 +245,7 @@ class KGCitationSearchService:
                     PSKgRelationshipDB.target_entity_guid == PSKgEntityDB.guid
                 )
             )
-            .where(
-                PSKgEntityDB.entity_type.in_([
-                    "Citation", "Claim", "Result", "Methodology", "Key Concept"
-                ])
-            )
+            .where(PSKgEntityDB.entity_type.in_(related_types))
         )
         
         result = await db.execute(stmt)
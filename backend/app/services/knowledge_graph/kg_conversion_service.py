@@ -0,0 +1,227 @@
+import io
+import os
+import sys
+import asyncio
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from app.config.kg_config import KG_CONVERSION_WORKERS, KG_DOWNLOAD_CHUNK_BYTES
+from app.models.knowledge_graph.paper_segement import ConvertedDocument, SectionChunk, SectionChunkList
+
+# Set once per worker process by _init_worker; never used in the API process.
+_converter = None
+_storage_backend = None
+
+
+def _init_worker():
+    """Builds the worker's DocumentConverter and storage client and loads the PDF pipeline models up front."""
+    global _converter, _storage_backend
+    from docling.document_converter import DocumentConverter
+    from docling.datamodel.base_models import InputFormat
+    from app.services.storage.storage_backend import build_storage_backend
+
+    _storage_backend = build_storage_backend(cached=False)
+
+    _converter = DocumentConverter()
+    _converter.initialize_pipeline(InputFormat.PDF)
+    print(f"Docling conversion worker {os.getpid()} ready.")
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def get_sections_from_docling(doc) -> Optional[SectionChunkList]:
+    """
+    Extracts section chunks from a DoclingDocument object by iterating its
+    structured elements. This replaces the LLM call for section splitting.
+    """
+    try:
+        sections = []
+        current_title = "Unknown Section" # Default
+        current_texts = []
+
+        # Try to find a first heading to use as the first section title
+        for element in doc.texts:
+            if type(element).__name__ == "SectionHeaderItem":
+                current_title = element.text
+                break
+
+        # If no heading found, guess 'Abstract'
+        if current_title == "Unknown Section" and doc.metadata.get('title'):
+                current_title = "Abstract"
+
+        for element in doc.texts:
+            if type(element).__name__ in ["SectionHeaderItem", "TitleItem"]: # Added "Title" as a good practice
+                # Save the previous section if it has content
+                if current_texts:
+                    sections.append(SectionChunk(
+                        section_title=current_title,
+                        section_text="\n\n".join(current_texts)
+                    ))
+                # Start a new one
+                current_title = element.text
+                current_texts = []
+            else:
+                # Get the text of the element
+                current_texts.append(element.text)
+
+        # Add the last section
+        if current_texts:
+                sections.append(SectionChunk(
+                section_title=current_title,
+                section_text="\n\n".join(current_texts)
+            ))
+
+        if not sections:
+            return None
+
+        return SectionChunkList(sections=sections)
+    except Exception as e:
+        print(f"Error processing docling document for sections: {e}")
+        return None
+
+
+def _reset_peak_rss():
+    """Resets the kernel's peak-RSS counter (VmHWM) so the next reading covers one document."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass  # Not Linux; the reading falls back to the process lifetime peak.
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this worker since the last _reset_peak_rss()."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+    except ImportError:
+        return None
+
+
+def _download_blob(file_name: str) -> io.BytesIO:
+    """
+    Streams a blob from storage into memory in chunks, without an intermediate bytes
+    copy. Reads bypass the on-disk blob cache: each PDF is converted once, and caching
+    it would write the whole document to disk and evict the objects the API serves.
+    """
+    buffer = io.BytesIO()
+    _storage_backend.download_to_file(file_name, buffer, chunk_size=KG_DOWNLOAD_CHUNK_BYTES)
+    buffer.seek(0)
+    return buffer
+
+
+def _convert_stream(name: str, stream: io.BytesIO) -> ConvertedDocument:
+    """Converts an in-memory PDF through docling's stream input; nothing touches the disk."""
+    from docling.datamodel.base_models import DocumentStream
+
+    doc = _converter.convert(DocumentStream(name=name, stream=stream)).document
+    return ConvertedDocument(
+        markdown=doc.export_to_markdown(),
+        sections=get_sections_from_docling(doc)
+    )
+
+
+def _convert_pdf(pdf_bytes: bytes) -> ConvertedDocument:
+    """Runs in a worker process: converts PDF bytes to markdown plus section structure."""
+    _reset_peak_rss()
+    converted = _convert_stream("document.pdf", io.BytesIO(pdf_bytes))
+    converted.size_bytes = len(pdf_bytes)
+    converted.peak_rss_bytes = _peak_rss_bytes()
+    return converted
+
+
+def _convert_blob(file_name: str) -> ConvertedDocument:
+    """
+    Runs in a worker process: downloads a PDF from storage and converts it. The
+    document only ever exists as the worker's download buffer, so the API process
+    never holds a copy and no temp file is written.
+    """
+    _reset_peak_rss()
+    buffer = _download_blob(file_name)
+    with buffer.getbuffer() as view:
+        content_hash = hashlib.sha256(view).hexdigest()
+        size_bytes = view.nbytes
+
+    name = os.path.basename(file_name) or "document.pdf"
+    if not name.lower().endswith(".pdf"):
+        name += ".pdf"  # docling picks the backend from the extension
+    converted = _convert_stream(name, buffer)
+    converted.content_hash = content_hash
+    converted.size_bytes = size_bytes
+    converted.peak_rss_bytes = _peak_rss_bytes()
+    return converted
+
+
+class KGConversionService:
+    """
+    Pool of docling conversion processes.
+
+    Each worker builds one DocumentConverter when it starts and reuses it for every
+    document, so layout/OCR models load once per process instead of once per file.
+    The CPU-heavy conversion runs outside the API process, which keeps the event
+    loop responsive and lets conversion scale across cores.
+    """
+
+    def __init__(self, max_workers: int = KG_CONVERSION_WORKERS):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, not fork: the API process has running threads (gRPC, event loop).
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+        return self._executor
+
+    async def start(self):
+        """Starts every worker so the converter models are warm before the first upload."""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, _ping) for _ in range(self.max_workers)
+        ))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def convert_pdf(self, pdf_bytes: bytes) -> ConvertedDocument:
+        """Converts PDF bytes in a worker process and returns its markdown and sections."""
+        return await self._run(_convert_pdf, pdf_bytes)
+
+    async def convert_blob(self, file_name: str) -> ConvertedDocument:
+        """
+        Downloads and converts a stored PDF inside a worker process. The result also
+        carries the file's SHA-256, its size and the worker's peak RSS for the document.
+        """
+        return await self._run(_convert_blob, file_name)
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a huge PDF); replace the pool for later calls.
+            self.shutdown()
+            raise
+
+
+# Shared so the whole application uses a single pool of warm converters.
+kg_conversion_service = KGConversionService()
@@ -0,0 +1,116 @@
+import time
+import asyncio
+from typing import Optional
+from vertexai.language_models import TextEmbeddingModel
+from app.config.kg_config import (
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_BATCH_MAX_TEXTS,
+    EMBEDDING_BATCH_MAX_TOKENS,
+    EMBEDDING_BATCH_MAX_LATENCY_MS,
+)
+from app.services.knowledge_graph.kg_rate_limiter import embedding_rate_limiter
+from app.services.metrics.metrics_service import embedding_batch_size, embedding_batch_seconds
+
+embedding_model = TextEmbeddingModel.from_pretrained(EMBEDDING_MODEL_NAME)
+
+
+class KGEmbeddingService:
+    """
+    Coalesces single-text embedding requests into multi-text Vertex AI calls.
+
+    Callers await `embed(text)` as if it were a dedicated request. Pending texts are
+    flushed as one `get_embeddings_async` call when the batch reaches the per-request
+    text or token limit, or when the oldest pending text has waited max_latency_ms.
+    Each caller receives its own vector (or the request's exception, once the rate
+    limiter's retries are exhausted).
+    """
+
+    def __init__(
+        self,
+        max_texts: int = EMBEDDING_BATCH_MAX_TEXTS,
+        max_tokens: int = EMBEDDING_BATCH_MAX_TOKENS,
+        max_latency_ms: int = EMBEDDING_BATCH_MAX_LATENCY_MS,
+    ):
+        self.max_texts = max_texts
+        self.max_tokens = max_tokens
+        self.max_latency = max_latency_ms / 1000
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._inflight: set[asyncio.Task] = set()
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        # ~4 characters per token is the usual estimate for English text; the exact
+        # count is not needed since the limit only decides where batches are cut.
+        return len(text) // 4 + 1
+
+    async def embed(self, text: str) -> list[float]:
+        """Returns the embedding vector for a single text, batched with concurrent callers."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        tokens = self._estimate_tokens(text)
+
+        # Close the current batch first if this text would push it over the token limit.
+        if self._pending and self._pending_tokens + tokens > self.max_tokens:
+            self._flush()
+
+        self._pending.append((text, future))
+        self._pending_tokens += tokens
+
+        if len(self._pending) >= self.max_texts or self._pending_tokens >= self.max_tokens:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_latency, self._flush)
+
+        return await future
+
+    async def embed_many(self, texts: list[str]) -> list[list[float]]:
+        """Embeds several texts, sharing batches with any concurrent callers."""
+        return list(await asyncio.gather(*(self.embed(text) for text in texts)))
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+
+        batch = self._pending
+        self._pending = []
+        self._pending_tokens = 0
+
+        task = asyncio.get_running_loop().create_task(self._send(batch))
+        # Keep a reference so the task is not garbage collected mid-flight.
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, batch: list[tuple[str, asyncio.Future]]):
+        texts = [text for text, _ in batch]
+        embedding_batch_size.observe(len(texts))
+        start = time.perf_counter()
+        try:
+            embedding_response = await embedding_rate_limiter.call(
+                lambda: embedding_model.get_embeddings_async(texts),
+                tokens=sum(self._estimate_tokens(text) for text in texts)
+            )
+            if len(embedding_response) != len(batch):
+                raise ValueError(
+                    f"Expected {len(batch)} embeddings from Vertex AI, got {len(embedding_response)}"
+                )
+        except Exception as e:
+            embedding_batch_seconds.observe(time.perf_counter() - start, outcome="error")
+            print(f"Error generating batched embeddings ({len(batch)} texts): {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        embedding_batch_seconds.observe(time.perf_counter() - start, outcome="ok")
+        for (_, future), embedding in zip(batch, embedding_response):
+            if not future.done():
+                future.set_result(embedding.values)
+
+
+# Shared by every service so that concurrent callers land in the same batches.
+kg_embedding_service = KGEmbeddingService()
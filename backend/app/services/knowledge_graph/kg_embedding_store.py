@@ -0,0 +1,193 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from app.config.db_config import AsyncSessionLocal
+from app.config.kg_config import (
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_STORE_MEMORY_ENTRIES,
+    EMBEDDING_BATCH_MAX_TEXTS,
+    EMBEDDING_BATCH_MAX_LATENCY_MS,
+)
+from app.models.knowledge_graph.ps_kg_embedding import PSKgEmbeddingDB
+from app.services.knowledge_graph.kg_embedding_service import kg_embedding_service
+from app.services.knowledge_graph.kg_fingerprint import content_fingerprint
+
+
+class _StoreBatcher:
+    """
+    Collects items submitted by concurrent callers and hands them to `run` together,
+    once max_items are pending or the oldest has waited max_latency_ms, the same way
+    KGEmbeddingService batches texts. `run` returns one result per item, in order.
+    """
+
+    def __init__(self, run: Callable[[list], Awaitable[list]], max_items: int, max_latency_ms: int):
+        self.run = run
+        self.max_items = max_items
+        self.max_latency = max_latency_ms / 1000
+        self._pending: list[tuple[Any, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._inflight: set[asyncio.Task] = set()
+
+    async def submit(self, item) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_latency, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+
+        batch = self._pending
+        self._pending = []
+        task = asyncio.get_running_loop().create_task(self._send(batch))
+        # Keep a reference so the task is not garbage collected mid-flight.
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, batch: list[tuple[Any, asyncio.Future]]):
+        try:
+            results = await self.run([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class KGEmbeddingStore:
+    """
+    Content-addressed embedding store shared by every entity.
+
+    Vectors are keyed by the SHA-256 of the whitespace-normalized text, so a Paragraph
+    and the Claims/Methodologies/Results extracted from it, or the same citation string
+    in two papers, are embedded once. Lookups go memory LRU -> ps_kg_embedding ->
+    Vertex AI, and concurrent requests for the same text share one lookup. Lookups and
+    writes of concurrent requests are batched: one `content_hash IN (...)` query per
+    batch, and one multi-row INSERT per batch of new vectors. The table is written
+    through its own session, outside the ingestion transaction: a stored vector depends
+    only on the text, so it stays valid even if the ingestion rolls back.
+
+    The memory tier holds float32 arrays (3 KB per 768-dimension vector, the precision
+    pgvector stores) rather than lists of Python floats (about 25 KB).
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, memory_entries: int = EMBEDDING_STORE_MEMORY_ENTRIES):
+        self.model_name = model_name
+        self.memory_entries = memory_entries
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._loads = _StoreBatcher(self._load_many, EMBEDDING_BATCH_MAX_TEXTS, EMBEDDING_BATCH_MAX_LATENCY_MS)
+        self._saves = _StoreBatcher(self._save_many, EMBEDDING_BATCH_MAX_TEXTS, EMBEDDING_BATCH_MAX_LATENCY_MS)
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.computed = 0
+
+    async def get_or_embed(self, text: str) -> tuple[list[float], str]:
+        """Returns (vector, content_hash) for the text, computing it only if no stored copy exists."""
+        content_hash = content_fingerprint(text)
+
+        vector = self._memory.get(content_hash)
+        if vector is not None:
+            self._memory.move_to_end(content_hash)
+            self.memory_hits += 1
+            return vector.tolist(), content_hash
+
+        while (inflight := self._inflight.get(content_hash)) is not None:
+            try:
+                return await asyncio.shield(inflight), content_hash
+            except asyncio.CancelledError:
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                # The leading request was cancelled; take over.
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[content_hash] = future
+        try:
+            stored = await self._loads.submit(content_hash)
+            if stored is None:
+                vector = await kg_embedding_service.embed(text)
+                self.computed += 1
+                await self._saves.submit((content_hash, vector))
+            else:
+                vector = stored.tolist()
+                self.store_hits += 1
+            self._remember(content_hash, vector)
+            future.set_result(vector)
+            return vector, content_hash
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved; waiters (if any) still receive it
+            raise
+        finally:
+            self._inflight.pop(content_hash, None)
+            if not future.done():
+                # Cancelled: wake the waiters so one of them repeats the lookup.
+                future.cancel()
+
+    def _remember(self, content_hash: str, vector: list[float]):
+        if self.memory_entries <= 0:
+            return
+        self._memory[content_hash] = np.asarray(vector, dtype=np.float32)
+        self._memory.move_to_end(content_hash)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    async def _load_many(self, content_hashes: list[str]) -> list[Optional[np.ndarray]]:
+        """Stored vectors for a batch of hashes, None where there is none."""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(PSKgEmbeddingDB.content_hash, PSKgEmbeddingDB.content_vec).where(
+                    PSKgEmbeddingDB.content_hash.in_(set(content_hashes)),
+                    PSKgEmbeddingDB.model_name == self.model_name
+                )
+            )
+            stored = {content_hash: vector for content_hash, vector in result.all() if vector is not None}
+        return [
+            np.asarray(stored[content_hash], dtype=np.float32) if content_hash in stored else None
+            for content_hash in content_hashes
+        ]
+
+    async def _save_many(self, rows: list[tuple[str, list[float]]]) -> list[None]:
+        """Writes a batch of new vectors with one INSERT in one transaction."""
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    insert(PSKgEmbeddingDB)
+                    .values([
+                        {"content_hash": content_hash, "model_name": self.model_name, "content_vec": vector}
+                        for content_hash, vector in rows
+                    ])
+                    .on_conflict_do_nothing()
+                )
+                await db.commit()
+        except Exception as e:
+            # The vectors are still usable; they will simply be recomputed next time.
+            print(f"Error saving {len(rows)} embedding(s) to the store: {e}")
+        return [None] * len(rows)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.store_hits + self.computed
+        return {
+            "memory_hits": self.memory_hits,
+            "store_hits": self.store_hits,
+            "computed": self.computed,
+            "hit_rate": ((self.memory_hits + self.store_hits) / lookups) if lookups else 0.0,
+        }
+
+
+# Shared so that coalescing and the memory tier span every concurrent ingestion.
+kg_embedding_store = KGEmbeddingStore()
@@ -0,0 +1,17 @@
+import hashlib
+from typing import Optional
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Collapses all whitespace runs so re-conversions of the same text compare equal."""
+    return " ".join((text or "").split())
+
+
+def content_fingerprint(*parts: Optional[str]) -> str:
+    """
+    SHA-256 of whitespace-normalized text parts. Stable across re-conversions of
+    unchanged content, so it identifies Sections and Paragraphs between ingestions
+    and keys the shared embedding store.
+    """
+    normalized = "\x1f".join(normalize_text(part) for part in parts)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
@@ -0,0 +1,298 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Optional
+import numpy as np
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.kg_config import KG_GRAPH_CACHE_MAX_EDGES, KG_GRAPH_CACHE_TTL_SECONDS
+from app.models.knowledge_graph.ps_kg_entity import PSKgEntityDB
+from app.models.knowledge_graph.ps_kg_relationship import PSKgRelationshipDB
+
+# Session.info key holding the files whose graphs the session's commits invalidate.
+DIRTY_FILES_KEY = "kg_graph_cache_files"
+
+
+class TypeCodes:
+    """Interns entity and relationship type names as small integers shared by every graph."""
+
+    def __init__(self):
+        self._codes: dict[str, int] = {}
+        self._names: list[str] = []
+        self._lock = threading.Lock()
+
+    def code(self, name: Optional[str]) -> int:
+        name = name or ""
+        code = self._codes.get(name)
+        if code is None:
+            with self._lock:
+                code = self._codes.setdefault(name, len(self._names))
+                if code == len(self._names):
+                    self._names.append(name)
+        return code
+
+    def name(self, code: int) -> str:
+        return self._names[code]
+
+
+type_codes = TypeCodes()
+
+
+def _guid_key(guid: uuid.UUID) -> bytes:
+    return guid.bytes
+
+
+def _key_guid(key: bytes) -> uuid.UUID:
+    # numpy strips trailing NUL bytes from "S" values when they are read back.
+    return uuid.UUID(bytes=bytes(key).ljust(16, b"\0"))
+
+
+def _csr(keys: np.ndarray, values: np.ndarray, codes: np.ndarray, node_count: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Groups (key -> value, code) edges by key: offsets[i]:offsets[i + 1] index the values of node i."""
+    order = np.argsort(keys, kind="stable")
+    offsets = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=node_count), out=offsets[1:])
+    return offsets, values[order], codes[order]
+
+
+class FileGraph:
+    """
+    Immutable adjacency of one ingested file: every relationship whose source entity
+    belongs to the file, with its endpoints. Those cover the traversals the searches
+    make (ResearchPaper -> Section -> Paragraph -> Claim/Citation/... -> referenced
+    ResearchPaper), so they need no database access once the graph is loaded.
+
+    Nodes are integer ids, assigned in the sorted order of their 16-byte guids so a
+    guid is found with a binary search instead of a dict of UUID objects. Out- and
+    in-edges are stored CSR-style (offsets + neighbour ids + relationship type codes),
+    and each node carries its entity type code.
+    """
+
+    def __init__(self, file_guid: uuid.UUID, edges: list[tuple]):
+        """edges: (source guid, source type, target guid, target type, relationship type)"""
+        self.file_guid = file_guid
+        self.loaded_at = time.monotonic()
+
+        node_types: dict[bytes, int] = {}
+        for source, source_type, target, target_type, _ in edges:
+            node_types[_guid_key(source)] = type_codes.code(source_type)
+            node_types.setdefault(_guid_key(target), type_codes.code(target_type))
+        keys = sorted(node_types)
+        self.guids = np.array(keys, dtype="S16")
+        self.node_types = np.array([node_types[key] for key in keys], dtype=np.int16)
+
+        edge_count = len(edges)
+        sources = np.empty(edge_count, dtype=np.int32)
+        targets = np.empty(edge_count, dtype=np.int32)
+        rel_codes = np.empty(edge_count, dtype=np.int16)
+        if edge_count:
+            sources[:] = np.searchsorted(self.guids, np.array([_guid_key(e[0]) for e in edges], dtype="S16"))
+            targets[:] = np.searchsorted(self.guids, np.array([_guid_key(e[2]) for e in edges], dtype="S16"))
+            rel_codes[:] = [type_codes.code(e[4]) for e in edges]
+        node_count = len(keys)
+        self.out_offsets, self.out_targets, self.out_types = _csr(sources, targets, rel_codes, node_count)
+        self.in_offsets, self.in_sources, self.in_types = _csr(targets, sources, rel_codes, node_count)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.guids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.out_targets)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (
+            self.guids, self.node_types, self.out_offsets, self.out_targets, self.out_types,
+            self.in_offsets, self.in_sources, self.in_types,
+        ))
+
+    def node_id(self, guid: uuid.UUID) -> Optional[int]:
+        key = _guid_key(guid)
+        i = int(np.searchsorted(self.guids, np.array(key, dtype="S16")))
+        if i < self.node_count and self.guids[i] == key.rstrip(b"\0"):
+            return i
+        return None
+
+    def guid(self, node: int) -> uuid.UUID:
+        return _key_guid(self.guids[node])
+
+    def entity_type(self, node: int) -> str:
+        return type_codes.name(int(self.node_types[node]))
+
+    def children(self, node: int) -> list[tuple[int, str]]:
+        start, end = self.out_offsets[node], self.out_offsets[node + 1]
+        return [(int(t), type_codes.name(int(c))) for t, c in zip(self.out_targets[start:end], self.out_types[start:end])]
+
+    def parents(self, node: int) -> list[tuple[int, str]]:
+        start, end = self.in_offsets[node], self.in_offsets[node + 1]
+        return [(int(s), type_codes.name(int(c))) for s, c in zip(self.in_sources[start:end], self.in_types[start:end])]
+
+    def relationship_type(self, source: uuid.UUID, target: uuid.UUID) -> Optional[str]:
+        source_id, target_id = self.node_id(source), self.node_id(target)
+        if source_id is None or target_id is None:
+            return None
+        for child, rel_type in self.children(source_id):
+            if child == target_id:
+                return rel_type
+        return None
+
+    def _walk(self, start: uuid.UUID, offsets: np.ndarray, neighbours: np.ndarray, max_depth: Optional[int], stop_type: Optional[str]) -> list[list[uuid.UUID]]:
+        """
+        Breadth-first enumeration of cycle-free paths from start. Paths are kept as a
+        tree of (node, parent entry) records, so extending a path does not copy it;
+        full paths are only materialised for the results.
+        """
+        start_id = self.node_id(start)
+        if start_id is None:
+            return []
+        stop_code = type_codes.code(stop_type) if stop_type else None
+        entries: list[tuple[int, int, int]] = [(start_id, -1, 0)]  # (node, parent entry, depth)
+        results = []
+        head = 0
+        while head < len(entries):
+            node, _, depth = entries[head]
+            current = head
+            head += 1
+            if stop_code is not None:
+                if self.node_types[node] == stop_code:
+                    results.append(current)
+                    continue
+            elif depth > 0:
+                results.append(current)
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for neighbour in neighbours[offsets[node]:offsets[node + 1]].tolist():
+                # Cycle check along this path only, like a per-path visited set
+                entry, on_path = current, False
+                while entry != -1:
+                    if entries[entry][0] == neighbour:
+                        on_path = True
+                        break
+                    entry = entries[entry][1]
+                if not on_path:
+                    entries.append((neighbour, current, depth + 1))
+
+        paths = []
+        for entry in results:
+            path = []
+            while entry != -1:
+                path.append(self.guid(entries[entry][0]))
+                entry = entries[entry][1]
+            paths.append(path[::-1])
+        return paths
+
+    def paths_up_to(self, start: uuid.UUID, entity_type: str) -> list[list[uuid.UUID]]:
+        """Every path [start, parent, ...] following incoming edges until an entity of entity_type."""
+        return self._walk(start, self.in_offsets, self.in_sources, None, entity_type)
+
+    def paths_down(self, start: uuid.UUID, max_depth: int) -> list[list[uuid.UUID]]:
+        """Every path [start, child, ...] of 1 to max_depth outgoing edges."""
+        return self._walk(start, self.out_offsets, self.out_targets, max_depth, None)
+
+
+class KGGraphCache:
+    """
+    Process-local cache of FileGraphs, loaded on demand with one query per file.
+
+    Bounded by the total number of edges held (least recently used files are dropped)
+    and by a TTL, which bounds staleness from writers in other processes such as the
+    backfill script. Writes from this process invalidate graphs as they commit: an
+    ingestion session marks its files with `mark_dirty`, and every commit of that
+    session (checkpoints included) drops their cached graphs.
+    """
+
+    def __init__(self, max_edges: int = KG_GRAPH_CACHE_MAX_EDGES, ttl_seconds: int = KG_GRAPH_CACHE_TTL_SECONDS):
+        self.max_edges = max_edges
+        self.ttl_seconds = ttl_seconds
+        self.enabled = max_edges > 0
+        self._graphs: "OrderedDict[uuid.UUID, FileGraph]" = OrderedDict()
+        # Bumped on invalidation, so a load that raced with a commit is not cached.
+        self._versions: dict[uuid.UUID, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def mark_dirty(self, db: AsyncSession, *file_guids: Optional[uuid.UUID]):
+        """Makes every later commit of `db` invalidate the graphs of these files."""
+        db.info.setdefault(DIRTY_FILES_KEY, set()).update(g for g in file_guids if g)
+
+    def invalidate(self, file_guid: uuid.UUID):
+        with self._lock:
+            self._versions[file_guid] = self._versions.get(file_guid, 0) + 1
+            if self._graphs.pop(file_guid, None) is not None:
+                self.invalidations += 1
+
+    def _cached(self, file_guid: uuid.UUID) -> Optional[FileGraph]:
+        with self._lock:
+            graph = self._graphs.get(file_guid)
+            if graph is None:
+                return None
+            if time.monotonic() - graph.loaded_at > self.ttl_seconds:
+                del self._graphs[file_guid]
+                return None
+            self._graphs.move_to_end(file_guid)
+            return graph
+
+    def _store(self, graph: FileGraph, version: int):
+        with self._lock:
+            if self._versions.get(graph.file_guid, 0) != version:
+                return
+            self._graphs[graph.file_guid] = graph
+            self._graphs.move_to_end(graph.file_guid)
+            total = sum(g.edge_count for g in self._graphs.values())
+            while total > self.max_edges and len(self._graphs) > 1:
+                _, evicted = self._graphs.popitem(last=False)
+                total -= evicted.edge_count
+
+    async def get_file_graph(self, db: AsyncSession, file_guid: uuid.UUID) -> FileGraph:
+        graph = self._cached(file_guid)
+        if graph is not None:
+            self.hits += 1
+            return graph
+        self.misses += 1
+        version = self._versions.get(file_guid, 0)
+
+        source, target = aliased(PSKgEntityDB), aliased(PSKgEntityDB)
+        rel = PSKgRelationshipDB
+        result = await db.execute(
+            select(rel.source_entity_guid, source.entity_type, rel.target_entity_guid, target.entity_type, rel.relationship_type)
+            .join(source, source.guid == rel.source_entity_guid)
+            .outerjoin(target, target.guid == rel.target_entity_guid)
+            .where(source.file_guid == file_guid)
+        )
+        graph = FileGraph(file_guid, result.all())
+        if self.enabled:
+            self._store(graph, version)
+        return graph
+
+    def stats(self) -> dict:
+        with self._lock:
+            graphs = list(self._graphs.values())
+        edges = sum(g.edge_count for g in graphs)
+        nbytes = sum(g.nbytes for g in graphs)
+        lookups = self.hits + self.misses
+        return {
+            "files": len(graphs),
+            "nodes": sum(g.node_count for g in graphs),
+            "edges": edges,
+            "bytes": nbytes,
+            "bytes_per_million_edges": int(nbytes / edges * 1_000_000) if edges else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+kg_graph_cache = KGGraphCache()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_files(session: Session):
+    for file_guid in session.info.get(DIRTY_FILES_KEY, ()):
+        kg_graph_cache.invalidate(file_guid)
@@ -1,9 +1,9 @@
 import uuid
+import time
 import asyncio
 import json
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.file_upload.file_upload_service import FileUploadService
-from app.config.storage_config import bucket
 from app.models.knowledge_graph.graph_extraction import KnowledgeGraph, Entity, Relationship 
 from app.models.knowledge_graph.paper_segement import *
 from app.models.knowledge_graph.citation_search_dto import (RelatedEntity, ContextSummary)
@@ -13,12 +13,16 @@ from pypdf import PdfReader
 import io
 from typing import List, Literal, Optional
 from docling_core.types.doc.document import DoclingDocument # CORRECTED IMPORT
-from vertexai.language_models import TextEmbeddingModel
+from app.services.knowledge_graph.kg_embedding_store import kg_embedding_store
+from app.services.knowledge_graph.kg_bulk_writer import KGBulkWriter
+from app.services.knowledge_graph.kg_conversion_service import get_sections_from_docling
+from app.services.knowledge_graph.kg_llm_cache_service import kg_llm_cache_service
+from app.services.knowledge_graph.kg_rate_limiter import generative_rate_limiter
+from app.services.knowledge_graph.kg_token_budget import kg_token_budget
+from app.services.metrics.metrics_service import llm_calls_total, llm_prompt_tokens_total, llm_output_tokens_total, llm_latency_seconds
+from app.config.kg_config import GENERATIVE_MODEL_NAME
 from vertexai.generative_models import GenerativeModel, GenerationConfig
-from pydantic import BaseModel
-
-EMBEDDING_MODEL_NAME = "text-embedding-004" 
-embedding_model = TextEmbeddingModel.from_pretrained(EMBEDDING_MODEL_NAME)
+from pydantic import BaseModel, ValidationError
 
 
 class ContextSummary(BaseModel):
@@ -27,78 +31,78 @@ class ContextSummary(BaseModel):
 
 class KGHelperService:
     def __init__(self):
+        self.model_name = GENERATIVE_MODEL_NAME
         self.generative_model = GenerativeModel(
-            "gemini-2.0-flash" 
+            self.model_name
         )
+        # Usage of uncached calls, as reported by Vertex AI
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
 
     def _get_sections_from_docling(self, doc: DoclingDocument) -> Optional[SectionChunkList]:
         """
-        Extracts section chunks from a DoclingDocument object by iterating its
-        structured elements. This replaces the LLM call for section splitting.
+        Extracts section chunks from a DoclingDocument object.
+        The logic lives in kg_conversion_service so conversion workers can run it
+        without importing the Vertex AI clients.
         """
-        try:
-            sections = []
-            current_title = "Unknown Section" # Default
-            current_texts = []
-
-            # Try to find a first heading to use as the first section title
-            for element in doc.texts:
-                if type(element).__name__ == "SectionHeaderItem":
-                    current_title = element.text
-                    break
-            
-            # If no heading found, guess 'Abstract'
-            if current_title == "Unknown Section" and doc.metadata.get('title'):
-                    current_title = "Abstract" 
-
-            for element in doc.texts:
-                if type(element).__name__ in ["SectionHeaderItem", "TitleItem"]: # Added "Title" as a good practice
-                    # Save the previous section if it has content
-                    if current_texts:
-                        sections.append(SectionChunk(
-                            section_title=current_title,
-                            section_text="\n\n".join(current_texts)
-                        ))
-                    # Start a new one
-                    current_title = element.text
-                    current_texts = []
-                else:
-                    # Get the text of the element
-                    current_texts.append(element.text)
-            
-            # Add the last section
-            if current_texts:
-                    sections.append(SectionChunk(
-                    section_title=current_title,
-                    section_text="\n\n".join(current_texts)
-                ))
+        return get_sections_from_docling(doc)
 
-            if not sections:
-                return None
-                
-            return SectionChunkList(sections=sections)
-        except Exception as e:
-            print(f"Error processing docling document for sections: {e}")
-            return None
 
+    async def _generate_structured_content(self, prompt: str, response_model: BaseModel, call_site: Optional[str] = None):
+        """
+        Calls the LLM with a prompt and a JSON schema, returns a Pydantic object.
+        Responses are cached by model, prompt and schema; a cached response that no
+        longer validates against response_model is dropped and regenerated. Uncached
+        calls go through generative_rate_limiter and are retried on 429s. The prompt
+        size and call metrics are recorded under call_site (default: the response
+        model's name).
+        """
+        call_site = call_site or response_model.__name__
+        estimated_tokens = kg_token_budget.record_prompt(call_site, prompt)
+        cache_key = kg_llm_cache_service.make_key(self.model_name, prompt, response_model)
+        cached_text = await kg_llm_cache_service.get(cache_key)
+        if cached_text is not None:
+            try:
+                result = response_model.model_validate_json(cached_text)
+                llm_calls_total.inc(call_site=call_site, outcome="cached")
+                return result
+            except ValidationError:
+                await kg_llm_cache_service.invalidate(cache_key)
 
-    async def _generate_structured_content(self, prompt: str, response_model: BaseModel):
-        """Calls the LLM with a prompt and a JSON schema, returns a Pydantic object."""
+        start = time.perf_counter()
         try:
-            
-            response = await self.generative_model.generate_content_async(
-                prompt,
-                generation_config=GenerationConfig(
-                    response_mime_type="application/json",
-                    response_schema=response_model.model_json_schema() # Use .model_json_schema() for Vertex
-                )
+            # Admitted through the shared rate limiter, which retries 429s and transient errors
+            response = await generative_rate_limiter.call(
+                lambda: self.generative_model.generate_content_async(
+                    prompt,
+                    generation_config=GenerationConfig(
+                        response_mime_type="application/json",
+                        response_schema=response_model.model_json_schema() # Use .model_json_schema() for Vertex
+                    )
+                ),
+                tokens=estimated_tokens
             )
             # print("structured content response", response) # Optional: for debugging
+            self.llm_calls += 1
+            llm_latency_seconds.observe(time.perf_counter() - start, call_site=call_site)
+            usage = getattr(response, "usage_metadata", None)
+            if usage:
+                self.prompt_tokens += usage.prompt_token_count or 0
+                self.output_tokens += usage.candidates_token_count or 0
+                generative_rate_limiter.record_usage(estimated_tokens, usage.prompt_token_count or 0)
+                llm_prompt_tokens_total.inc(usage.prompt_token_count or 0, call_site=call_site)
+                llm_output_tokens_total.inc(usage.candidates_token_count or 0, call_site=call_site)
             response_text = response.text.strip().replace("```json", "").replace("```", "")
             print("response text")
             print(response_text)
-            return response_model.model_validate_json(response_text)
+            result = response_model.model_validate_json(response_text)
+            # Only responses that validated are cached
+            await kg_llm_cache_service.set(cache_key, response_text)
+            llm_calls_total.inc(call_site=call_site, outcome="ok")
+            return result
         except Exception as e:
+            llm_calls_total.inc(call_site=call_site, outcome="error")
             print(f"Error generating structured content: {e}")
             # print(f"Prompt: {prompt[:200]}...") # Optional: for debugging
             return None
@@ -135,25 +139,32 @@ class KGHelperService:
             ]
             return SectionChunkList(sections=section_chunk_list)
     
-    async def _create_entity(self, db: AsyncSession, entity_type: str, content: str, name: str, file_guid: Optional[uuid.UUID]) -> PSKgEntityDB:
-        """Creates an embedding and saves a new entity to the DB."""
+    async def _create_entity(self, db: AsyncSession, entity_type: str, content: str, name: str, file_guid: Optional[uuid.UUID], writer: Optional[KGBulkWriter] = None, fingerprint: Optional[str] = None) -> PSKgEntityDB:
+        """
+        Creates an embedding and saves a new entity to the DB.
+        The vector comes from the shared embedding store, so text that was embedded
+        before (e.g. a Paragraph and the Claims taken from it) is not sent to Vertex AI
+        again; the entity records the store key in embedding_hash. With a writer, the
+        row is buffered for a bulk INSERT and the guid is assigned client-side; without
+        one, the entity is flushed immediately.
+        """
         try:
-            # 💡 FIX: Removed the 'task_type' argument
-            embedding_response = await embedding_model.get_embeddings_async(
-                [content]
-            )
-            
-            # Vertex AI returns a list of embedding objects (one for each item in the input list)
-            # We need the vector from the first (and only) item.
-            embedding = embedding_response[0].values
+            # Stored vectors are reused; misses are batched into one Vertex AI request
+            embedding, embedding_hash = await kg_embedding_store.get_or_embed(content)
+
+            if writer:
+                db_entity = writer.add_entity(entity_type, content, embedding, name, file_guid, fingerprint, embedding_hash)
+                await writer.maybe_flush()
+                return db_entity
             
-            # ... (rest of the code is unchanged) ...
             new_entity = PSKgEntityCreate(
                 entity_type=entity_type,
                 file_guid=file_guid,
                 content=content,
                 content_vec=embedding,
-                name=name
+                name=name,
+                fingerprint=fingerprint,
+                embedding_hash=embedding_hash
             )
             db_entity = PSKgEntityDB(**new_entity.dict())
             db.add(db_entity)
@@ -165,8 +176,13 @@ class KGHelperService:
             # Handle error or raise it
             return None
 
-    async def _create_relationship(self, db: AsyncSession, source_guid: uuid.UUID, target_guid: uuid.UUID, relationship_type: str):
-        """Saves a new relationship to the DB."""
+    async def _create_relationship(self, db: AsyncSession, source_guid: uuid.UUID, target_guid: uuid.UUID, relationship_type: str, writer: Optional[KGBulkWriter] = None):
+        """Saves a new relationship to the DB (buffered when a writer is given)."""
+        if writer:
+            writer.add_relationship(source_guid, target_guid, relationship_type)
+            await writer.maybe_flush()
+            return
+
         new_rel = PSKgRelationshipCreate(
             source_entity_guid=source_guid,
             target_entity_guid=target_guid,
@@ -0,0 +1,236 @@
+import uuid
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.db_config import AsyncSessionLocal
+from app.config.kg_config import KG_INGESTION_WORKERS
+from app.models.knowledge_graph.ps_kg_ingestion_job import (
+    PSKgIngestionJobDB,
+    PSKgIngestionJobFileDB,
+    PSKgIngestionJob,
+    PSKgIngestionJobFile,
+)
+from app.services.knowledge_graph.knowledge_graph_service import KGService
+from app.services.knowledge_graph.kg_ingestion_progress import KGJobFileProgress
+
+
+class KGIngestionJobService:
+    """
+    Persistent job queue for KG construction.
+
+    Jobs and their per-file rows live in Postgres; an in-process asyncio queue feeds
+    job file guids to a pool of workers, each of which ingests one file at a time
+    with its own database sessions. On startup, files left pending or running by a
+    previous process are queued again, so a single API process is expected to own
+    the queue.
+    """
+
+    def __init__(self, num_workers: int = KG_INGESTION_WORKERS):
+        self.num_workers = num_workers
+        self.kg_service = KGService()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+
+    async def start(self):
+        """Starts the worker pool and re-queues unfinished files from previous runs."""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.num_workers)
+        ]
+        async with AsyncSessionLocal() as db:
+            resumed = await self._requeue_unfinished(db)
+        if resumed:
+            print(f"Resumed {resumed} unfinished KG ingestion file(s).")
+
+    async def stop(self):
+        """Cancels the workers. Files in flight stay 'running' and are resumed on next start."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def create_job(self, db: AsyncSession, file_guids: list[uuid.UUID], mode: str = "construct", previous_file_guid: Optional[uuid.UUID] = None) -> PSKgIngestionJobDB:
+        """
+        Persists a new job with one row per file and queues the files.
+        mode is "construct" for new files or "reingest" for incremental updates.
+        """
+        job = PSKgIngestionJobDB(guid=uuid.uuid4(), status="pending")
+        job_files = [
+            PSKgIngestionJobFileDB(
+                guid=uuid.uuid4(),
+                job_guid=job.guid,
+                file_guid=file_guid,
+                mode=mode,
+                previous_file_guid=previous_file_guid,
+                status="pending",
+                errors=[]
+            )
+            for file_guid in file_guids
+        ]
+        db.add(job)
+        db.add_all(job_files)
+        await db.commit()
+        await db.refresh(job)
+
+        for job_file in job_files:
+            self._enqueue(job_file.guid)
+        return job
+
+    async def get_job(self, db: AsyncSession, job_guid: uuid.UUID) -> Optional[PSKgIngestionJob]:
+        """Returns the job with per-file progress, or None if it does not exist."""
+        job = await db.get(PSKgIngestionJobDB, job_guid)
+        if not job:
+            return None
+        result = await db.execute(
+            select(PSKgIngestionJobFileDB)
+            .where(PSKgIngestionJobFileDB.job_guid == job_guid)
+            .order_by(PSKgIngestionJobFileDB.created_date)
+        )
+        files = [PSKgIngestionJobFile.model_validate(f) for f in result.scalars().all()]
+        return PSKgIngestionJob(
+            guid=job.guid,
+            status=job.status,
+            created_date=job.created_date,
+            last_update=job.last_update,
+            files=files
+        )
+
+    async def resume_job(self, db: AsyncSession, job_guid: uuid.UUID) -> Optional[int]:
+        """
+        Queues the failed files of the job again. Returns the number queued, or None if
+        the job does not exist. Pending files are already queued and running ones are
+        in flight, so neither is queued a second time; files a previous process left
+        pending or running are queued by start().
+        """
+        job = await db.get(PSKgIngestionJobDB, job_guid)
+        if not job:
+            return None
+        # Flipping failed -> pending in one statement means concurrent resumes of the
+        # same job cannot both queue a file.
+        result = await db.execute(
+            update(PSKgIngestionJobFileDB)
+            .where(
+                PSKgIngestionJobFileDB.job_guid == job_guid,
+                PSKgIngestionJobFileDB.status == "failed"
+            )
+            .values(status="pending")
+            .returning(PSKgIngestionJobFileDB.guid)
+        )
+        job_file_guids = result.scalars().all()
+        if job_file_guids:
+            job.status = "pending"
+        await db.commit()
+
+        for job_file_guid in job_file_guids:
+            self._enqueue(job_file_guid)
+        return len(job_file_guids)
+
+    def _enqueue(self, job_file_guid: uuid.UUID):
+        if self._queue is None:
+            raise RuntimeError("KG ingestion workers are not running. Call start() on application startup.")
+        self._queue.put_nowait(job_file_guid)
+
+    async def _requeue_unfinished(self, db: AsyncSession) -> int:
+        # Nothing runs before the workers start: 'running' rows were orphaned by a
+        # previous process and go back to 'pending' so the workers can claim them.
+        await db.execute(
+            update(PSKgIngestionJobFileDB)
+            .where(PSKgIngestionJobFileDB.status == "running")
+            .values(status="pending")
+        )
+        await db.commit()
+        result = await db.execute(
+            select(PSKgIngestionJobFileDB.guid)
+            .where(PSKgIngestionJobFileDB.status == "pending")
+            .order_by(PSKgIngestionJobFileDB.created_date)
+        )
+        job_file_guids = result.scalars().all()
+        for job_file_guid in job_file_guids:
+            self._enqueue(job_file_guid)
+        return len(job_file_guids)
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job_file_guid = await self._queue.get()
+            try:
+                await self._run_job_file(job_file_guid)
+            except Exception as e:
+                print(f"KG ingestion worker {worker_id} failed on job file {job_file_guid}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _claim(self, db: AsyncSession, job_file_guid: uuid.UUID) -> bool:
+        """
+        Atomically moves the job file from pending/failed to running. Returns False if
+        it is completed or already claimed, e.g. when its guid was queued twice.
+        """
+        result = await db.execute(
+            update(PSKgIngestionJobFileDB)
+            .where(
+                PSKgIngestionJobFileDB.guid == job_file_guid,
+                PSKgIngestionJobFileDB.status.in_(["pending", "failed"])
+            )
+            .values(
+                status="running",
+                current_round=0,
+                paragraphs_done=0,
+                paragraphs_total=0,
+                peak_rss_bytes=None,
+                started_date=datetime.now(timezone.utc),
+                finished_date=None
+            )
+            .returning(PSKgIngestionJobFileDB.guid)
+        )
+        claimed = result.scalar_one_or_none() is not None
+        await db.commit()
+        return claimed
+
+    async def _run_job_file(self, job_file_guid: uuid.UUID):
+        # progress_db carries the job rows; db carries the ingestion transaction.
+        async with AsyncSessionLocal() as progress_db, AsyncSessionLocal() as db:
+            if not await self._claim(progress_db, job_file_guid):
+                return
+
+            job_file = await progress_db.get(PSKgIngestionJobFileDB, job_file_guid)
+            job = await progress_db.get(PSKgIngestionJobDB, job_file.job_guid)
+            job.status = "running"
+            await progress_db.commit()
+
+            progress = KGJobFileProgress(progress_db, job_file)
+            try:
+                if job_file.mode == "reingest":
+                    succeeded = await self.kg_service.reingest_file(job_file.file_guid, db, job_file.previous_file_guid, progress)
+                else:
+                    succeeded = await self.kg_service.construct_kg_for_file(job_file.file_guid, db, progress)
+            except Exception as e:
+                print(f"Error constructing KG for file {job_file.file_guid}: {e}")
+                await db.rollback()
+                await progress.add_error(str(e))
+                succeeded = False
+
+            job_file.status = "completed" if succeeded else "failed"
+            job_file.finished_date = datetime.now(timezone.utc)
+            await progress_db.commit()
+            await self._update_job_status(progress_db, job_file.job_guid)
+
+    async def _update_job_status(self, db: AsyncSession, job_guid: uuid.UUID):
+        """Marks the job finished once none of its files are pending or running."""
+        result = await db.execute(
+            select(PSKgIngestionJobFileDB.status, func.count())
+            .where(PSKgIngestionJobFileDB.job_guid == job_guid)
+            .group_by(PSKgIngestionJobFileDB.status)
+        )
+        counts = dict(result.all())
+        if counts.get("pending") or counts.get("running"):
+            return
+        job = await db.get(PSKgIngestionJobDB, job_guid)
+        job.status = "failed" if counts.get("failed") else "completed"
+        await db.commit()
+
+
+# Shared by the router and the application lifecycle hooks in main.py.
+kg_ingestion_job_service = KGIngestionJobService()
@@ -0,0 +1,77 @@
+import asyncio
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.kg_config import KG_PROGRESS_FLUSH_EVERY
+from app.models.knowledge_graph.ps_kg_ingestion_job import PSKgIngestionJobFileDB
+
+MAX_RECORDED_ERRORS = 50
+
+
+class KGIngestionProgress:
+    """
+    Progress sink for KGService.process_file_content.
+    This base class discards everything; it is used when no job tracks the file.
+    """
+
+    async def start_round(self, round_number: int):
+        pass
+
+    async def set_paragraphs_total(self, total: int, done: int = 0):
+        pass
+
+    async def paragraph_done(self):
+        pass
+
+    async def add_error(self, message: str):
+        pass
+
+    async def set_peak_rss(self, peak_rss_bytes: Optional[int]):
+        pass
+
+
+class KGJobFileProgress(KGIngestionProgress):
+    """
+    Persists progress onto a PSKgIngestionJobFileDB row.
+
+    Uses its own session, separate from the ingestion session, so progress is
+    visible to the status API while the ingestion transaction is still open.
+    Paragraph counts are committed every `flush_every` paragraphs.
+    """
+
+    def __init__(self, db: AsyncSession, job_file: PSKgIngestionJobFileDB, flush_every: int = KG_PROGRESS_FLUSH_EVERY):
+        self.db = db
+        self.job_file = job_file
+        self.flush_every = flush_every
+        self._unflushed = 0
+        self._lock = asyncio.Lock()
+
+    async def start_round(self, round_number: int):
+        self.job_file.current_round = round_number
+        await self.flush()
+
+    async def set_paragraphs_total(self, total: int, done: int = 0):
+        self.job_file.paragraphs_total = total
+        self.job_file.paragraphs_done = done
+        await self.flush()
+
+    async def paragraph_done(self):
+        self.job_file.paragraphs_done = (self.job_file.paragraphs_done or 0) + 1
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            await self.flush()
+
+    async def add_error(self, message: str):
+        # Reassign rather than append so SQLAlchemy sees the JSON column change.
+        errors = list(self.job_file.errors or [])
+        errors.append(message)
+        self.job_file.errors = errors[-MAX_RECORDED_ERRORS:]
+        await self.flush()
+
+    async def set_peak_rss(self, peak_rss_bytes: Optional[int]):
+        self.job_file.peak_rss_bytes = peak_rss_bytes
+        await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            self._unflushed = 0
+            await self.db.commit()
@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+from pydantic import BaseModel
+from app.config.kg_config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MEMORY_ENTRIES,
+    LLM_CACHE_SQLITE_PATH,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_TTL_SECONDS,
+)
+
+
+class LLMCacheBackend(ABC):
+    """
+    Interface for one cache tier. Values are raw LLM response texts; each entry keeps
+    the time it was first cached, so a value promoted between tiers keeps its expiry.
+    """
+
+    @abstractmethod
+    async def get_entry(self, key: str) -> Optional[tuple[str, float]]:
+        """(value, created_at) of a live entry, or None."""
+        ...
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = await self.get_entry(key)
+        return entry[0] if entry else None
+
+    @abstractmethod
+    async def set(self, key: str, value: str, created_at: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+
+class InMemoryLRUCache(LLMCacheBackend):
+    """Process-local LRU tier with a TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    async def get_entry(self, key: str) -> Optional[tuple[str, float]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        created_at, value = entry
+        if time.time() - created_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value, created_at
+
+    async def set(self, key: str, value: str, created_at: Optional[float] = None):
+        self._entries[key] = (time.time() if created_at is None else created_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+
+class SQLiteLLMCache(LLMCacheBackend):
+    """
+    Persistent tier in a local SQLite file, so cached responses survive restarts.
+    Entries expire after ttl_seconds; once the table exceeds max_entries the least
+    recently used entries are evicted. Queries run in a worker thread.
+    """
+
+    EVICT_EVERY = 100  # writes between size checks
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._writes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_response_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_llm_response_cache_last_access ON llm_response_cache (last_access)"
+        )
+        self._conn.commit()
+
+    def _get(self, key: str) -> Optional[tuple[str, float]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_response_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_response_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return value, created_at
+
+    def _set(self, key: str, value: str, created_at: Optional[float] = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_response_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now if created_at is None else created_at, now)
+            )
+            self._writes += 1
+            if self._writes % self.EVICT_EVERY == 0:
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM llm_response_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM llm_response_cache WHERE key IN ("
+            " SELECT key FROM llm_response_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def _delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_response_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    async def get_entry(self, key: str) -> Optional[tuple[str, float]]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str, created_at: Optional[float] = None):
+        await asyncio.to_thread(self._set, key, value, created_at)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self._delete, key)
+
+
+class KGLLMCacheService:
+    """
+    Tiered cache for structured LLM responses, keyed on model name, prompt and
+    response schema. Lookups go through the tiers in order and promote hits into
+    the faster tiers with their original creation time, so a promoted entry expires
+    when it would have in the tier it came from. Callers still validate cached text against their Pydantic
+    model and invalidate entries that no longer parse.
+    """
+
+    def __init__(self, tiers: list[LLMCacheBackend], enabled: bool = True):
+        self.tiers = tiers
+        self.enabled = enabled
+        self.hits = [0] * len(tiers)
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str, response_model: type[BaseModel]) -> str:
+        payload = json.dumps(
+            {
+                "model": model_name,
+                "schema": response_model.model_json_schema(),
+                "prompt": prompt,
+            },
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        for i, tier in enumerate(self.tiers):
+            try:
+                entry = await tier.get_entry(key)
+            except Exception as e:
+                print(f"Error reading LLM cache tier {type(tier).__name__}: {e}")
+                continue
+            if entry is not None:
+                value, created_at = entry
+                self.hits[i] += 1
+                for faster_tier in self.tiers[:i]:
+                    await faster_tier.set(key, value, created_at)
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        if not self.enabled:
+            return
+        for tier in self.tiers:
+            try:
+                await tier.set(key, value)
+            except Exception as e:
+                print(f"Error writing LLM cache tier {type(tier).__name__}: {e}")
+
+    async def invalidate(self, key: str):
+        for tier in self.tiers:
+            try:
+                await tier.delete(key)
+            except Exception as e:
+                print(f"Error invalidating LLM cache tier {type(tier).__name__}: {e}")
+
+    def stats(self) -> dict:
+        lookups = sum(self.hits) + self.misses
+        return {
+            "hits": {type(tier).__name__: hits for tier, hits in zip(self.tiers, self.hits)},
+            "misses": self.misses,
+            "hit_rate": (sum(self.hits) / lookups) if lookups else 0.0,
+        }
+
+
+kg_llm_cache_service = KGLLMCacheService(
+    tiers=[
+        InMemoryLRUCache(LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_TTL_SECONDS),
+        SQLiteLLMCache(LLM_CACHE_SQLITE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS),
+    ] if LLM_CACHE_ENABLED else [],
+    enabled=LLM_CACHE_ENABLED
+)
@@ -0,0 +1,275 @@
+import re
+import uuid
+import asyncio
+import unicodedata
+from contextlib import asynccontextmanager
+from typing import Iterable, Optional
+from pydantic import BaseModel
+from sqlalchemy import select, insert, update, delete, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.kg_config import KG_PAPER_MATCH_THRESHOLD, KG_PAPER_MATCH_THRESHOLD_AUTHOR_MISMATCH
+from app.models.knowledge_graph.ps_kg_entity import PSKgEntityDB
+from app.models.knowledge_graph.ps_kg_relationship import PSKgRelationshipDB
+from app.models.knowledge_graph.ps_kg_paper_index import PSKgPaperIndexDB
+from app.services.knowledge_graph.kg_bulk_writer import KGBulkWriter
+from app.services.knowledge_graph.kg_embedding_store import kg_embedding_store
+from app.services.knowledge_graph.kg_helper_service import KGHelperService
+
+# Ignored when building the title blocking key.
+TITLE_STOPWORDS = {
+    "a", "an", "the", "of", "on", "in", "for", "and", "to", "with", "via", "from", "by", "at", "using", "towards", "toward",
+}
+TITLE_KEY_WORDS = 3
+
+
+def normalize_title(title: Optional[str]) -> str:
+    """Lowercases, strips accents and punctuation, and collapses whitespace."""
+    text = unicodedata.normalize("NFKD", title or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"[^0-9a-z]+", " ", text.lower())
+    return " ".join(text.split())
+
+
+def author_surname(name: Optional[str]) -> Optional[str]:
+    """Normalized surname from "Vaswani, A.", "A. Vaswani" or "Ashish Vaswani et al."."""
+    name = re.sub(r"\bet\s+al\b\.?", "", name or "", flags=re.IGNORECASE).strip(" ,;")
+    if not name:
+        return None
+    surname = name.split(",")[0] if "," in name else name.split()[-1]
+    surname = normalize_title(surname).replace(" ", "")
+    return surname or None
+
+
+def trigrams(text: str) -> set[str]:
+    """Word trigrams padded the way pg_trgm pads them."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def trigram_similarity(a: str, b: str) -> float:
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+
+class PaperKey(BaseModel):
+    """The fields a paper is resolved on."""
+    norm_title: str
+    first_author: Optional[str] = None
+    year: Optional[int] = None
+
+    @classmethod
+    def from_details(cls, title: Optional[str], authors: Optional[list[str]], year: Optional[int]) -> "PaperKey":
+        return cls(
+            norm_title=normalize_title(title),
+            first_author=author_surname(authors[0]) if authors else None,
+            year=year
+        )
+
+    @classmethod
+    def from_content(cls, content: Optional[str], fallback_title: Optional[str] = None) -> "PaperKey":
+        """Parses the "Title: / Authors: / Year:" content written for ResearchPaper entities."""
+        fields = {}
+        for line in (content or "").splitlines():
+            label, _, value = line.partition(":")
+            fields[label.strip().lower()] = value.strip()
+        year = fields.get("year", "")
+        return cls.from_details(
+            title=fields.get("title") or fallback_title,
+            authors=[a for a in fields.get("authors", "").split(",") if a.strip()][:1],
+            year=int(year) if year.isdigit() else None
+        )
+
+    @classmethod
+    def from_index(cls, row: PSKgPaperIndexDB) -> "PaperKey":
+        return cls(norm_title=row.norm_title, first_author=row.first_author, year=row.year)
+
+    @property
+    def author_year_key(self) -> Optional[str]:
+        if not self.first_author:
+            return None
+        return f"{self.first_author}:{self.year or ''}"
+
+    @property
+    def title_key(self) -> str:
+        words = [w for w in self.norm_title.split() if w not in TITLE_STOPWORDS]
+        return " ".join(words[:TITLE_KEY_WORDS])
+
+    @property
+    def lock_keys(self) -> list[str]:
+        """
+        One key per blocking key. Candidates are only fetched by blocking key, so two
+        papers that can match share at least one of these.
+        """
+        keys = [f"title:{self.title_key}"]
+        if self.author_year_key:
+            keys.append(f"author:{self.author_year_key}")
+        return keys
+
+
+def match_score(a: PaperKey, b: PaperKey) -> float:
+    """Title trigram similarity if a and b are taken to be the same paper, else 0."""
+    if a.year and b.year and a.year != b.year:
+        return 0.0
+    similarity = trigram_similarity(a.norm_title, b.norm_title)
+    authors_differ = a.first_author and b.first_author and a.first_author != b.first_author
+    threshold = KG_PAPER_MATCH_THRESHOLD_AUTHOR_MISMATCH if authors_differ else KG_PAPER_MATCH_THRESHOLD
+    return similarity if similarity >= threshold else 0.0
+
+
+async def merge_papers(canonical_guid: uuid.UUID, duplicate_guids: list[uuid.UUID], execute):
+    """
+    Re-points every relationship of the duplicate ResearchPaper entities at the
+    canonical one, then deletes the duplicates and their index rows. `execute` runs
+    a statement on the caller's session (e.g. KGBulkWriter.execute).
+    """
+    if not duplicate_guids:
+        return
+    await execute(
+        update(PSKgRelationshipDB)
+        .where(PSKgRelationshipDB.target_entity_guid.in_(duplicate_guids))
+        .values(target_entity_guid=canonical_guid)
+    )
+    await execute(
+        update(PSKgRelationshipDB)
+        .where(PSKgRelationshipDB.source_entity_guid.in_(duplicate_guids))
+        .values(source_entity_guid=canonical_guid)
+    )
+    await execute(delete(PSKgEntityDB).where(PSKgEntityDB.guid.in_(duplicate_guids)))
+    await execute(delete(PSKgPaperIndexDB).where(PSKgPaperIndexDB.paper_guid.in_(duplicate_guids)))
+
+
+class KeyedLocks:
+    """asyncio locks by key, created on first use and dropped once no task holds or awaits them."""
+
+    def __init__(self):
+        self._locks: dict[str, list] = {}  # key -> [lock, holders and waiters]
+
+    @asynccontextmanager
+    async def hold(self, keys: Iterable[str]):
+        """Holds the locks of all keys; they are taken in sorted order, so holders never deadlock."""
+        entries = []
+        for key in sorted(set(keys)):
+            entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+            entry[1] += 1
+            entries.append((key, entry))
+        acquired = []
+        try:
+            for _, entry in entries:
+                await entry[0].acquire()
+                acquired.append(entry[0])
+            yield
+        finally:
+            for lock in acquired:
+                lock.release()
+            for key, entry in entries:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+
+class KGPaperResolver:
+    """
+    Resolves referenced papers to one canonical ResearchPaper entity.
+
+    Candidates are fetched from ps_kg_paper_index by blocking key (first-author
+    surname + year, or the first significant title words), then compared by title
+    trigram similarity. Papers ingested from a file are preferred as the canonical
+    entity. Resolutions that could match each other (they share a blocking key) are
+    serialized within the process so that concurrent Round 3 tasks citing the same
+    paper do not both create it; unrelated papers resolve concurrently. Ingestions
+    running in other sessions cannot see each other's uncommitted rows, and any
+    duplicates that slip through are merged by scripts/merge_duplicate_papers.py.
+    """
+
+    def __init__(self):
+        self.helper_service = KGHelperService()
+        self._locks = KeyedLocks()
+
+    async def resolve_cited_paper(self, title: str, authors: list[str], year: Optional[int], content: str, db: AsyncSession, writer: Optional[KGBulkWriter] = None) -> Optional[uuid.UUID]:
+        """Returns the guid of the canonical paper for a reference, creating it if no match exists."""
+        key = PaperKey.from_details(title, authors, year)
+        execute = writer.execute if writer else db.execute
+
+        # Embed before taking the lock so that creating the entity inside it hits the store.
+        await kg_embedding_store.get_or_embed(content)
+        async with self._locks.hold(key.lock_keys if key.norm_title else []):
+            if key.norm_title:
+                match = self._best_match(key, await self._candidates(key, execute))
+                if match:
+                    return match.paper_guid
+
+            paper = await self.helper_service._create_entity(
+                db=db,
+                writer=writer,
+                entity_type="ResearchPaper",
+                file_guid=None, # This paper is *referenced*, it doesn't have a file_guid in our system
+                content=content,
+                name=title
+            )
+            if not paper:
+                return None
+            if key.norm_title:
+                await self._index(paper.guid, None, key, execute)
+            return paper.guid
+
+    async def register_ingested_paper(self, paper_guid: uuid.UUID, file_guid: uuid.UUID, title: str, authors: list[str], year: Optional[int], db: AsyncSession, writer: Optional[KGBulkWriter] = None):
+        """
+        Indexes the ResearchPaper of an ingested file and merges referenced-only
+        entities for the same paper into it, so earlier citations point at the file.
+        """
+        key = PaperKey.from_details(title, authors, year)
+        if not key.norm_title:
+            return
+        execute = writer.execute if writer else db.execute
+        async with self._locks.hold(key.lock_keys):
+            duplicates = [
+                row.paper_guid for row in await self._candidates(key, execute)
+                if row.file_guid is None and match_score(key, PaperKey.from_index(row)) > 0
+            ]
+            if duplicates:
+                if writer:
+                    # Buffered rows may reference the duplicates; write them before re-pointing.
+                    await writer.flush()
+                await merge_papers(paper_guid, duplicates, execute)
+                print(f"Merged {len(duplicates)} referenced paper entities into {paper_guid}")
+            await self._index(paper_guid, file_guid, key, execute)
+
+    async def _candidates(self, key: PaperKey, execute) -> list[PSKgPaperIndexDB]:
+        conditions = [PSKgPaperIndexDB.title_key == key.title_key]
+        if key.author_year_key:
+            conditions.append(PSKgPaperIndexDB.author_year_key == key.author_year_key)
+        result = await execute(select(PSKgPaperIndexDB).where(or_(*conditions)))
+        return result.scalars().all()
+
+    def _best_match(self, key: PaperKey, candidates: list[PSKgPaperIndexDB]) -> Optional[PSKgPaperIndexDB]:
+        best, best_rank = None, None
+        for row in candidates:
+            score = match_score(key, PaperKey.from_index(row))
+            if score <= 0:
+                continue
+            rank = (score, row.file_guid is not None)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = row, rank
+        return best
+
+    async def _index(self, paper_guid: uuid.UUID, file_guid: Optional[uuid.UUID], key: PaperKey, execute):
+        await execute(
+            insert(PSKgPaperIndexDB).values(
+                paper_guid=paper_guid,
+                file_guid=file_guid,
+                norm_title=key.norm_title,
+                first_author=key.first_author,
+                year=key.year,
+                author_year_key=key.author_year_key,
+                title_key=key.title_key
+            )
+        )
+
+
+# Shared so that resolution of the same paper is serialized across every ingestion in the process.
+kg_paper_resolver = KGPaperResolver()
@@ -0,0 +1,105 @@
+import time
+import asyncio
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+from app.config.kg_config import QUERY_EMBEDDING_CACHE_ENTRIES, QUERY_EMBEDDING_CACHE_TTL_SECONDS
+from app.services.knowledge_graph.kg_embedding_service import kg_embedding_service
+from app.services.knowledge_graph.kg_fingerprint import normalize_text
+
+
+def normalize_query(query: Optional[str]) -> str:
+    """NFKC-normalized with whitespace runs collapsed, so trivially different spellings of a query share a vector."""
+    return normalize_text(unicodedata.normalize("NFKC", query or ""))
+
+
+class KGQueryEmbeddingCache:
+    """
+    In-memory LRU + TTL cache of search query embeddings.
+
+    Used for search queries only (KGSearchService, KGCitationSearchService and, through
+    them, the agent tools). Unlike the persistent embedding store used at ingestion,
+    query vectors are not written to the database. The normalized query is what gets
+    embedded, so a cached vector is exactly what a fresh call would return.
+    Concurrent requests for the same query share one embedding call.
+    """
+
+    def __init__(self, max_entries: int = QUERY_EMBEDDING_CACHE_ENTRIES, ttl_seconds: int = QUERY_EMBEDDING_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[list[float], float]] = OrderedDict()  # query -> (vector, expires_at)
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def _get(self, query: str) -> Optional[list[float]]:
+        entry = self._entries.get(query)
+        if entry is None:
+            return None
+        vector, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[query]
+            self.expired += 1
+            return None
+        self._entries.move_to_end(query)
+        return vector
+
+    def _remember(self, query: str, vector: list[float]):
+        if self.max_entries <= 0:
+            return
+        self._entries[query] = (vector, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(query)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def embed(self, query: str) -> list[float]:
+        """Returns the embedding of the normalized query, from the cache when possible."""
+        query = normalize_query(query)
+        vector = self._get(query)
+        if vector is not None:
+            self.hits += 1
+            return vector
+
+        self.misses += 1
+        while (inflight := self._inflight.get(query)) is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                # The leading request was cancelled (e.g. its client went away); take over.
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[query] = future
+        try:
+            vector = await kg_embedding_service.embed(query)
+            self._remember(query, vector)
+            future.set_result(vector)
+            return vector
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved; waiters (if any) still receive it
+            raise
+        finally:
+            self._inflight.pop(query, None)
+            if not future.done():
+                # Cancelled: wake the waiters so one of them repeats the call.
+                future.cancel()
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+# Shared by every search path so that repeated queries are embedded once per process.
+kg_query_embedding_cache = KGQueryEmbeddingCache()
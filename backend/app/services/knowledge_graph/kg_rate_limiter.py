@@ -0,0 +1,216 @@
+import time
+import random
+import asyncio
+from typing import Awaitable, Callable, Optional, TypeVar
+from google.api_core import exceptions as google_exceptions
+from app.config.kg_config import (
+    GENERATIVE_RPM,
+    GENERATIVE_TPM,
+    EMBEDDING_RPM,
+    EMBEDDING_TPM,
+    VERTEX_MAX_CONCURRENCY,
+    VERTEX_RETRY_ATTEMPTS,
+    VERTEX_RETRY_BASE_DELAY_MS,
+    VERTEX_RETRY_MAX_DELAY_MS,
+)
+
+T = TypeVar("T")
+
+# Quota exhaustion: back off and shrink the concurrency window.
+RATE_LIMIT_ERRORS = (google_exceptions.TooManyRequests, google_exceptions.ResourceExhausted)
+# Other failures worth retrying as-is.
+TRANSIENT_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.Aborted,
+    google_exceptions.BadGateway,
+    google_exceptions.GatewayTimeout,
+    ConnectionError,
+    asyncio.TimeoutError,
+)
+
+
+class TokenBucket:
+    """
+    Continuously refilling bucket of `per_minute` units, holding at most one minute's
+    worth. `acquire` waits until the units are available; a request larger than the
+    bucket only waits for a full bucket, so it can never block forever.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1):
+        amount = min(amount, self.capacity)
+        # Callers queue on the lock, so units are handed out in arrival order.
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= amount
+
+    def debit(self, amount: float):
+        """Charges units after the fact (e.g. actual usage above the estimate); may go negative."""
+        self._refill()
+        self._tokens -= amount
+
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+
+class AIMDConcurrencyLimiter:
+    """
+    Adaptive cap on in-flight calls. Each success that was not slow adds 1/limit to the
+    limit (about +1 per window of calls); a 429 halves it and a slow response, compared
+    with the running average latency, trims it by 10%. Decreases are applied at most
+    once per window so that one burst of failures counts as one congestion signal.
+    """
+
+    DECREASE_ON_RATE_LIMIT = 0.5
+    DECREASE_ON_LATENCY = 0.9
+    LATENCY_TOLERANCE = 2.0  # a response this many times slower than average counts as congestion
+    LATENCY_SMOOTHING = 0.1
+
+    def __init__(self, max_limit: int, min_limit: int = 1, initial_limit: Optional[int] = None):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(initial_limit or max(min_limit, max_limit // 4))
+        self.in_flight = 0
+        self.avg_latency: Optional[float] = None
+        self._condition = asyncio.Condition()
+        self._last_decrease = 0.0
+
+    async def acquire(self):
+        async with self._condition:
+            while self.in_flight >= int(self.limit):
+                await self._condition.wait()
+            self.in_flight += 1
+
+    async def release(self, latency: Optional[float] = None, rate_limited: bool = False):
+        async with self._condition:
+            self.in_flight -= 1
+            if rate_limited:
+                self._decrease(self.DECREASE_ON_RATE_LIMIT, latency or 0.0)
+            elif latency is not None:
+                slow = self.avg_latency is not None and latency > self.avg_latency * self.LATENCY_TOLERANCE
+                if slow:
+                    self._decrease(self.DECREASE_ON_LATENCY, latency)
+                else:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.avg_latency = latency if self.avg_latency is None else (
+                    self.avg_latency + self.LATENCY_SMOOTHING * (latency - self.avg_latency)
+                )
+            self._condition.notify_all()
+
+    def _decrease(self, factor: float, latency: float):
+        now = time.monotonic()
+        if now - self._last_decrease < max(latency, self.avg_latency or 0.0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * factor)
+
+
+class VertexRateLimiter:
+    """
+    Client-side admission for one Vertex AI quota: requests-per-minute and
+    tokens-per-minute token buckets, an AIMD concurrency window, and retries with
+    full-jitter exponential backoff for 429s and transient errors. A zero rpm/tpm
+    disables that bucket. Errors that are not retryable, or that persist past
+    max_attempts, are raised to the caller.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rpm: int,
+        tpm: int,
+        max_concurrency: int = VERTEX_MAX_CONCURRENCY,
+        max_attempts: int = VERTEX_RETRY_ATTEMPTS,
+        base_delay_ms: int = VERTEX_RETRY_BASE_DELAY_MS,
+        max_delay_ms: int = VERTEX_RETRY_MAX_DELAY_MS,
+    ):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.concurrency = AIMDConcurrencyLimiter(max_concurrency)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay_ms / 1000
+        self.max_delay = max_delay_ms / 1000
+        self.calls = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def call(self, fn: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+        """
+        Runs `fn()` once admitted, retrying it on retryable errors. `tokens` is the
+        estimated token cost charged against the tokens-per-minute bucket per attempt.
+        """
+        for attempt in range(self.max_attempts):
+            if self.requests:
+                await self.requests.acquire(1)
+            if self.tokens and tokens:
+                await self.tokens.acquire(tokens)
+            await self.concurrency.acquire()
+            start = time.monotonic()
+            rate_limited = False
+            try:
+                self.calls += 1
+                result = await fn()
+                await self.concurrency.release(time.monotonic() - start)
+                return result
+            except RATE_LIMIT_ERRORS as e:
+                rate_limited = True
+                self.rate_limited += 1
+                error = e
+            except TRANSIENT_ERRORS as e:
+                error = e
+            except BaseException:
+                await self.concurrency.release()
+                self.failures += 1
+                raise
+            await self.concurrency.release(time.monotonic() - start, rate_limited=rate_limited)
+
+            if attempt + 1 >= self.max_attempts:
+                self.failures += 1
+                raise error
+            delay = self._backoff(attempt)
+            self.retries += 1
+            print(f"{self.name}: {type(error).__name__} on attempt {attempt + 1}/{self.max_attempts}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """Charges the tokens-per-minute bucket for usage above the estimate."""
+        if self.tokens and actual_tokens > estimated_tokens:
+            self.tokens.debit(actual_tokens - estimated_tokens)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "failures": self.failures,
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+            "avg_latency_s": self.concurrency.avg_latency,
+        }
+
+
+# Shared per quota so that every service in the process draws from the same budget.
+generative_rate_limiter = VertexRateLimiter("gemini", GENERATIVE_RPM, GENERATIVE_TPM)
+embedding_rate_limiter = VertexRateLimiter("embeddings", EMBEDDING_RPM, EMBEDDING_TPM)
@@ -0,0 +1,217 @@
+import re
+from typing import Optional
+from app.models.knowledge_graph.paper_segement import ReferenceDetails
+from app.services.knowledge_graph.kg_paper_resolver import author_surname
+
+REFERENCE_SECTION_TITLE = re.compile(
+    r"^\s*(?:[\dIVX]+(?:\.\d+)*\.?\s+)?(?:references?|bibliography|works cited|literature cited|reference list)\s*$",
+    re.IGNORECASE
+)
+# "[12]", "12." or "(12)" at the start of an entry
+ENTRY_MARKER = re.compile(r"^\s*(?:\[(\d{1,4})\]|(\d{1,4})\.(?=\s)|\((\d{1,4})\))\s*")
+YEAR = re.compile(r"\b((?:19|20)\d{2})[a-z]?\b")
+QUOTED_TITLE = re.compile(r"[\"“”](.+?)[,.]?[\"“”]")
+# Vaswani, A., Shazeer, N., & Parmar, N. (2017). Title. Venue.
+APA = re.compile(r"^(?P<authors>.+?)\s*\((?P<year>(?:19|20)\d{2})[a-z]?(?:, [^)]*)?\)\.?\s*(?P<title>.+?[.?!])\s+(?P<venue>.*)$")
+# Vaswani A, Shazeer N, Parmar N. Title. Venue. 2017;30:1-11.
+VANCOUVER_AUTHORS = re.compile(r"^(?P<authors>(?:[A-Z][\w'\-]+(?: [A-Z][\w'\-]+)* [A-Z]{1,3}(?:, |\.\s+))+)(?:et al\.\s+)?")
+# Sentence boundary: ". " not directly after a single capital letter (an initial);
+# "arXiv" is the one venue that starts lowercase
+SENTENCE_BREAK = re.compile(r"(?<![\s.][A-Z])(?<!^[A-Z])[.?!]\s+(?=[A-Z0-9\"“(\[]|arXiv\b)")
+# "Smith, J., Lee, M.-W., and Ba, J." up to the title that follows the last initial
+SURNAME_INITIALS_LIST = re.compile(
+    r"^[A-Z][\w'\-]+(?: [A-Z][\w'\-]+)*,\s*[A-Z]\.(?:\s*-?\s*[A-Z]\.)*"
+    r"(?:(?:\s*,\s*(?:and\s+|&\s*)?|\s+and\s+|\s*&\s*)[A-Z][\w'\-]+(?: [A-Z][\w'\-]+)*,\s*[A-Z]\.(?:\s*-?\s*[A-Z]\.)*)*"
+    r"(?:,?\s+et al\b\.?)?(?=\s+(?!et al\b)\S|$)"
+)
+# What the fallback split picks up when it lands on the venue sentence instead of the title:
+# "In ICML, 2020", "Proceedings of ...", "arXiv preprint ...", "NeurIPS 2017".
+VENUE_TITLE = re.compile(
+    r"^(?:in:?\s+(?:proc(?:eedings\b|\.)|advances\b|findings\b)|proceedings\b|proc\.|arxiv\b|corr\b)"
+    r"|^in:?\s+.*\b(?:19|20)\d{2}[a-z]?$"
+    r"|^[\w&.'\-]+(?:\s+[\w&.'\-]+){0,3},?\s+(?:19|20)\d{2}[a-z]?$",
+    re.IGNORECASE
+)
+SURNAME_FIRST = re.compile(r"^[A-Z][\w'\-]+(?: [A-Z][\w'\-]+)*,\s*(?:[A-Z]\.\s*)+")
+SURNAME_INITIALS = re.compile(r"([A-Z][\w'\-]+(?: [A-Z][\w'\-]+)*),\s*((?:[A-Z]\.\s*-?\s*)+)")
+AUTHOR_SPLIT = re.compile(r"\s*(?:;|,?\s+and\s+|&|,)\s*")
+INLINE_NUMERIC = re.compile(r"\[(\d{1,4})(?:\s*[,–-]\s*\d{1,4})*\]")
+INLINE_AUTHOR_YEAR = re.compile(r"([A-Z][\w'\-]+)(?:\s+et\s+al\.?|\s+(?:and|&)\s+[A-Z][\w'\-]+)?,?\s*\(?((?:19|20)\d{2})[a-z]?\)?")
+
+MIN_TITLE_LENGTH = 10
+
+
+def is_reference_section(section_title: Optional[str]) -> bool:
+    return bool(REFERENCE_SECTION_TITLE.match(section_title or ""))
+
+
+def split_reference_entries(section_text: str) -> list[str]:
+    """
+    Splits a References section into entries. docling emits each list item of the
+    bibliography as its own text block, so blocks are the first cut; blocks that still
+    hold several numbered entries are split again at their markers.
+    """
+    entries = []
+    for block in re.split(r"\n\s*\n", section_text or ""):
+        block = " ".join(block.split())
+        if not block:
+            continue
+        starts = [m.start() for m in re.finditer(r"(?:^|\s)(?=\[\d{1,4}\]\s)", block)]
+        if len(starts) > 1:
+            bounds = starts + [len(block)]
+            entries.extend(block[a:b].strip() for a, b in zip(bounds, bounds[1:]) if block[a:b].strip())
+        else:
+            entries.append(block)
+    return entries
+
+
+def _split_authors(authors: str) -> list[str]:
+    authors = re.sub(r"\bet\s+al\b\.?", "", authors).strip(" ,;")
+    if not authors:
+        return []
+    if SURNAME_FIRST.match(authors):
+        # "Vaswani, A., Shazeer, N." pairs surname and initials across commas.
+        pairs = SURNAME_INITIALS.findall(authors)
+        if pairs:
+            return [f"{surname}, {initials.strip()}" for surname, initials in pairs]
+    return [a.strip(" ,.") for a in AUTHOR_SPLIT.split(authors) if a.strip(" ,.")]
+
+
+def _clean_title(title: str) -> str:
+    return title.strip(" .,\"“”")
+
+
+def _clean_venue(venue: str) -> Optional[str]:
+    return re.sub(r"^in:?\s+", "", venue.strip(" .,"), flags=re.IGNORECASE) or None
+
+
+def _find_year(text: str) -> Optional[int]:
+    years = YEAR.findall(text)
+    return int(years[-1]) if years else None
+
+
+def _parse_fields(entry: str) -> Optional[dict]:
+    """Rule-based parse of one reference entry into title/authors/venue/year, or None."""
+    text = ENTRY_MARKER.sub("", " ".join(entry.split()), count=1)
+    if not text:
+        return None
+
+    fields = None
+    quoted = QUOTED_TITLE.search(text)
+    apa = APA.match(text)
+    vancouver = VANCOUVER_AUTHORS.match(text)
+    if quoted and quoted.start() > 0:
+        # IEEE: A. Vaswani, N. Shazeer, "Title," in Proc. NeurIPS, 2017, pp. 1-11.
+        venue = text[quoted.end():].strip(" ,.")
+        fields = {
+            "authors": _split_authors(text[:quoted.start()]),
+            "title": _clean_title(quoted.group(1)),
+            "venue": _clean_venue(venue),
+            "year": _find_year(venue),
+        }
+    elif apa:
+        fields = {
+            "authors": _split_authors(apa.group("authors")),
+            "title": _clean_title(apa.group("title")),
+            "venue": _clean_venue(apa.group("venue")),
+            "year": int(apa.group("year")),
+        }
+    elif vancouver:
+        rest = text[vancouver.end():]
+        title, _, venue = rest.partition(". ")
+        fields = {
+            "authors": [a.strip(" .") for a in vancouver.group("authors").split(",") if a.strip(" .")],
+            "title": _clean_title(title),
+            "venue": _clean_venue(venue),
+            "year": _find_year(venue),
+        }
+    else:
+        # ACL/NeurIPS/ACM: Authors. Title. Venue, Year.
+        parts = [p for p in SENTENCE_BREAK.split(text) if p.strip()]
+        authors = SURNAME_INITIALS_LIST.match(parts[0]) if parts else None
+        if authors and parts[0][authors.end():].strip():
+            # The title directly follows the last initial ("Smith, J. Deep nets for graphs."),
+            # which SENTENCE_BREAK does not split at.
+            parts = [authors.group(0), parts[0][authors.end():].strip()] + parts[1:]
+        if len(parts) >= 3 and YEAR.fullmatch(parts[1].strip(" .()")):
+            # ACL puts the year right after the authors: Authors. 2017. Title. Venue.
+            parts = [parts[0], parts[2], " ".join(parts[3:] + [parts[1]])]
+        if len(parts) >= 2:
+            venue = " ".join(parts[2:])
+            fields = {
+                "authors": _split_authors(parts[0]),
+                "title": _clean_title(parts[1]),
+                "venue": _clean_venue(venue),
+                "year": _find_year(venue) or _find_year(parts[0]),
+            }
+
+    if not fields or not fields["authors"] or len(fields["title"]) < MIN_TITLE_LENGTH:
+        return None
+    if VENUE_TITLE.match(fields["title"]):
+        # Leave it to the LLM rather than merge every paper from that venue into one.
+        return None
+    if fields["year"] is None and not YEAR.search(text):
+        return None
+    if fields["year"] is None:
+        fields["year"] = _find_year(text)
+    return fields
+
+
+def parse_reference(entry: str) -> Optional[ReferenceDetails]:
+    """Parses a numeric or author-year reference entry; None if no rule matches confidently."""
+    fields = _parse_fields(entry)
+    if not fields:
+        return None
+    return ReferenceDetails(
+        title=fields["title"],
+        authors=fields["authors"],
+        publication_venue=fields["venue"],
+        year=fields["year"]
+    )
+
+
+def entry_marker(entry: str) -> Optional[int]:
+    match = ENTRY_MARKER.match(entry)
+    if not match:
+        return None
+    return int(next(group for group in match.groups() if group))
+
+
+class ReferenceList:
+    """
+    The parsed bibliography of one paper, used to resolve inline citations
+    ("[12]", "Vaswani et al., 2017") without another LLM call.
+    """
+
+    def __init__(self):
+        self.entries: list[tuple[str, Optional[ReferenceDetails]]] = []  # (raw entry, details)
+        self._by_entry: dict[str, ReferenceDetails] = {}
+        self._by_marker: dict[int, ReferenceDetails] = {}
+        self._by_author_year: dict[tuple[str, int], list[ReferenceDetails]] = {}
+
+    def add(self, entry: str, details: Optional[ReferenceDetails]):
+        self.entries.append((entry, details))
+        if not details:
+            return
+        self._by_entry[entry] = details
+        marker = entry_marker(entry)
+        if marker is not None:
+            self._by_marker[marker] = details
+        surname = author_surname(details.authors[0]) if details.authors else None
+        if surname and details.year:
+            self._by_author_year.setdefault((surname, details.year), []).append(details)
+
+    def details_for_entry(self, entry: str) -> Optional[ReferenceDetails]:
+        return self._by_entry.get(entry)
+
+    def lookup(self, citation_text: str) -> Optional[ReferenceDetails]:
+        """Details of the reference an inline citation points at, or None if unknown or ambiguous."""
+        numeric = INLINE_NUMERIC.search(citation_text or "")
+        if numeric and int(numeric.group(1)) in self._by_marker:
+            return self._by_marker[int(numeric.group(1))]
+        author_year = INLINE_AUTHOR_YEAR.search(citation_text or "")
+        if author_year:
+            candidates = self._by_author_year.get((author_surname(author_year.group(1)), int(author_year.group(2))), [])
+            if len(candidates) == 1:
+                return candidates[0]
+        return parse_reference(citation_text or "")
@@ -1,14 +1,15 @@
 import uuid
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
-from collections import defaultdict
+from sqlalchemy import select, literal, union, union_all, true, String, Text
+from sqlalchemy.dialects.postgresql import UUID
+from collections import defaultdict, deque
 
 from app.models.knowledge_graph.ps_kg_entity import PSKgEntityDB
 from app.models.knowledge_graph.ps_kg_relationship import PSKgRelationshipDB
-from vertexai.language_models import TextEmbeddingModel
-
-EMBEDDING_MODEL_NAME = "text-embedding-004"
-embedding_model = TextEmbeddingModel.from_pretrained(EMBEDDING_MODEL_NAME)
+from app.services.knowledge_graph.kg_query_embedding_cache import kg_query_embedding_cache
+from app.services.knowledge_graph.kg_graph_cache import kg_graph_cache
+from app.services.knowledge_graph.kg_vector_search import RESEARCH_PAPER_TYPES, entity_type_clause, set_ef_search
+from app.services.metrics.metrics_service import PhaseTimer
 
 class KGSearchService:
 
@@ -26,10 +27,10 @@ class KGSearchService:
     async def _find_path_to_section(self, start_guid: uuid.UUID, parents_map: dict, entities_map: dict) -> list[list[uuid.UUID]]:
         """Iteratively finds paths from a start node up to a Section."""
         paths = []
-        q = [[start_guid]]  # Queue for BFS-like path exploration
+        q = deque([[start_guid]])  # Queue for BFS-like path exploration
 
         while q:
-            current_path_guids = q.pop(0)
+            current_path_guids = q.popleft()
             last_node_guid = current_path_guids[-1]
             
             last_node = entities_map.get(last_node_guid)
@@ -50,10 +51,10 @@ class KGSearchService:
     async def _find_paths_down(self, start_guid: uuid.UUID, children_map: dict, max_depth: int = 2) -> list[list[uuid.UUID]]:
         """Performs a traversal to find all downward paths up to a max_depth."""
         all_paths = []
-        q = [([start_guid], 0)]  # Queue of ([path_guids], depth)
+        q = deque([([start_guid], 0)])  # Queue of ([path_guids], depth)
 
         while q:
-            current_path_guids, depth = q.pop(0)
+            current_path_guids, depth = q.popleft()
 
             # We want the full path including the start node, so we add it.
             # But we only care about paths that go somewhere.
@@ -112,28 +113,142 @@ class KGSearchService:
         return sentence.capitalize()
 
 
+    async def _fetch_subgraph(self, seed_guids: list[uuid.UUID], extra_guids: list[uuid.UUID], db: AsyncSession, max_depth: int = 3) -> tuple[list, dict]:
+        """
+        Fetches the neighbourhood of the seed entities in a single round-trip: every
+        relationship touching an entity within max_depth - 1 hops of a seed (in either
+        direction), plus the display columns of every entity those relationships reach
+        and of `extra_guids`. A recursive CTE walks the graph; relationships and entities
+        come back as rows of one result set, told apart by their `kind` column.
+        Returns (relationship rows, {guid: entity row}); entity rows carry guid,
+        entity_type, name and content, the columns used to format paths.
+        """
+        rel = PSKgRelationshipDB
+        walk = (
+            select(PSKgEntityDB.guid.label("guid"), literal(0).label("depth"))
+            .where(PSKgEntityDB.guid.in_(seed_guids))
+            .cte("walk", recursive=True)
+        )
+        # Both directions, each served by its own index.
+        neighbors = union_all(
+            select(rel.target_entity_guid.label("guid")).where(rel.source_entity_guid == walk.c.guid),
+            select(rel.source_entity_guid.label("guid")).where(rel.target_entity_guid == walk.c.guid),
+        ).lateral("neighbors")
+        walk = walk.union(
+            select(neighbors.c.guid, (walk.c.depth + 1).label("depth"))
+            .select_from(walk.join(neighbors, true()))
+            .where(walk.c.depth < max_depth - 1)
+        )
+        reached = select(walk.c.guid).distinct().cte("reached")
+        rel_columns = (rel.guid, rel.source_entity_guid, rel.target_entity_guid, rel.relationship_type)
+        rels = union(
+            select(*rel_columns).join(reached, rel.source_entity_guid == reached.c.guid),
+            select(*rel_columns).join(reached, rel.target_entity_guid == reached.c.guid),
+        ).cte("rels")
+        nodes = union(
+            select(rels.c.source_entity_guid.label("guid")),
+            select(rels.c.target_entity_guid),
+            select(reached.c.guid),
+            select(PSKgEntityDB.guid).where(PSKgEntityDB.guid.in_(extra_guids or [])),
+        ).cte("nodes")
+        no_uuid, no_string = literal(None, UUID(as_uuid=True)), literal(None, String)
+        stmt = union_all(
+            select(
+                literal("relationship").label("kind"), rels.c.guid, rels.c.source_entity_guid,
+                rels.c.target_entity_guid, rels.c.relationship_type,
+                no_string.label("entity_type"), no_string.label("name"), literal(None, Text).label("content")
+            ),
+            select(
+                literal("entity"), PSKgEntityDB.guid, no_uuid, no_uuid, no_string,
+                PSKgEntityDB.entity_type, PSKgEntityDB.name, PSKgEntityDB.content
+            ).join(nodes, nodes.c.guid == PSKgEntityDB.guid),
+        )
+        result = await db.execute(stmt)
+
+        relationships, entities_map = [], {}
+        for row in result.all():
+            if row.kind == "relationship":
+                relationships.append(row)
+            else:
+                entities_map[row.guid] = row
+        return relationships, entities_map
+
+    async def _paths_from_subgraph(self, source_nodes: list[PSKgEntityDB], research_papers: list[PSKgEntityDB], db: AsyncSession) -> tuple[dict, dict, dict]:
+        """
+        Upward paths to the parent section and downward paths (2 levels) of every
+        source node, traversed over the subgraph fetched by _fetch_subgraph.
+        Returns ({source guid: (source paths, context paths)}, entities_map, relationships_map).
+        """
+        relationships, entities_map = await self._fetch_subgraph(
+            [p.guid for p in source_nodes], [p.guid for p in research_papers], db, max_depth=3
+        )
+        children_map = defaultdict(list)
+        parents_map = defaultdict(list)
+        relationships_map = {}
+        
+        for rel in relationships:
+            children_map[rel.source_entity_guid].append((rel.target_entity_guid, rel.relationship_type))
+            parents_map[rel.target_entity_guid].append((rel.source_entity_guid, rel.relationship_type))
+            relationships_map[(rel.source_entity_guid, rel.target_entity_guid)] = rel.relationship_type
+
+        paths = {}
+        for sn in source_nodes:
+            source_paths = await self._find_path_to_section(sn.guid, parents_map, entities_map)
+            context_paths = await self._find_paths_down(sn.guid, children_map, max_depth=2)
+            paths[sn.guid] = (source_paths, context_paths)
+        return paths, entities_map, relationships_map
+
+    async def _paths_from_graph_cache(self, source_nodes: list[PSKgEntityDB], db: AsyncSession) -> tuple[dict, dict, dict]:
+        """
+        Same as _paths_from_subgraph, traversed in the cached graphs of the source nodes'
+        files. Only the display columns of the entities on the paths are read.
+        """
+        paths = {}
+        relationships_map = {}
+        for sn in source_nodes:
+            graph = await kg_graph_cache.get_file_graph(db, sn.file_guid)
+            source_paths = graph.paths_up_to(sn.guid, "Section")
+            context_paths = graph.paths_down(sn.guid, max_depth=2)
+            paths[sn.guid] = (source_paths, context_paths)
+            # Upward paths run child -> parent; relationships point parent -> child.
+            edges = [(b, a) for path in source_paths for a, b in zip(path, path[1:])]
+            edges += [(a, b) for path in context_paths for a, b in zip(path, path[1:])]
+            for source, target in edges:
+                relationships_map[(source, target)] = graph.relationship_type(source, target)
+
+        guids = {guid for source_paths, context_paths in paths.values() for path in source_paths + context_paths for guid in path}
+        result = await db.execute(
+            select(PSKgEntityDB.guid, PSKgEntityDB.entity_type, PSKgEntityDB.name, PSKgEntityDB.content)
+            .where(PSKgEntityDB.guid.in_(guids))
+        )
+        entities_map = {row.guid: row for row in result.all()}
+        return paths, entities_map, relationships_map
+
     async def search_and_explain(self, query: str, db: AsyncSession) -> list[str]:
         """
         Performs semantic search on papers and paragraphs, then does bi-directional 
         graph traversal to explain relationships.
         """
+        phases = PhaseTimer("explain")
         # Step 1: Get query embedding
         try:
-            embedding_response = await embedding_model.get_embeddings_async([query])
-            query_embedding = embedding_response[0].values
+            query_embedding = await kg_query_embedding_cache.embed(query)
         except Exception as e:
             print(f"Error getting text embedding: {e}")
             return ["Failed to generate embedding for the query."]
+        phases.mark("embed")
 
-        # Step 2: Semantic search for top 3 ResearchPaper entities
+        # Step 2: Semantic search for top 3 ResearchPaper entities (HNSW index)
+        await set_ef_search(db, k=3)
         paper_stmt = (
             select(PSKgEntityDB)
-            .filter(PSKgEntityDB.entity_type == 'ResearchPaper')
+            .filter(entity_type_clause(RESEARCH_PAPER_TYPES))
             .order_by(PSKgEntityDB.content_vec.l2_distance(query_embedding))
             .limit(3)
         )
         paper_result = await db.execute(paper_stmt)
         research_papers = paper_result.scalars().all()
+        phases.mark("paper_search")
 
         if not research_papers:
             return ["No matching research papers found."]
@@ -156,67 +271,23 @@ class KGSearchService:
         )
         paragraph_result = await db.execute(paragraph_stmt)
         source_nodes = paragraph_result.scalars().all()
+        phases.mark("paragraph_search")
 
         if not source_nodes:
             return ["No matching paragraphs found in the top research papers."]
 
-        # Step 4: Broad Data Fetch to create a local subgraph around source nodes
-        # We need to fetch enough context to build the paths.
-        # Let's fetch 3 levels of connections around the source nodes.
-        found_guids = {p.guid for p in source_nodes}
-        all_relationships = []
-        
-        current_guids = set(found_guids)
-        # Fetch 3 levels: 1 for section parent, 2 for children.
-        for _ in range(3): 
-            if not current_guids: break
-            
-            rel_stmt = select(PSKgRelationshipDB).filter(
-                or_(
-                    PSKgRelationshipDB.source_entity_guid.in_(current_guids),
-                    PSKgRelationshipDB.target_entity_guid.in_(current_guids)
-                )
-            ).distinct()
-            rel_result = await db.execute(rel_stmt)
-            rels = rel_result.scalars().all()
-            
-            newly_found_rels = [r for r in rels if r.guid not in {rr.guid for rr in all_relationships}]
-            all_relationships.extend(newly_found_rels)
-            
-            next_guids = set()
-            for r in newly_found_rels:
-                next_guids.add(r.source_entity_guid)
-                next_guids.add(r.target_entity_guid)
-            
-            # Update found_guids with all nodes we've seen
-            new_nodes = next_guids - found_guids
-            found_guids.update(new_nodes)
-            current_guids = new_nodes # Only search from the new frontier
-
-        # Also add the paper entities to the map
-        found_guids.update([p.guid for p in research_papers])
+        # Step 4: Paths around the source nodes (1 level up to the section parent, 2
+        # levels down), from the cached file graphs or from one subgraph query.
+        if kg_graph_cache.enabled:
+            paths, entities_map, relationships_map = await self._paths_from_graph_cache(source_nodes, db)
+        else:
+            paths, entities_map, relationships_map = await self._paths_from_subgraph(source_nodes, research_papers, db)
+        phases.mark("subgraph")
 
-        entities_stmt = select(PSKgEntityDB).filter(PSKgEntityDB.guid.in_(found_guids))
-        entities_result = await db.execute(entities_stmt)
-        entities_map = {e.guid: e for e in entities_result.scalars().all()}
-
-        children_map = defaultdict(list)
-        parents_map = defaultdict(list)
-        relationships_map = {}
-        
-        for rel in all_relationships:
-            children_map[rel.source_entity_guid].append((rel.target_entity_guid, rel.relationship_type))
-            parents_map[rel.target_entity_guid].append((rel.source_entity_guid, rel.relationship_type))
-            relationships_map[(rel.source_entity_guid, rel.target_entity_guid)] = rel.relationship_type
-
-        # Step 5: Pathfinding and Formatting
+        # Step 5: Formatting
         all_sentences = set()
         for sn in source_nodes:
-            # Find path up to the parent section
-            source_paths = await self._find_path_to_section(sn.guid, parents_map, entities_map)
-            # Find paths down 2 levels
-            context_paths = await self._find_paths_down(sn.guid, children_map, max_depth=2)
-            
+            source_paths, context_paths = paths[sn.guid]
             paper_title = paper_titles_map.get(sn.file_guid, "Unknown Paper")
 
             if not source_paths:
@@ -241,6 +312,7 @@ class KGSearchService:
                         if sentence:
                             all_sentences.add(f"In the paper '{paper_title}', {sentence}")
 
+        phases.mark("paths")
         if not all_sentences:
             return ["Found matching paragraphs, but could not construct meaningful relationship paths."]
 
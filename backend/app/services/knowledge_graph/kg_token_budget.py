@@ -0,0 +1,170 @@
+import re
+from typing import Callable, Optional
+from app.config.kg_config import (
+    PROMPT_BUDGET_PAPER_METADATA,
+    PROMPT_BUDGET_SECTION_SUMMARY,
+    PROMPT_BUDGET_DRAFT,
+    PROMPT_BUDGET_KG_CONTEXT,
+)
+
+CHARS_PER_TOKEN = 4
+ELISION = "\n\n[...]\n\n"
+# Front matter ends at the first body heading, e.g. "## 1 Introduction" or "I. INTRODUCTION".
+BODY_HEADING = re.compile(
+    r"^\s*(?:#+\s*)?(?:[\dIVX]+\.?\s+)?(?:introduction|background|related work|motivation)\b",
+    re.IGNORECASE | re.MULTILINE
+)
+# Shortest excerpt kept per paragraph by the "spread" strategy.
+MIN_SPREAD_CHARS = 200
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token, the usual estimate for English text."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _cut_head(text: str, max_chars: int) -> str:
+    """The first max_chars of text, ending at a paragraph or sentence break when one is near."""
+    if len(text) <= max_chars:
+        return text
+    window = text[:max_chars]
+    floor = int(max_chars * 0.8)
+    for separator in ("\n\n", ". ", "\n"):
+        cut = window.rfind(separator, floor)
+        if cut != -1:
+            return window[:cut + len(separator)].rstrip()
+    return window
+
+
+def _cut_tail(text: str, max_chars: int) -> str:
+    """The last max_chars of text, starting at a paragraph or sentence break when one is near."""
+    if len(text) <= max_chars:
+        return text
+    window = text[-max_chars:]
+    ceiling = int(max_chars * 0.2)
+    for separator in ("\n\n", ". ", "\n"):
+        cut = window.find(separator, 0, ceiling)
+        if cut != -1:
+            return window[cut + len(separator):].lstrip()
+    return window
+
+
+def truncate_head(text: str, max_tokens: int) -> str:
+    """Keeps the beginning; for ranked lists such as search context."""
+    return _cut_head(text, max_tokens * CHARS_PER_TOKEN)
+
+
+def truncate_head_tail(text: str, max_tokens: int, head_fraction: float = 0.7) -> str:
+    """Keeps the beginning and the end of a section, where its setup and conclusions usually are."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    head_chars = int((max_chars - len(ELISION)) * head_fraction)
+    tail_chars = max_chars - len(ELISION) - head_chars
+    return _cut_head(text, head_chars) + ELISION + _cut_tail(text, tail_chars)
+
+
+def truncate_front_matter(text: str, max_tokens: int) -> str:
+    """
+    Keeps the title block, author list and abstract: everything before the first
+    body heading (Introduction, Background, ...), capped at the budget. Falls back
+    to the beginning of the text when no such heading is found.
+    """
+    match = BODY_HEADING.search(text)
+    if match and match.start() > 0:
+        text = text[:match.start()].rstrip()
+    return truncate_head(text, max_tokens)
+
+
+def truncate_spread(text: str, max_tokens: int) -> str:
+    """
+    Keeps the start of paragraphs from across the whole text, so every part of a
+    document (e.g. each section of a draft) is represented. When there are too many
+    paragraphs for each to keep MIN_SPREAD_CHARS, evenly spaced ones are kept.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
+    keep = max(1, min(len(paragraphs), max_chars // MIN_SPREAD_CHARS))
+    step = len(paragraphs) / keep
+    selected = [paragraphs[int(i * step)] for i in range(keep)]
+    share = max_chars // keep - len(ELISION)
+    return ELISION.join(_cut_head(paragraph, max(share, 1)) for paragraph in selected)
+
+
+class CallSiteBudget:
+    """Token budget and truncation strategy for one kind of prompt input."""
+
+    def __init__(self, max_tokens: int, strategy: Callable[[str, int], str]):
+        self.max_tokens = max_tokens
+        self.strategy = strategy
+        self.calls = 0
+        self.truncated = 0
+        self.tokens_in = 0
+        self.tokens_kept = 0
+
+
+class KGTokenBudget:
+    """
+    Central token budgeting for LLM prompts.
+
+    Call sites pass the variable part of a prompt (a paper, a section, a draft, KG
+    context) through `fit`, which trims it to that site's budget with the site's
+    strategy; a budget of 0 disables trimming. `record_prompt` is called by
+    KGHelperService for every prompt sent, so prompt sizes per call site are known.
+    Token counts are local estimates (see estimate_tokens).
+    """
+
+    def __init__(self, budgets: dict[str, CallSiteBudget]):
+        self.budgets = budgets
+        self.prompts: dict[str, dict] = {}
+
+    def fit(self, call_site: str, text: Optional[str]) -> str:
+        text = text or ""
+        budget = self.budgets[call_site]
+        tokens = estimate_tokens(text)
+        budget.calls += 1
+        budget.tokens_in += tokens
+        if budget.max_tokens > 0 and tokens > budget.max_tokens:
+            text = budget.strategy(text, budget.max_tokens)
+            budget.truncated += 1
+            tokens = estimate_tokens(text)
+        budget.tokens_kept += tokens
+        return text
+
+    def record_prompt(self, call_site: str, prompt: str) -> int:
+        tokens = estimate_tokens(prompt)
+        stats = self.prompts.setdefault(call_site, {"prompts": 0, "tokens": 0, "max_tokens": 0})
+        stats["prompts"] += 1
+        stats["tokens"] += tokens
+        stats["max_tokens"] = max(stats["max_tokens"], tokens)
+        return tokens
+
+    def stats(self) -> dict:
+        return {
+            "budgets": {
+                call_site: {
+                    "max_tokens": budget.max_tokens,
+                    "calls": budget.calls,
+                    "truncated": budget.truncated,
+                    "tokens_in": budget.tokens_in,
+                    "tokens_kept": budget.tokens_kept,
+                }
+                for call_site, budget in self.budgets.items()
+            },
+            "prompts": self.prompts,
+        }
+
+
+kg_token_budget = KGTokenBudget({
+    # Round 1 only needs title, authors, venue, year and the abstract.
+    "paper_metadata": CallSiteBudget(PROMPT_BUDGET_PAPER_METADATA, truncate_front_matter),
+    # Round 2 section summaries.
+    "section_summary": CallSiteBudget(PROMPT_BUDGET_SECTION_SUMMARY, truncate_head_tail),
+    # Drafts analysed by the agent tools.
+    "draft": CallSiteBudget(PROMPT_BUDGET_DRAFT, truncate_head_tail),
+    "draft_outline": CallSiteBudget(PROMPT_BUDGET_DRAFT, truncate_spread),
+    # Ranked KG search context given to the agent's judgement prompts.
+    "kg_context": CallSiteBudget(PROMPT_BUDGET_KG_CONTEXT, truncate_head),
+})
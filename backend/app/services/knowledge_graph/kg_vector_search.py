@@ -0,0 +1,31 @@
+from sqlalchemy import func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.kg_config import KG_HNSW_EF_SEARCH
+from app.models.knowledge_graph.ps_kg_entity import PSKgEntityDB
+
+# Entity type groups with their own partial HNSW index on content_vec
+# (migrations/008_kg_entity_vector_index.sql). A search over several groups runs
+# one query per group, since a single query can only use one partial index.
+RESEARCH_PAPER_TYPES = ("ResearchPaper",)
+PARAGRAPH_TYPES = ("Paragraph",)
+CLAIM_LIKE_TYPES = ("Claim", "Methodology", "Key Concept", "Result")
+
+
+def entity_type_clause(entity_types: tuple[str, ...]):
+    """
+    Filter on entity_type with the values inlined as SQL literals. asyncpg prepares
+    statements, and the planner can only match a partial index predicate against
+    constants, not against bound parameters of a generic plan.
+    """
+    values = [literal(entity_type, literal_execute=True) for entity_type in entity_types]
+    if len(values) == 1:
+        return PSKgEntityDB.entity_type == values[0]
+    return PSKgEntityDB.entity_type.in_(values)
+
+
+async def set_ef_search(db: AsyncSession, k: int = 0, ef_search: int = KG_HNSW_EF_SEARCH):
+    """
+    Sets hnsw.ef_search for the rest of the current transaction. An HNSW scan returns
+    at most ef_search rows, so it is never set below the number of results wanted.
+    """
+    await db.execute(select(func.set_config("hnsw.ef_search", str(max(ef_search, k)), True)))
@@ -1,25 +1,41 @@
 import uuid
+import time
 import asyncio
 import json
+import hashlib
+from collections import defaultdict
+from sqlalchemy import select, update, delete, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.file_upload.file_upload_service import FileUploadService
-from app.services.knowledge_graph.kg_helper_service import KGHelperService 
-from app.config.storage_config import bucket
+from app.services.knowledge_graph.kg_helper_service import KGHelperService
+from app.services.knowledge_graph.kg_fingerprint import content_fingerprint
+from app.services.knowledge_graph.kg_bulk_writer import KGBulkWriter
+from app.services.knowledge_graph.kg_graph_cache import kg_graph_cache
+from app.services.knowledge_graph.kg_ingestion_progress import KGIngestionProgress
+from app.services.knowledge_graph.kg_paper_resolver import kg_paper_resolver
+from app.services.knowledge_graph.kg_token_budget import estimate_tokens, kg_token_budget
+from app.services.knowledge_graph.kg_reference_parser import ReferenceList, is_reference_section, parse_reference, split_reference_entries
+from app.services.storage.storage_backend import storage_backend
+from app.services.metrics.metrics_service import kg_round_seconds, kg_paragraphs_total, kg_paragraphs_per_second
+from app.config.kg_config import (
+    KG_ROUND3_CONCURRENCY,
+    KG_ROUND3_BATCH_TOKENS,
+    KG_ROUND3_BATCH_MAX_PARAGRAPHS,
+    KG_CHECKPOINT_MIN_PARAGRAPHS,
+    KG_REFERENCE_BATCH_TOKENS,
+)
 from app.models.knowledge_graph.graph_extraction import KnowledgeGraph, Entity, Relationship 
 from app.models.knowledge_graph.paper_segement import *
 from app.models.knowledge_graph.ps_kg_entity import PSKgEntityCreate, PSKgEntityDB
 from app.models.knowledge_graph.ps_kg_relationship import PSKgRelationshipCreate, PSKgRelationshipDB
+from app.models.knowledge_graph.ps_kg_paper_index import PSKgPaperIndexDB
+from app.models.knowledge_graph.ps_kg_ingestion_checkpoint import PSKgIngestionCheckpointDB
+from app.models.file.ps_file_item import PSFileItemDB
+from app.services.knowledge_graph.kg_conversion_service import kg_conversion_service
 from pypdf import PdfReader
 import io
-import tempfile
-import os
 from typing import Optional # Ensure Optional is imported
 
-# --- UPDATED IMPORTS FOR DOCLING ---
-from docling.document_converter import DocumentConverter 
-from docling_core.types.doc.document import DoclingDocument # CORRECTED IMPORT
-# -----------------------------------
-
 
 class KGService:
     def __init__(self):
@@ -28,128 +44,617 @@ class KGService:
 
     async def construct_kg_from_files(self, file_guids: list[uuid.UUID], db: AsyncSession):
         for file_guid in file_guids:
-            file_item = await self.file_upload_service.get_file_by_guid(db, file_guid)
-            if file_item:
-                blob = bucket.blob(file_item.file_name)
-                loop = asyncio.get_running_loop()
-                file_content_bytes = await loop.run_in_executor(None, blob.download_as_bytes)
-                
-                # Pass bytes to the main processing function
-                await self.process_file_content(
-                    file_content_bytes, 
-                    file_item.mime_type, 
-                    file_guid, 
-                    db
-                )
+            await self.construct_kg_for_file(file_guid, db)
 
-    async def process_file_content(self, file_content_bytes: bytes, mime_type: str, file_guid: uuid.UUID, db: AsyncSession):
+    async def construct_kg_for_file(self, file_guid: uuid.UUID, db: AsyncSession, progress: Optional[KGIngestionProgress] = None) -> bool:
         """
-        Orchestrates the 4-round KG construction strategy from Postulate.md.
-        Uses docling for PDF processing with a pypdf fallback.
+        Downloads a single uploaded file and runs the KG pipeline on it. Returns True on success.
+        Files are identified by their SHA-256 content hash: if a KG already exists for the
+        same content, the file record is linked to it and nothing is rebuilt. A construction
+        that failed or was interrupted continues from its last checkpoint.
         """
+        progress = progress or KGIngestionProgress()
+        file_item = await self.file_upload_service.get_file_by_guid(db, file_guid)
+        if not file_item:
+            await progress.add_error(f"File {file_guid} not found.")
+            return False
+        kg_graph_cache.mark_dirty(db, file_guid)
+
+        if file_item.kg_file_guid:
+            print(f"File {file_guid} is already in the knowledge graph. Skipping.")
+            return True
+
+        if file_item.content_hash:
+            existing = await self.file_upload_service.get_ingested_file_by_hash(db, file_item.content_hash)
+            if existing:
+                return await self._link_existing_kg(file_item, existing, db)
+
+        converted = await self._fetch_and_convert(file_item, progress)
+
+        if not file_item.content_hash:
+            # Uploaded before content hashing existed; hash it now and re-check.
+            file_item.content_hash = converted.content_hash
+            existing = await self.file_upload_service.get_ingested_file_by_hash(db, file_item.content_hash)
+            if existing:
+                return await self._link_existing_kg(file_item, existing, db)
+
         print(f"Starting KG construction for file: {file_guid}")
+        if not converted.markdown:
+            print(f"File {file_guid} has no text content. Aborting.")
+            await progress.add_error("File has no text content.")
+            succeeded = False
+        else:
+            succeeded = await self._construct_from_content(converted.markdown, converted.sections, file_guid, db, progress)
+        if not succeeded:
+            # Only work since the last checkpoint is lost.
+            await db.rollback()
+        return succeeded
 
-        doc: Optional[DoclingDocument] = None
-        full_text_content = ""
-        temp_file_path = ""
+    async def _fetch_and_convert(self, file_item: PSFileItemDB, progress: KGIngestionProgress) -> ConvertedDocument:
+        """
+        Downloads and converts an uploaded file. PDFs are streamed from storage straight
+        into a conversion worker, so the API process never holds the document and
+        nothing is written to disk; the worker's peak RSS is reported to `progress`.
+        """
+        if file_item.mime_type != 'application/pdf':
+            # Served from the local blob cache when this generation was read before
+            loop = asyncio.get_running_loop()
+            file_content_bytes = await loop.run_in_executor(None, storage_backend.read_bytes, file_item.file_name)
+            return ConvertedDocument(
+                markdown=file_content_bytes.decode('utf-8'),
+                content_hash=hashlib.sha256(file_content_bytes).hexdigest(),
+                size_bytes=len(file_content_bytes)
+            )
 
-        if mime_type == 'application/pdf':
-            # docling requires a file path, so we must use a temp file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_f:
-                temp_f.write(file_content_bytes)
-                temp_file_path = temp_f.name
-            
-            try:
-                # Use docling to convert PDF to a structured object
-                print(f"Processing PDF with docling: {temp_file_path}")
-                converter = DocumentConverter()
-                
-                result = converter.convert(temp_file_path)
-                doc = result.document
-
-                # Use the markdown export from the docling document
-                full_text_content = doc.export_to_markdown() 
-                print(f"✅ Successfully processed PDF with docling. Markdown length: {len(full_text_content)}")
-            except Exception as e:
-                print(f"⚠️ Docling processing failed: {e}.")
-                
-            finally:
-                # Clean up the temp file
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
+        print(f"Streaming {file_item.file_name} into a docling conversion worker")
+        with kg_round_seconds.time(round="conversion"):
+            converted = await kg_conversion_service.convert_blob(file_item.file_name)
+        print(
+            f"✅ Converted {file_item.file_name}: {converted.size_bytes} bytes, "
+            f"markdown length {len(converted.markdown)}, "
+            f"worker peak RSS {(converted.peak_rss_bytes or 0) / 2**20:.1f} MiB"
+        )
+        await progress.set_peak_rss(converted.peak_rss_bytes)
+        return converted
+
+    async def _link_existing_kg(self, file_item: PSFileItemDB, existing: PSFileItemDB, db: AsyncSession) -> bool:
+        """Points a file record at the entity set already built for identical content."""
+        file_item.kg_file_guid = existing.kg_file_guid
+        await db.commit()
+        print(f"File {file_item.guid} has the same content as {existing.guid}; linked to its existing KG.")
+        return True
+
+    async def reingest_file(self, file_guid: uuid.UUID, db: AsyncSession, previous_file_guid: Optional[uuid.UUID] = None, progress: Optional[KGIngestionProgress] = None) -> bool:
+        """
+        Incrementally re-ingests a revised paper.
+
+        The KG to update is the file's own, or, when `previous_file_guid` is given (the
+        revision was uploaded as a new file), the previous file's KG, which the new file
+        adopts. Sections and Paragraphs are matched by content fingerprint: unchanged
+        ones are kept, only changed or new paragraphs go through Round 2/3, and stale
+        entities and relationships are retired. Falls back to a full construction when
+        there is no KG to update.
+        """
+        progress = progress or KGIngestionProgress()
+        file_item = await self.file_upload_service.get_file_by_guid(db, file_guid)
+        if not file_item:
+            await progress.add_error(f"File {file_guid} not found.")
+            return False
+
+        owner_guid = previous_file_guid or file_guid
+        # Sections, paragraphs and their relationships may be retired or re-pointed.
+        kg_graph_cache.mark_dirty(db, file_guid, owner_guid)
+        owner = file_item if owner_guid == file_guid else await self.file_upload_service.get_file_by_guid(db, owner_guid)
+        # Only a file that owns its entities can hand them over; a dedup-linked KG is shared.
+        has_own_kg = owner is not None and owner.kg_file_guid == owner.guid
+
+        converted = await self._fetch_and_convert(file_item, progress)
+        file_item.content_hash = converted.content_hash
+        full_text_content, section_chunk_list = converted.markdown, converted.sections
+        if not full_text_content:
+            await progress.add_error("File has no text content.")
+            await db.rollback()
+            return False
+
+        if has_own_kg and owner_guid != file_guid:
+            # Adopt the previous file's entities; records that pointed at them no longer do.
+            await db.execute(
+                update(PSKgEntityDB)
+                .where(PSKgEntityDB.file_guid == owner_guid)
+                .values(file_guid=file_guid)
+            )
+            await db.execute(
+                update(PSKgPaperIndexDB)
+                .where(PSKgPaperIndexDB.file_guid == owner_guid)
+                .values(file_guid=file_guid)
+            )
+            await db.execute(
+                update(PSFileItemDB)
+                .where(PSFileItemDB.kg_file_guid == owner_guid)
+                .values(kg_file_guid=None)
+            )
+        if has_own_kg:
+            # Re-ingestion is one transaction, so the marker commits with the changes.
+            file_item.kg_file_guid = file_item.guid
+            succeeded = await self._reingest_content(full_text_content, section_chunk_list, file_guid, db, progress)
         else:
-            full_text_content = file_content_bytes.decode('utf-8')
+            print(f"No existing KG to update for file {file_guid}; running a full construction.")
+            succeeded = await self._construct_from_content(full_text_content, section_chunk_list, file_guid, db, progress)
+        if not succeeded:
+            await db.rollback()
+        return succeeded
+
+    async def _reingest_content(self, full_text_content: str, section_chunk_list: Optional[SectionChunkList], file_guid: uuid.UUID, db: AsyncSession, progress: KGIngestionProgress) -> bool:
+        """Diffs the converted document against the stored Sections/Paragraphs and applies the changes."""
+        result = await db.execute(
+            select(PSKgEntityDB)
+            .where(PSKgEntityDB.file_guid == file_guid, PSKgEntityDB.entity_type == "ResearchPaper")
+            .limit(1)
+        )
+        paper_entity = result.scalar_one_or_none()
+        if not paper_entity or not section_chunk_list:
+            return await self._construct_from_content(full_text_content, section_chunk_list, file_guid, db, progress)
+
+        writer = KGBulkWriter(db)
+
+        # Round 1 is kept as-is: the paper entity does not change with its body text.
+        print("--- Re-ingest Round 2: Diffing Sections ---")
+        await progress.start_round(2)
+
+        result = await db.execute(
+            select(PSKgEntityDB)
+            .where(PSKgEntityDB.file_guid == file_guid, PSKgEntityDB.entity_type == "Section")
+        )
+        existing_sections = result.scalars().all()
+
+        result = await db.execute(
+            select(PSKgEntityDB, PSKgRelationshipDB.source_entity_guid)
+            .join(
+                PSKgRelationshipDB,
+                and_(
+                    PSKgRelationshipDB.target_entity_guid == PSKgEntityDB.guid,
+                    PSKgRelationshipDB.relationship_type == "CONTAINS_PARAGRAPH"
+                )
+            )
+            .where(
+                PSKgEntityDB.entity_type == "Paragraph",
+                PSKgRelationshipDB.source_entity_guid.in_([sec.guid for sec in existing_sections])
+            )
+        )
+        paragraph_parent = {} # {paragraph_guid: section_guid}
+        paragraphs_by_fingerprint = defaultdict(list) # {fingerprint: [paragraph_guid]}
+        for para, section_guid in result.all():
+            paragraph_parent[para.guid] = section_guid
+            if para.fingerprint:
+                paragraphs_by_fingerprint[para.fingerprint].append(para.guid)
+
+        # Pass 1: sections whose title and text are unchanged keep their entity and paragraphs.
+        sections_by_fingerprint = defaultdict(list)
+        for sec in existing_sections:
+            if sec.fingerprint:
+                sections_by_fingerprint[sec.fingerprint].append(sec)
+
+        kept_sections = set()
+        changed_sections = []
+        for section_data in section_chunk_list.sections:
+            matches = sections_by_fingerprint.get(content_fingerprint(section_data.section_title, section_data.section_text))
+            if matches:
+                kept_sections.add(matches.pop().guid)
+            else:
+                changed_sections.append(section_data)
+
+        claimed_paragraphs = {para_guid for para_guid, section_guid in paragraph_parent.items() if section_guid in kept_sections}
+        # Looked up before this run writes anything, so none of its new Citations match.
+        orphaned_citations = await self._orphaned_citations(file_guid, writer)
+
+        # Pass 2: changed or new sections get a fresh Section entity (one Round 2 call);
+        # paragraphs that still exist verbatim are re-linked instead of re-extracted.
+        with kg_round_seconds.time(round="references"):
+            references = await self._parse_reference_sections(section_chunk_list.sections)
+        paragraph_jobs = [] # [(paragraph_text, section_guid)]
+        relinked = 0
+        for section_data in changed_sections:
+            with kg_round_seconds.time(round="round_2"):
+                section_entity = await self._process_round_2(section_data, paper_entity.guid, file_guid, db, writer)
+            if not section_entity:
+                continue
+            if is_reference_section(section_data.section_title):
+                await self._write_reference_section(section_data, section_entity.guid, references, file_guid, db, writer)
+                continue
+            for para_text in await self._split_paragraphs(section_data.section_text):
+                candidates = [
+                    para_guid for para_guid in paragraphs_by_fingerprint.get(content_fingerprint(para_text), [])
+                    if para_guid not in claimed_paragraphs
+                ]
+                if candidates:
+                    claimed_paragraphs.add(candidates[0])
+                    await self.helper_service._create_relationship(
+                        db=db,
+                        writer=writer,
+                        source_guid=section_entity.guid,
+                        target_guid=candidates[0],
+                        relationship_type="CONTAINS_PARAGRAPH"
+                    )
+                    relinked += 1
+                else:
+                    paragraph_jobs.append((para_text, section_entity.guid))
 
+        # Every changed section got a new entity, so unmatched old sections are stale,
+        # along with the paragraphs nobody claimed.
+        stale_sections = [sec.guid for sec in existing_sections if sec.guid not in kept_sections]
+        stale_paragraphs = [para_guid for para_guid in paragraph_parent if para_guid not in claimed_paragraphs]
+        retired = await self._retire_entities(stale_paragraphs, stale_sections, writer, orphaned_citations)
+
+        await progress.set_paragraphs_total(len(paragraph_jobs))
+        await self._run_round_3(paragraph_jobs, file_guid, db, writer, progress, references)
+
+        await writer.commit()
+        print(f"Re-ingestion finished for file: {file_guid}. "
+              f"Sections kept: {len(kept_sections)}, rebuilt: {len(changed_sections)}. "
+              f"Paragraphs kept: {len(claimed_paragraphs) - relinked}, re-linked: {relinked}, "
+              f"re-extracted: {len(paragraph_jobs)}. Entities retired: {retired}.")
+        return True
+
+    async def _orphaned_citations(self, file_guid: uuid.UUID, writer: KGBulkWriter) -> list[uuid.UUID]:
+        """
+        Citations of the file that no Section or Paragraph links to. Re-ingestions that
+        predate the retirement of reference-list Citations left these behind.
+        """
+        has_parent = (
+            select(PSKgRelationshipDB.guid)
+            .where(PSKgRelationshipDB.target_entity_guid == PSKgEntityDB.guid)
+            .exists()
+        )
+        result = await writer.execute(
+            select(PSKgEntityDB.guid)
+            .where(
+                PSKgEntityDB.file_guid == file_guid,
+                PSKgEntityDB.entity_type == "Citation",
+                ~has_parent
+            )
+        )
+        return result.scalars().all()
+
+    async def _retire_entities(self, paragraph_guids: list[uuid.UUID], section_guids: list[uuid.UUID], writer: KGBulkWriter, citation_guids: list[uuid.UUID] = ()) -> int:
+        """
+        Deletes stale Sections and Paragraphs together with the entities extracted from
+        those paragraphs, the Citations listed by stale References sections, and every
+        relationship touching them; `citation_guids` are retired as well. Referenced
+        ResearchPaper entities are left in place. Returns the number of entities deleted.
+        """
+        retired_guids = set(paragraph_guids) | set(section_guids) | set(citation_guids)
+        if paragraph_guids:
+            result = await writer.execute(
+                select(PSKgRelationshipDB.target_entity_guid)
+                .where(PSKgRelationshipDB.source_entity_guid.in_(paragraph_guids))
+            )
+            retired_guids.update(result.scalars().all())
+        if section_guids:
+            # A changed References section is rebuilt with Citations of its own.
+            result = await writer.execute(
+                select(PSKgRelationshipDB.target_entity_guid)
+                .where(
+                    PSKgRelationshipDB.source_entity_guid.in_(section_guids),
+                    PSKgRelationshipDB.relationship_type == "CONTAINS_REFERENCE"
+                )
+            )
+            retired_guids.update(result.scalars().all())
+        if not retired_guids:
+            return 0
+
+        await writer.execute(
+            delete(PSKgRelationshipDB).where(
+                or_(
+                    PSKgRelationshipDB.source_entity_guid.in_(retired_guids),
+                    PSKgRelationshipDB.target_entity_guid.in_(retired_guids)
+                )
+            )
+        )
+        result = await writer.execute(
+            delete(PSKgEntityDB).where(
+                PSKgEntityDB.guid.in_(retired_guids),
+                PSKgEntityDB.entity_type != "ResearchPaper"
+            )
+        )
+        return result.rowcount
+
+    async def process_file_content(self, file_content_bytes: bytes, mime_type: str, file_guid: uuid.UUID, db: AsyncSession, progress: Optional[KGIngestionProgress] = None) -> bool:
+        """
+        Orchestrates the 4-round KG construction strategy from Postulate.md.
+        Uses docling for PDF processing with a pypdf fallback.
+        Reports the current round and paragraph counts to `progress`; returns False
+        if construction was aborted.
+        """
+        print(f"Starting KG construction for file: {file_guid}")
+        progress = progress or KGIngestionProgress()
+
+        full_text_content, section_chunk_list = await self._convert_content(file_content_bytes, mime_type)
         if not full_text_content:
             print(f"File {file_guid} has no text content. Aborting.")
-            return
+            await progress.add_error("File has no text content.")
+            return False
+
+        return await self._construct_from_content(full_text_content, section_chunk_list, file_guid, db, progress)
+
+    async def _convert_content(self, file_content_bytes: bytes, mime_type: str) -> tuple[str, Optional[SectionChunkList]]:
+        """Converts raw file bytes into markdown text plus the docling section structure (PDF only)."""
+        if mime_type != 'application/pdf':
+            return file_content_bytes.decode('utf-8'), None
+
+        try:
+            # Conversion runs in a warm docling worker process, off the event loop
+            print("Processing PDF with docling conversion worker")
+            converted = await kg_conversion_service.convert_pdf(file_content_bytes)
+            print(f"✅ Successfully processed PDF with docling. Markdown length: {len(converted.markdown)}")
+            return converted.markdown, converted.sections
+        except Exception as e:
+            print(f"⚠️ Docling processing failed: {e}.")
+            return "", None
+
+    async def _construct_from_content(self, full_text_content: str, section_chunk_list: Optional[SectionChunkList], file_guid: uuid.UUID, db: AsyncSession, progress: KGIngestionProgress) -> bool:
+        """
+        Runs Rounds 1-4 for a converted document, committing as it goes: once after
+        Round 1, then after each run of whole sections (their Round 2 and the Round 3
+        extraction of their paragraphs). Each commit carries the file's checkpoint row,
+        so an ingestion that fails or is interrupted resumes after the last committed
+        section instead of starting over. A run in which any section or paragraph fails
+        is not committed: construction stops there and returns False, and a resume
+        retries the run. The file is marked as ingested, and the checkpoint removed, in
+        the final commit.
+        """
+        # All rounds buffer their rows in one writer; guids are assigned client-side
+        # and rows reach the database as multi-row INSERTs.
+        writer = KGBulkWriter(db)
+        file_item = await db.get(PSFileItemDB, file_guid)
+        checkpoint = await self._load_checkpoint(file_guid, file_item.content_hash if file_item else None, db, writer)
 
         # === ROUND 1: ResearchPaper Entity ===
-        print("--- Round 1: Processing Paper Entity ---")
-        paper_entity = await self._process_round_1(full_text_content, file_guid, db)
-        if not paper_entity:
-            print(f"Failed to create main paper entity for file {file_guid}. Aborting.")
-            return
-        print(f"✅ Created ResearchPaper entity: {paper_entity.name}")
-
-        # === ROUND 2: Section Entities & Relationships ===
-        print("--- Round 2: Processing Sections ---")
-        section_chunk_list: Optional[SectionChunkList] = None
-        if doc:
-            print("Using docling document structure to extract sections...")
-            section_chunk_list = self.helper_service._get_sections_from_docling(doc)
-        
-        if not section_chunk_list:
-            print("Docling sections not available or failed.")
+        if checkpoint.paper_guid:
+            paper_guid = checkpoint.paper_guid
+            print(f"Resuming KG construction for file {file_guid} after "
+                  f"{checkpoint.sections_completed} committed section(s).")
+        else:
+            print("--- Round 1: Processing Paper Entity ---")
+            await progress.start_round(1)
+            with kg_round_seconds.time(round="round_1"):
+                paper_entity = await self._process_round_1(full_text_content, file_guid, db, writer)
+            if not paper_entity:
+                print(f"Failed to create main paper entity for file {file_guid}. Aborting.")
+                await progress.add_error("Failed to create the ResearchPaper entity.")
+                return False
+            print(f"✅ Created ResearchPaper entity: {paper_entity.name}")
+            paper_guid = paper_entity.guid
+            checkpoint.paper_guid = paper_guid
+            checkpoint.rounds_completed = 1
+            await writer.commit()
 
+        # === ROUNDS 2 & 3: Sections, then the entities of their paragraphs ===
         if not section_chunk_list:
+            print("Docling sections not available or failed.")
             print("Failed to split paper into sections. Aborting Round 2.")
-            return
-        print(f"✅ Separated ResearchPaper into {len(section_chunk_list.sections)} sections.")
-        for s in section_chunk_list.sections:
-            print(s)
-            print("\n")
-        
+            await progress.add_error("Failed to split paper into sections.")
+            return False
+        sections = section_chunk_list.sections
+        print(f"✅ Separated ResearchPaper into {len(sections)} sections.")
 
-        section_entities = {} # {section_title: (PSKgEntityDB, section_text)}
-        for section_data in section_chunk_list.sections:
-            section_entity = await self._process_round_2(section_data, paper_entity.guid, file_guid, db)
-            if section_entity:
-                section_entities[section_data.section_title] = (section_entity, section_data.section_text)
-        print(f"✅ Completed ResearchPaper section entity generation")
-
-        # === ROUND 3: Fine-grained Entities & Relationships ===
-        print("--- Round 3: Processing Paragraphs ---")
-        for section_title, (section_entity, section_text) in section_entities.items():
-            if not section_text: # Skip sections that had no text
-                continue
-                
-            print(f"Processing paragraphs for section: {section_title}")
-            # This helper now returns a SectionChunkList where each "section" is a paragraph
-            paragraph_chunks = await self.helper_service._get_text_chunks(section_text, "paragraphs")
-            
-            if not paragraph_chunks:
-                continue
+        # Reference lists are parsed locally in bulk instead of going through Round 3.
+        with kg_round_seconds.time(round="references"):
+            references = await self._parse_reference_sections(sections)
+        section_paragraphs = [
+            [] if is_reference_section(section_data.section_title) else await self._split_paragraphs(section_data.section_text)
+            for section_data in sections
+        ]
+        paragraphs_total = sum(len(paragraphs) for paragraphs in section_paragraphs)
+        await progress.set_paragraphs_total(paragraphs_total, done=checkpoint.paragraphs_completed)
+
+        for start, end in self._checkpoint_units(section_paragraphs, checkpoint.sections_completed):
+            print(f"--- Round 2: Processing sections {start + 1}-{end} of {len(sections)} ---")
+            await progress.start_round(2)
+            paragraph_jobs = [] # [(paragraph_text, section_guid)]
+            failures = 0 # sections, reference entries and paragraphs whose extraction failed
+            for index in range(start, end):
+                section_data = sections[index]
+                with kg_round_seconds.time(round="round_2"):
+                    section_entity = await self._process_round_2(section_data, paper_guid, file_guid, db, writer)
+                if not section_entity:
+                    if not self._is_short_section(section_data):
+                        await progress.add_error(f"Round 2 failed for section: {section_data.section_title}")
+                        failures += 1
+                    continue
+                if is_reference_section(section_data.section_title):
+                    failures += await self._write_reference_section(section_data, section_entity.guid, references, file_guid, db, writer)
+                    continue
+                print(f"Queueing {len(section_paragraphs[index])} paragraphs for section: {section_data.section_title}")
+                paragraph_jobs.extend((para_text, section_entity.guid) for para_text in section_paragraphs[index])
+
+            failures += await self._run_round_3(paragraph_jobs, file_guid, db, writer, progress, references)
+            if failures:
+                # Committing would count the failed items as done and a resume would never
+                # retry them; the caller rolls this run back instead.
+                print(f"{failures} extraction(s) failed in sections {start + 1}-{end}; stopping at the last checkpoint.")
+                await progress.add_error(
+                    f"Sections {start + 1}-{end}: {failures} extraction(s) failed. "
+                    f"{checkpoint.sections_completed} section(s) are committed; resume the job to retry the rest."
+                )
+                return False
 
-            # Iterate over paragraph_chunks.sections and pass the .section_text
-            for para_chunk in paragraph_chunks.sections:
-                await self._process_round_3(para_chunk.section_text, section_entity.guid, file_guid, db)
+            checkpoint.rounds_completed = 2
+            checkpoint.sections_completed = end
+            checkpoint.paragraphs_completed += sum(len(section_paragraphs[index]) for index in range(start, end))
+            await writer.commit()
+            # Paragraphs of skipped short sections count as done once committed past.
+            await progress.set_paragraphs_total(paragraphs_total, done=checkpoint.paragraphs_completed)
 
         # === ROUND 4: Handling References ===
         print("--- Round 4: Reference handling is integrated into Round 3. ---")
 
-        print(f"KG construction finished for file: {file_guid}")
-        await db.commit()
+        if file_item:
+            file_item.kg_file_guid = file_item.guid
+        await writer.execute(delete(PSKgIngestionCheckpointDB).where(PSKgIngestionCheckpointDB.file_guid == file_guid))
+        await writer.commit()
+        print(f"KG construction finished for file: {file_guid} "
+              f"({writer.entities_written} entities, {writer.relationships_written} relationships written in this run)")
+        return True
 
+    def _checkpoint_units(self, section_paragraphs: list[list[str]], sections_completed: int) -> list[tuple[int, int]]:
+        """
+        Groups the remaining sections into [start, end) runs committed together. A run
+        closes once it holds KG_CHECKPOINT_MIN_PARAGRAPHS paragraphs.
+        """
+        units = []
+        start, paragraphs = sections_completed, 0
+        for index in range(sections_completed, len(section_paragraphs)):
+            paragraphs += len(section_paragraphs[index])
+            if paragraphs >= KG_CHECKPOINT_MIN_PARAGRAPHS or index == len(section_paragraphs) - 1:
+                units.append((start, index + 1))
+                start, paragraphs = index + 1, 0
+        return units
 
-    async def _process_round_1(self, text_content: str, file_guid: uuid.UUID, db: AsyncSession) -> Optional[PSKgEntityDB]:
+    async def _load_checkpoint(self, file_guid: uuid.UUID, content_hash: Optional[str], db: AsyncSession, writer: KGBulkWriter) -> PSKgIngestionCheckpointDB:
+        """
+        Returns the file's checkpoint, or a fresh one added to the session. A checkpoint
+        left by different content is discarded together with the partial KG it describes.
+        """
+        checkpoint = await db.get(PSKgIngestionCheckpointDB, file_guid)
+        if checkpoint and checkpoint.content_hash != content_hash:
+            print(f"Checkpoint for file {file_guid} was built from different content; starting over.")
+            await self._discard_partial_kg(file_guid, writer)
+            checkpoint.content_hash = content_hash
+            checkpoint.paper_guid = None
+            checkpoint.rounds_completed = 0
+            checkpoint.sections_completed = 0
+            checkpoint.paragraphs_completed = 0
+        if not checkpoint:
+            checkpoint = PSKgIngestionCheckpointDB(
+                file_guid=file_guid,
+                content_hash=content_hash,
+                rounds_completed=0,
+                sections_completed=0,
+                paragraphs_completed=0
+            )
+            db.add(checkpoint)
+        return checkpoint
+
+    async def _discard_partial_kg(self, file_guid: uuid.UUID, writer: KGBulkWriter):
+        """
+        Deletes the entities of a file, the relationships they are the source of and its
+        paper index rows. Entities that other files' relationships point at (the file's
+        ResearchPaper, once other papers' Citations resolved to it) are kept as
+        referenced-only papers with their incoming edges, so those citations survive;
+        the next Round 1 merges them into the file's new ResearchPaper.
+        """
+        result = await writer.execute(select(PSKgEntityDB.guid).where(PSKgEntityDB.file_guid == file_guid))
+        entity_guids = result.scalars().all()
+        if entity_guids:
+            result = await writer.execute(
+                select(PSKgRelationshipDB.target_entity_guid).distinct()
+                .join(PSKgEntityDB, PSKgEntityDB.guid == PSKgRelationshipDB.source_entity_guid)
+                .where(
+                    PSKgRelationshipDB.target_entity_guid.in_(entity_guids),
+                    PSKgEntityDB.file_guid.is_distinct_from(file_guid)
+                )
+            )
+            kept_guids = set(result.scalars().all())
+            discarded_guids = [guid for guid in entity_guids if guid not in kept_guids]
+            await writer.execute(
+                delete(PSKgRelationshipDB).where(
+                    or_(
+                        PSKgRelationshipDB.source_entity_guid.in_(entity_guids),
+                        PSKgRelationshipDB.target_entity_guid.in_(discarded_guids)
+                    )
+                )
+            )
+            if discarded_guids:
+                await writer.execute(delete(PSKgEntityDB).where(PSKgEntityDB.guid.in_(discarded_guids)))
+            if kept_guids:
+                await writer.execute(
+                    update(PSKgEntityDB).where(PSKgEntityDB.guid.in_(kept_guids)).values(file_guid=None)
+                )
+                await writer.execute(
+                    update(PSKgPaperIndexDB).where(PSKgPaperIndexDB.paper_guid.in_(kept_guids)).values(file_guid=None)
+                )
+        await writer.execute(delete(PSKgPaperIndexDB).where(PSKgPaperIndexDB.file_guid == file_guid))
+
+    async def _split_paragraphs(self, section_text: Optional[str]) -> list[str]:
+        """Splits a section into the paragraph texts processed by Round 3."""
+        if not section_text: # Skip sections that had no text
+            return []
+        # This helper returns a SectionChunkList where each "section" is a paragraph
+        paragraph_chunks = await self.helper_service._get_text_chunks(section_text, "paragraphs")
+        if not paragraph_chunks:
+            return []
+        return [para_chunk.section_text for para_chunk in paragraph_chunks.sections]
+
+    async def _run_round_3(self, paragraph_jobs: list[tuple[str, uuid.UUID]], file_guid: uuid.UUID, db: AsyncSession, writer: KGBulkWriter, progress: KGIngestionProgress, references: Optional[ReferenceList] = None) -> int:
+        """
+        Runs Round 3 over (paragraph_text, section_guid) pairs. Inline citations are
+        resolved against `references`, the paper's parsed reference list, when given.
+        Returns the number of paragraphs whose extraction failed.
+        """
+        batches = self._batch_paragraph_jobs(paragraph_jobs)
+        print(f"--- Round 3: Processing {len(paragraph_jobs)} Paragraphs in {len(batches)} extraction call(s) ---")
+        await progress.start_round(3)
+        # Batches are processed concurrently (bounded by KG_ROUND3_CONCURRENCY) so the
+        # Gemini round-trips overlap. All tasks share one AsyncSession, which is not safe
+        # for concurrent use, so they only write through the writer, which holds the lock.
+        semaphore = asyncio.Semaphore(KG_ROUND3_CONCURRENCY)
+
+        async def process_batch(batch: list[tuple[str, uuid.UUID]]) -> int:
+            async with semaphore:
+                if len(batch) == 1:
+                    para_text, section_guid = batch[0]
+                    succeeded = await self._process_round_3(para_text, section_guid, file_guid, db, writer, progress, references)
+                    failed = 0 if succeeded else 1
+                else:
+                    failed = await self._process_round_3_batch(batch, file_guid, db, writer, progress, references)
+                for _ in batch:
+                    await progress.paragraph_done()
+                return failed
+
+        start = time.perf_counter()
+        failed = sum(await asyncio.gather(*(process_batch(batch) for batch in batches)))
+        elapsed = time.perf_counter() - start
+        kg_round_seconds.observe(elapsed, round="round_3")
+        kg_paragraphs_total.inc(len(paragraph_jobs))
+        if paragraph_jobs and elapsed > 0:
+            kg_paragraphs_per_second.observe(len(paragraph_jobs) / elapsed)
+        print(f"✅ Completed {len(paragraph_jobs)} paragraphs with concurrency {KG_ROUND3_CONCURRENCY} ({failed} failed)")
+        return failed
+
+    def _batch_paragraph_jobs(self, paragraph_jobs: list[tuple[str, uuid.UUID]]) -> list[list[tuple[str, uuid.UUID]]]:
+        """
+        Packs consecutive paragraphs of the same section into batches of at most
+        KG_ROUND3_BATCH_TOKENS estimated tokens and KG_ROUND3_BATCH_MAX_PARAGRAPHS
+        paragraphs. A paragraph over the budget on its own gets a batch of one.
+        """
+        if KG_ROUND3_BATCH_TOKENS <= 0:
+            return [[job] for job in paragraph_jobs]
+
+        batches, batch, batch_tokens = [], [], 0
+        for job in paragraph_jobs:
+            tokens = estimate_tokens(job[0])
+            if batch and (
+                job[1] != batch[0][1]
+                or batch_tokens + tokens > KG_ROUND3_BATCH_TOKENS
+                or len(batch) >= KG_ROUND3_BATCH_MAX_PARAGRAPHS
+            ):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(job)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def _process_round_1(self, text_content: str, file_guid: uuid.UUID, db: AsyncSession, writer: Optional[KGBulkWriter] = None) -> Optional[PSKgEntityDB]:
         """Executes Round 1: Create ResearchPaper Entity"""
+        # The metadata and abstract are in the front matter; the rest of the paper is not sent.
         prompt = f"""
         Extract the metadata from the following research paper.
         Generate a concise summary of the research in 50 words.
 
         Text:
-        {text_content} 
+        {kg_token_budget.fit("paper_metadata", text_content)} 
         """
         try:
             details = await self.helper_service._generate_structured_content(prompt, PaperDetails)
@@ -166,21 +671,27 @@ class KGService:
             
             entity = await self.helper_service._create_entity(
                 db=db,
+                writer=writer,
                 entity_type="ResearchPaper",
                 file_guid=file_guid,
                 content=content,
                 name=details.title
             )
+            if entity:
+                # Citations of this paper, past and future, resolve to the ingested entity.
+                await kg_paper_resolver.register_ingested_paper(
+                    entity.guid, file_guid, details.title, details.authors, details.year, db, writer
+                )
             return entity
         except Exception as e:
             print(f"Error in Round 1: {e}")
             return None
 
-    async def _process_round_2(self, section_data: SectionChunk, paper_guid: uuid.UUID, file_guid: uuid.UUID, db: AsyncSession) -> Optional[PSKgEntityDB]:
+    async def _process_round_2(self, section_data: SectionChunk, paper_guid: uuid.UUID, file_guid: uuid.UUID, db: AsyncSession, writer: Optional[KGBulkWriter] = None) -> Optional[PSKgEntityDB]:
         """Executes Round 2: Create Section Entity and Relationship"""
         
         # Check if section_text is empty or too short
-        if not section_data.section_text or len(section_data.section_text) < 50:
+        if self._is_short_section(section_data):
             print(f"Skipping empty or short section: {section_data.section_title}")
             return None
 
@@ -188,7 +699,7 @@ class KGService:
         Summarize the following section of a research paper titled '{section_data.section_title}'.
         
         Text:
-        {section_data.section_text[:8000]}
+        {kg_token_budget.fit("section_summary", section_data.section_text)}
         """
         try:
             summary = await self.helper_service._generate_structured_content(prompt, SectionSummary)
@@ -197,13 +708,16 @@ class KGService:
 
             entity = await self.helper_service._create_entity(
                 db=db,
+                writer=writer,
                 entity_type="Section",
                 file_guid=file_guid,
                 content=summary.summary,
-                name=section_data.section_title
+                name=section_data.section_title,
+                fingerprint=content_fingerprint(section_data.section_title, section_data.section_text)
             )
             await self.helper_service._create_relationship(
                 db=db,
+                writer=writer,
                 source_guid=paper_guid,
                 target_guid=entity.guid,
                 relationship_type="HAS_SECTION"
@@ -213,28 +727,71 @@ class KGService:
             print(f"Error in Round 2 for section '{section_data.section_title}': {e}")
             return None
 
-    async def _process_round_3(self, para_text: str, section_guid: uuid.UUID, file_guid: uuid.UUID, db: AsyncSession):
-        """Executes Round 3: Create Paragraph, Classified Entities, and Relationships"""
+    def _is_short_section(self, section_data: SectionChunk) -> bool:
+        """Sections Round 2 skips on purpose (as opposed to failing on them)."""
+        return not section_data.section_text or len(section_data.section_text) < 50
+
+    async def _process_round_3(self, para_text: str, section_guid: uuid.UUID, file_guid: uuid.UUID, db: AsyncSession, writer: Optional[KGBulkWriter] = None, progress: Optional[KGIngestionProgress] = None, references: Optional[ReferenceList] = None):
+        """
+        Executes Round 3: Create Paragraph, Classified Entities, and Relationships.
+        Runs concurrently with other paragraphs, so all rows go through the shared writer.
+        Returns False if the extraction failed; the paragraph is still written without
+        classified entities when only the LLM call failed.
+        """
         try:
-            # 1. Create Paragraph Entity
-            para_entity = await self.helper_service._create_entity(
-                db=db,
-                entity_type="Paragraph",
-                file_guid=file_guid,
-                content=para_text,
-                name=f"Paragraph {str(uuid.uuid4())[:8]}"
-            )
+            analysis = await self._analyze_paragraph(para_text)
+            await self._write_paragraph(para_text, section_guid, analysis, file_guid, db, writer, references)
+        except Exception as e:
+            print(f"Error in Round 3 for paragraph: {e}")
+            if progress:
+                await progress.add_error(f"Round 3: {e}")
+            return False
+        if analysis is None:
+            print("Round 3 extraction returned no result for paragraph.")
+            if progress:
+                await progress.add_error("Round 3: extraction returned no result for a paragraph.")
+            return False
+        return True
 
-            # 2. Create (Section)-[CONTAINS_PARAGRAPH]->(Paragraph) relationship
-            await self.helper_service._create_relationship(
-                db=db,
-                source_guid=section_guid,
-                target_guid=para_entity.guid,
-                relationship_type="CONTAINS_PARAGRAPH"
-            )
+    async def _process_round_3_batch(self, batch: list[tuple[str, uuid.UUID]], file_guid: uuid.UUID, db: AsyncSession, writer: Optional[KGBulkWriter] = None, progress: Optional[KGIngestionProgress] = None, references: Optional[ReferenceList] = None):
+        """
+        Executes Round 3 for several paragraphs of one section with a single extraction
+        call. Paragraphs the batched response left out are extracted individually.
+        Returns the number of paragraphs whose extraction failed.
+        """
+        para_texts = [para_text for para_text, _ in batch]
+        try:
+            analyses = await self._analyze_paragraph_batch(para_texts)
+        except Exception as e:
+            print(f"Error in batched Round 3 extraction: {e}")
+            analyses = {}
 
-            # 3. Classify, create classified entities and relationships
-            prompt = f"""
+        async def write(index: int, para_text: str, section_guid: uuid.UUID) -> bool:
+            try:
+                analysis = analyses.get(index)
+                if analysis is None:
+                    analysis = await self._analyze_paragraph(para_text)
+                await self._write_paragraph(para_text, section_guid, analysis, file_guid, db, writer, references)
+            except Exception as e:
+                print(f"Error in Round 3 for paragraph: {e}")
+                if progress:
+                    await progress.add_error(f"Round 3: {e}")
+                return False
+            if analysis is None:
+                print("Round 3 extraction returned no result for paragraph.")
+                if progress:
+                    await progress.add_error("Round 3: extraction returned no result for a paragraph.")
+                return False
+            return True
+
+        results = await asyncio.gather(*(
+            write(index, para_text, section_guid) for index, (para_text, section_guid) in enumerate(batch)
+        ))
+        return results.count(False)
+
+    async def _analyze_paragraph(self, para_text: str) -> Optional[ParagraphAnalysis]:
+        """Classifies the entities of one paragraph."""
+        prompt = f"""
             Analyze the following paragraph and extract all key entities and their relationships to the paragraph.
             The paragraph text is: "{para_text}"
 
@@ -246,54 +803,205 @@ class KGService:
 
 
             """
-            analysis = await self.helper_service._generate_structured_content(prompt, ParagraphAnalysis)
-            if not analysis:
-                return
-            
-            for classified in analysis.classified_entities:
-                if classified.entity_type == "Citation":
-                    # --- Inline Round 4 ---
-                    citation_entity = await self._get_or_create_citation_and_paper(
-                        citation_text=classified.content,
-                        file_guid=file_guid, # The file_guid of the *citing* paper
-                        db=db
-                    )
-                    if citation_entity:
-                        await self.helper_service._create_relationship(
-                            db=db,
-                            source_guid=para_entity.guid,
-                            target_guid=citation_entity.guid,
-                            relationship_type="CITES"
-                        )
-                else:
-                    # Create the classified entity (e.g., Claim, Methodology)
-                    classified_entity = await self.helper_service._create_entity(
-                        db=db,
-                        entity_type=classified.entity_type,
-                        file_guid=file_guid,
-                        content=para_text,
-                        name=classified.name
-                    )
-                    # Create (Paragraph)-[REL]->(Classified_Entity)
+        return await self.helper_service._generate_structured_content(prompt, ParagraphAnalysis)
+
+    async def _analyze_paragraph_batch(self, para_texts: list[str]) -> dict[int, ParagraphAnalysis]:
+        """
+        Classifies the entities of several paragraphs in one call. The instructions and
+        type lists are sent once; results come back keyed by paragraph index. Indexes
+        missing from the response are absent from the returned dict.
+        """
+        paragraphs = "\n\n".join(
+            f'[Paragraph {index}]\n"{para_text}"' for index, para_text in enumerate(para_texts)
+        )
+        prompt = f"""
+            Analyze each of the following paragraphs independently and extract all key entities and their relationships to that paragraph.
+            Return one entry per paragraph, with paragraph_index set to the number in its [Paragraph N] header.
+            Do not merge or move entities between paragraphs.
+
+            Valid Entity Types: {list(ENTITY_TYPES.__args__)}
+            Valid Relationship Types: {list(RELATIONSHIP_TYPES.__args__)}
+
+            Select an entity and relationship type from the list above that matches your analysis. 
+            Provide a short name to the entity. 
+
+            {paragraphs}
+            """
+        batch_analysis = await self.helper_service._generate_structured_content(prompt, ParagraphBatchAnalysis)
+        if not batch_analysis:
+            return {}
+
+        analyses: dict[int, ParagraphAnalysis] = {}
+        for entry in batch_analysis.paragraphs:
+            if not 0 <= entry.paragraph_index < len(para_texts):
+                continue
+            analysis = analyses.setdefault(entry.paragraph_index, ParagraphAnalysis(classified_entities=[]))
+            analysis.classified_entities.extend(entry.classified_entities)
+        return analyses
+
+    async def _write_paragraph(self, para_text: str, section_guid: uuid.UUID, analysis: Optional[ParagraphAnalysis], file_guid: uuid.UUID, db: AsyncSession, writer: Optional[KGBulkWriter] = None, references: Optional[ReferenceList] = None):
+        """Creates the Paragraph entity and the entities and relationships classified from it."""
+        # 1. Create Paragraph Entity
+        para_entity = await self.helper_service._create_entity(
+            db=db,
+            writer=writer,
+            entity_type="Paragraph",
+            file_guid=file_guid,
+            content=para_text,
+            name=f"Paragraph {str(uuid.uuid4())[:8]}",
+            fingerprint=content_fingerprint(para_text)
+        )
+
+        # 2. Create (Section)-[CONTAINS_PARAGRAPH]->(Paragraph) relationship
+        await self.helper_service._create_relationship(
+            db=db,
+            writer=writer,
+            source_guid=section_guid,
+            target_guid=para_entity.guid,
+            relationship_type="CONTAINS_PARAGRAPH"
+        )
+
+        # 3. Create classified entities and relationships
+        if not analysis:
+            return
+
+        for classified in analysis.classified_entities:
+            if classified.entity_type == "Citation":
+                # --- Inline Round 4 ---
+                citation_entity = await self._get_or_create_citation_and_paper(
+                    citation_text=classified.content,
+                    file_guid=file_guid, # The file_guid of the *citing* paper
+                    db=db,
+                    writer=writer,
+                    references=references
+                )
+                if citation_entity:
                     await self.helper_service._create_relationship(
                         db=db,
+                        writer=writer,
                         source_guid=para_entity.guid,
-                        target_guid=classified_entity.guid,
-                        relationship_type=classified.relationship_type
+                        target_guid=citation_entity.guid,
+                        relationship_type="CITES"
                     )
+            else:
+                # Create the classified entity (e.g., Claim, Methodology)
+                classified_entity = await self.helper_service._create_entity(
+                    db=db,
+                    writer=writer,
+                    entity_type=classified.entity_type,
+                    file_guid=file_guid,
+                    content=para_text,
+                    name=classified.name
+                )
+                # Create (Paragraph)-[REL]->(Classified_Entity)
+                await self.helper_service._create_relationship(
+                    db=db,
+                    writer=writer,
+                    source_guid=para_entity.guid,
+                    target_guid=classified_entity.guid,
+                    relationship_type=classified.relationship_type
+                )
 
-        except Exception as e:
-            print(f"Error in Round 3 for paragraph: {e}")
+    async def _parse_reference_sections(self, sections: list[SectionChunk]) -> ReferenceList:
+        """
+        Parses every entry of the paper's reference sections. Entries are parsed by rule
+        (numeric and author-year styles); those that fail go to Gemini together, in as
+        few ReferenceDetailsBatch calls as KG_REFERENCE_BATCH_TOKENS allows.
+        """
+        references = ReferenceList()
+        entries = [
+            entry
+            for section_data in sections if is_reference_section(section_data.section_title)
+            for entry in split_reference_entries(section_data.section_text)
+        ]
+        if not entries:
+            return references
+
+        parsed = [parse_reference(entry) for entry in entries]
+        unparsed = [index for index, details in enumerate(parsed) if details is None]
+        print(f"Parsed {len(entries) - len(unparsed)}/{len(entries)} reference entries locally.")
+
+        batch, batch_tokens = [], 0
+        for index in unparsed + [None]:
+            tokens = estimate_tokens(entries[index]) if index is not None else 0
+            if batch and (index is None or batch_tokens + tokens > KG_REFERENCE_BATCH_TOKENS):
+                llm_details = await self._parse_references_with_llm([entries[i] for i in batch])
+                for position, entry_index in enumerate(batch):
+                    parsed[entry_index] = llm_details.get(position)
+                batch, batch_tokens = [], 0
+            if index is not None:
+                batch.append(index)
+                batch_tokens += tokens
+
+        for entry, details in zip(entries, parsed):
+            references.add(entry, details)
+        return references
+
+    async def _parse_references_with_llm(self, entries: list[str]) -> dict[int, ReferenceDetails]:
+        """Parses several reference entries in one call; returns details keyed by position."""
+        numbered = "\n".join(f"[Reference {index}] {entry}" for index, entry in enumerate(entries))
+        prompt = f"""
+            Parse each of the following reference-list entries and extract the referenced paper's details:
+            its title, authors, publication venue if available, and year of publication.
+            Return one entry per reference, with reference_index set to the number in its [Reference N] header.
+
+            {numbered}
+            """
+        batch = await self.helper_service._generate_structured_content(prompt, ReferenceDetailsBatch)
+        if not batch:
+            return {}
+        return {
+            entry.reference_index: ReferenceDetails(**entry.dict(exclude={"reference_index"}))
+            for entry in batch.references
+            if 0 <= entry.reference_index < len(entries)
+        }
+
+    async def _write_reference_section(self, section_data: SectionChunk, section_guid: uuid.UUID, references: ReferenceList, file_guid: uuid.UUID, db: AsyncSession, writer: KGBulkWriter) -> int:
+        """
+        Creates a Citation entity per reference-list entry, linked from the References
+        Section and to the resolved ResearchPaper, using the already parsed details.
+        Returns the number of entries that could not be written.
+        """
+        semaphore = asyncio.Semaphore(KG_ROUND3_CONCURRENCY)
+
+        async def write_entry(entry: str) -> bool:
+            async with semaphore:
+                details = references.details_for_entry(entry)
+                citation_entity = await self._get_or_create_citation_and_paper(
+                    citation_text=entry,
+                    file_guid=file_guid,
+                    db=db,
+                    writer=writer,
+                    details=details
+                )
+                if not citation_entity:
+                    return False
+                await self.helper_service._create_relationship(
+                    db=db,
+                    writer=writer,
+                    source_guid=section_guid,
+                    target_guid=citation_entity.guid,
+                    relationship_type="CONTAINS_REFERENCE"
+                )
+                return True
+
+        entries = split_reference_entries(section_data.section_text)
+        print(f"Writing {len(entries)} reference entries for section: {section_data.section_title}")
+        results = await asyncio.gather(*(write_entry(entry) for entry in entries))
+        return results.count(False)
 
-    async def _get_or_create_citation_and_paper(self, citation_text: str, file_guid: uuid.UUID, db: AsyncSession) -> Optional[PSKgEntityDB]:
+    async def _get_or_create_citation_and_paper(self, citation_text: str, file_guid: uuid.UUID, db: AsyncSession, writer: Optional[KGBulkWriter] = None, references: Optional[ReferenceList] = None, details: Optional[ReferenceDetails] = None) -> Optional[PSKgEntityDB]:
         """
-        Executes Round 4: Creates Citation entity, parses it, and creates 
-        the referenced ResearchPaper entity (if it doesn't exist).
+        Executes Round 4: Creates Citation entity, parses it, and resolves the
+        referenced ResearchPaper to its canonical entity (created if no match exists).
+        The reference is looked up in the paper's parsed reference list, or parsed by
+        rule; only citations neither can handle cost an LLM call.
         """
         try:
             # 1. Create Citation entity
             citation_entity = await self.helper_service._create_entity(
                 db=db,
+                writer=writer,
                 entity_type="Citation",
                 file_guid=file_guid,
                 content=citation_text,
@@ -301,7 +1009,10 @@ class KGService:
             )
 
             # 2. Parse the citation text to get details for the referenced paper
-            prompt = f"""
+            if details is None:
+                details = references.lookup(citation_text) if references else parse_reference(citation_text)
+            if details is None:
+                prompt = f"""
             Parse the following citation text and extract the reference paper details. 
             Extract the title of the reference paper.
             Extract the authors of the reference paper. 
@@ -310,32 +1021,29 @@ class KGService:
 
             Citation: "{citation_text}"
             """
-            details = await self.helper_service._generate_structured_content(prompt, ReferenceDetails)
+                details = await self.helper_service._generate_structured_content(prompt, ReferenceDetails)
             if not details:
                 return citation_entity # Return the citation entity even if parsing fails
 
-            # 3. Create referenced ResearchPaper entity
+            # 3. Resolve the referenced ResearchPaper entity
             content = (
                 f"Title: {details.title}\n"
                 f"Authors: {', '.join(details.authors)}\n"
                 f"Venue: {details.publication_venue}\n"
                 f"Year: {details.year}"
             )
-            # Note: This creates a new paper entity for every citation.
-            # A more robust system would check if this paper_entity already exists.
-            referenced_paper = await self.helper_service._create_entity(
-                db=db,
-                entity_type="ResearchPaper",
-                file_guid=None, # This paper is *referenced*, it doesn't have a file_guid in our system
-                content=content,
-                name=details.title
+            referenced_paper_guid = await kg_paper_resolver.resolve_cited_paper(
+                details.title, details.authors, details.year, content, db, writer
             )
+            if not referenced_paper_guid:
+                return citation_entity
 
             # 4. Create (Citation)-[REFERENCES]->(ResearchPaper) relationship
             await self.helper_service._create_relationship(
                 db=db,
+                writer=writer,
                 source_guid=citation_entity.guid,
-                target_guid=referenced_paper.guid,
+                target_guid=referenced_paper_guid,
                 relationship_type="REFERENCES"
             )
             
@@ -0,0 +1,318 @@
+import time
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+# Route template of the HTTP request being served ("background" outside requests);
+# set by MetricsMiddleware and used to label database queries.
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="background")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LONG_LATENCY_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250)
+RATE_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: tuple[str, ...], values: tuple, extra: Optional[tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    """A metric family with fixed label names. Updates take a short lock, so threads may record too."""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        ...
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class CollectedMetric(Metric):
+    """A metric whose values are read from a callback at scrape time."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), collect: Optional[Callable[[], dict]] = None):
+        super().__init__(name, documentation, labelnames)
+        # Returns {label value tuple: value}
+        self.collect = collect or (lambda: {})
+
+    def samples(self) -> list[str]:
+        try:
+            values = self.collect()
+        except Exception as e:
+            print(f"Error collecting metric {self.name}: {e}")
+            return []
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values.items() if value is not None
+        ]
+
+
+class Gauge(CollectedMetric):
+    """A value that can go up and down, read at scrape time."""
+    kind = "gauge"
+
+
+class CollectedCounter(CollectedMetric):
+    """
+    A counter kept by a service (e.g. its stats()) and read at scrape time. The
+    callback must only ever return growing values; by convention the name ends in _total.
+    """
+    kind = "counter"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: dict[tuple, list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+                    break
+            entry[-2] += value
+            entry[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = [(key, list(entry)) for key, entry in self._values.items()]
+        lines = []
+        for key, entry in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(entry[-2])}")
+            lines.append(f"{self.name}_count{labels} {entry[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), collect: Optional[Callable[[], dict]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, collect))
+
+    def collected_counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), collect: Optional[Callable[[], dict]] = None) -> CollectedCounter:
+        return self.register(CollectedCounter(name, documentation, labelnames, collect))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+# Ingestion
+kg_round_seconds = metrics_registry.histogram(
+    "kg_ingestion_round_seconds", "Duration of one KG ingestion step (conversion, round_1, round_2 per section, round_3 per run).",
+    ("round",), LONG_LATENCY_BUCKETS
+)
+kg_paragraphs_total = metrics_registry.counter(
+    "kg_ingestion_paragraphs_total", "Paragraphs processed by Round 3."
+)
+kg_paragraphs_per_second = metrics_registry.histogram(
+    "kg_ingestion_paragraphs_per_second", "Round 3 throughput per run.", (), RATE_BUCKETS
+)
+
+# LLM
+llm_calls_total = metrics_registry.counter(
+    "llm_calls_total", "Structured LLM calls by call site and outcome (ok, cached, error).", ("call_site", "outcome")
+)
+llm_prompt_tokens_total = metrics_registry.counter(
+    "llm_prompt_tokens_total", "Prompt tokens of uncached LLM calls, as reported by Vertex AI.", ("call_site",)
+)
+llm_output_tokens_total = metrics_registry.counter(
+    "llm_output_tokens_total", "Output tokens of uncached LLM calls, as reported by Vertex AI.", ("call_site",)
+)
+llm_latency_seconds = metrics_registry.histogram(
+    "llm_latency_seconds", "Latency of uncached LLM calls, including rate-limit waits and retries.", ("call_site",)
+)
+
+# Embeddings
+embedding_batch_size = metrics_registry.histogram(
+    "embedding_batch_texts", "Texts per batched embedding request.", (), SIZE_BUCKETS
+)
+embedding_batch_seconds = metrics_registry.histogram(
+    "embedding_batch_seconds", "Latency of batched embedding requests.", ("outcome",)
+)
+
+# Database
+db_queries_total = metrics_registry.counter(
+    "db_queries_total", "Database statements executed, by HTTP endpoint.", ("endpoint",)
+)
+db_query_errors_total = metrics_registry.counter(
+    "db_query_errors_total", "Database statements that raised, by HTTP endpoint.", ("endpoint",)
+)
+db_query_seconds = metrics_registry.histogram(
+    "db_query_seconds", "Database statement latency, by HTTP endpoint.", ("endpoint",)
+)
+
+# HTTP
+http_request_seconds = metrics_registry.histogram(
+    "http_request_seconds", "HTTP request latency until the response body is sent.", ("method", "endpoint", "status")
+)
+
+# Search
+search_phase_seconds = metrics_registry.histogram(
+    "search_phase_seconds", "Search latency by search kind and phase.", ("search", "phase")
+)
+
+
+class PhaseTimer:
+    """Records consecutive phases of one search: each mark() observes the time since the previous one."""
+
+    def __init__(self, search: str):
+        self.search = search
+        self._last = time.perf_counter()
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        search_phase_seconds.observe(now - self._last, search=self.search, phase=phase)
+        self._last = now
+
+
+def instrument_engine(engine):
+    """Records statement counts and latencies for a (sync or async) SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_query_start")
+        if not starts:
+            return
+        endpoint = current_endpoint.get()
+        db_queries_total.inc(endpoint=endpoint)
+        db_query_seconds.observe(time.perf_counter() - starts.pop(), endpoint=endpoint)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        starts = conn.info.get("metrics_query_start") if conn is not None else None
+        if starts:
+            starts.pop()
+        db_query_errors_total.inc(endpoint=current_endpoint.get())
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that times HTTP requests and labels the work they do (database
+    statements) with the matched route template, e.g. "/ps/kg/jobs/{job_guid}".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _route_template(self, scope) -> str:
+        from starlette.routing import Match
+
+        router = scope["app"].router if "app" in scope else None
+        for route in getattr(router, "routes", []):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", "unmatched")
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        endpoint = self._route_template(scope)
+        token = current_endpoint.set(endpoint)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_request_seconds.observe(
+                time.perf_counter() - start, method=scope["method"], endpoint=endpoint, status=status["code"]
+            )
+            current_endpoint.reset(token)
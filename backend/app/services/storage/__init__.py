@@ -0,0 +1 @@
+from .storage_backend import *
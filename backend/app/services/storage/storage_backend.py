@@ -0,0 +1,347 @@
+import io
+import os
+import shutil
+import hashlib
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+from pydantic import BaseModel
+from app.config.storage_config import (
+    STORAGE_BACKEND,
+    BUCKET_NAME,
+    LOCAL_STORAGE_DIR,
+    STORAGE_CACHE_DIR,
+    STORAGE_CACHE_MAX_BYTES,
+    DOWNLOAD_CHUNK_BYTES,
+)
+
+
+class BlobInfo(BaseModel):
+    """Metadata of a stored object. `generation` changes whenever the object is rewritten."""
+    name: str
+    size: int
+    etag: str
+    generation: str
+    content_type: Optional[str] = None
+
+
+class StorageBackend(ABC):
+    """
+    Interface for the object store holding uploaded files. Methods block; async
+    callers run them in a worker thread. Passing the BlobInfo from `stat` to a read
+    pins it to that generation of the object.
+    """
+
+    @abstractmethod
+    def url(self, name: str) -> str:
+        ...
+
+    @abstractmethod
+    def upload(self, file_obj: BinaryIO, name: str, content_type: Optional[str] = None, size: Optional[int] = None, chunk_size: Optional[int] = None):
+        ...
+
+    @abstractmethod
+    def stat(self, name: str) -> Optional[BlobInfo]:
+        """Returns the object's metadata, or None if it does not exist."""
+        ...
+
+    @abstractmethod
+    def list_blobs(self, prefix: str = "") -> Iterator[BlobInfo]:
+        """Yields the metadata of every object whose name starts with prefix."""
+        ...
+
+    @abstractmethod
+    def iter_range(self, name: str, start: int, end: int, info: Optional[BlobInfo] = None, chunk_size: int = DOWNLOAD_CHUNK_BYTES) -> Iterator[bytes]:
+        """Yields bytes [start, end] (inclusive) of the object in chunks of at most chunk_size."""
+        ...
+
+    @abstractmethod
+    def download_to_file(self, name: str, file_obj: BinaryIO, info: Optional[BlobInfo] = None, chunk_size: Optional[int] = None):
+        ...
+
+    def read_bytes(self, name: str, info: Optional[BlobInfo] = None) -> bytes:
+        buffer = io.BytesIO()
+        self.download_to_file(name, buffer, info)
+        return buffer.getvalue()
+
+
+class GCSStorageBackend(StorageBackend):
+    """Google Cloud Storage bucket. The client is created on first use."""
+
+    def __init__(self, bucket_name: str):
+        self.bucket_name = bucket_name
+        self._bucket = None
+
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            from google.cloud import storage
+            # The client handles authentication automatically.
+            self._bucket = storage.Client().bucket(self.bucket_name)
+        return self._bucket
+
+    def _blob(self, name: str, info: Optional[BlobInfo] = None, chunk_size: Optional[int] = None):
+        generation = int(info.generation) if info else None
+        return self.bucket.blob(name, chunk_size=chunk_size, generation=generation)
+
+    def url(self, name: str) -> str:
+        return f"gs://{self.bucket_name}/{name}"
+
+    def upload(self, file_obj: BinaryIO, name: str, content_type: Optional[str] = None, size: Optional[int] = None, chunk_size: Optional[int] = None):
+        # With a chunk_size the upload is resumable, so a failed chunk is retried alone
+        self._blob(name, chunk_size=chunk_size).upload_from_file(file_obj, content_type=content_type, size=size)
+
+    def _info(self, blob) -> BlobInfo:
+        return BlobInfo(
+            name=blob.name,
+            size=blob.size or 0,
+            etag=blob.etag,
+            generation=str(blob.generation),
+            content_type=blob.content_type
+        )
+
+    def stat(self, name: str) -> Optional[BlobInfo]:
+        blob = self.bucket.get_blob(name)
+        if blob is None:
+            return None
+        return self._info(blob)
+
+    def list_blobs(self, prefix: str = "") -> Iterator[BlobInfo]:
+        for blob in self.bucket.list_blobs(prefix=prefix):
+            if not blob.name.endswith("/"):  # skip folder placeholders
+                yield self._info(blob)
+
+    def iter_range(self, name: str, start: int, end: int, info: Optional[BlobInfo] = None, chunk_size: int = DOWNLOAD_CHUNK_BYTES) -> Iterator[bytes]:
+        blob = self._blob(name, info)
+        position = start
+        while position <= end:
+            chunk = blob.download_as_bytes(start=position, end=min(position + chunk_size, end + 1) - 1)
+            if not chunk:
+                return
+            position += len(chunk)
+            yield chunk
+
+    def download_to_file(self, name: str, file_obj: BinaryIO, info: Optional[BlobInfo] = None, chunk_size: Optional[int] = None):
+        self._blob(name, info, chunk_size=chunk_size).download_to_file(file_obj)
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Objects stored as files under a local directory, for running without a cloud
+    bucket. The generation is the file's modification time in nanoseconds.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, name: str) -> Path:
+        path = (self.root / name).resolve()
+        if not path.is_relative_to(self.root) or path == self.root:
+            raise ValueError(f"Invalid object name: {name!r}")
+        return path
+
+    def url(self, name: str) -> str:
+        return self._path(name).as_uri()
+
+    def upload(self, file_obj: BinaryIO, name: str, content_type: Optional[str] = None, size: Optional[int] = None, chunk_size: Optional[int] = None):
+        path = self._path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written to a temp file and renamed, so readers never see a partial object
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                shutil.copyfileobj(file_obj, out, chunk_size or DOWNLOAD_CHUNK_BYTES)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def stat(self, name: str) -> Optional[BlobInfo]:
+        try:
+            st = self._path(name).stat()
+        except FileNotFoundError:
+            return None
+        return BlobInfo(name=name, size=st.st_size, etag=f"{st.st_mtime_ns:x}-{st.st_size:x}", generation=str(st.st_mtime_ns))
+
+    def list_blobs(self, prefix: str = "") -> Iterator[BlobInfo]:
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for filename in sorted(filenames):
+                if filename.startswith("."):  # in-progress uploads
+                    continue
+                name = Path(dirpath, filename).relative_to(self.root).as_posix()
+                if name.startswith(prefix):
+                    info = self.stat(name)
+                    if info:
+                        yield info
+
+    def iter_range(self, name: str, start: int, end: int, info: Optional[BlobInfo] = None, chunk_size: int = DOWNLOAD_CHUNK_BYTES) -> Iterator[bytes]:
+        with open(self._path(name), "rb") as f:
+            yield from _iter_file_range(f, start, end, chunk_size)
+
+    def download_to_file(self, name: str, file_obj: BinaryIO, info: Optional[BlobInfo] = None, chunk_size: Optional[int] = None):
+        with open(self._path(name), "rb") as f:
+            shutil.copyfileobj(f, file_obj, chunk_size or DOWNLOAD_CHUNK_BYTES)
+
+
+def _iter_file_range(f: BinaryIO, start: int, end: int, chunk_size: int) -> Iterator[bytes]:
+    f.seek(start)
+    remaining = end - start + 1
+    while remaining > 0:
+        chunk = f.read(min(chunk_size, remaining))
+        if not chunk:
+            return
+        remaining -= len(chunk)
+        yield chunk
+
+
+class CachedStorageBackend(StorageBackend):
+    """
+    Size-bounded, on-disk read-through cache in front of a remote backend.
+
+    Cached files are keyed by object name and generation, so a rewritten object is
+    never served stale; the old entry just ages out. Least recently used files are
+    evicted once the directory exceeds max_bytes. The directory can be shared by
+    several processes (API and conversion workers): entries are written to a temp
+    file and renamed into place, and eviction works from the directory listing.
+    Range reads that miss stream from the remote backend while the object is cached
+    in the background, so the first download is not delayed by the fill.
+    """
+
+    def __init__(self, inner: StorageBackend, cache_dir: str, max_bytes: int):
+        self.inner = inner
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._filling: set[str] = set()
+
+    def _cache_path(self, info: BlobInfo) -> Path:
+        key = hashlib.sha256(f"{info.name}\x1f{info.generation}".encode("utf-8")).hexdigest()
+        return self.cache_dir / key
+
+    def _cached(self, info: BlobInfo) -> Optional[Path]:
+        path = self._cache_path(info)
+        try:
+            os.utime(path)  # marks the entry as recently used
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def _fill(self, info: BlobInfo, chunk_size: Optional[int] = None) -> Path:
+        """Downloads the pinned generation into the cache, chunk_size bytes per request, and returns its path."""
+        path = self._cache_path(info)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".fill-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                self.inner.download_to_file(info.name, out, info, chunk_size)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self._evict(keep=path)
+        return path
+
+    def _fill_in_background(self, info: BlobInfo, chunk_size: Optional[int] = None):
+        key = self._cache_path(info).name
+        with self._lock:
+            if key in self._filling:
+                return
+            self._filling.add(key)
+
+        def fill():
+            try:
+                self._fill(info, chunk_size)
+            except Exception as e:
+                print(f"Error caching {info.name}: {e}")
+            finally:
+                with self._lock:
+                    self._filling.discard(key)
+
+        threading.Thread(target=fill, daemon=True).start()
+
+    def _evict(self, keep: Optional[Path] = None):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            st = entry.stat()
+            entries.append((st.st_mtime, entry.path, st.st_size))
+            total += st.st_size
+        entries.sort()
+        for _, path, size in entries:
+            if total <= self.max_bytes:
+                break
+            if keep and path == str(keep):
+                continue
+            try:
+                os.unlink(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+    def url(self, name: str) -> str:
+        return self.inner.url(name)
+
+    def upload(self, file_obj: BinaryIO, name: str, content_type: Optional[str] = None, size: Optional[int] = None, chunk_size: Optional[int] = None):
+        self.inner.upload(file_obj, name, content_type=content_type, size=size, chunk_size=chunk_size)
+
+    def stat(self, name: str) -> Optional[BlobInfo]:
+        return self.inner.stat(name)
+
+    def list_blobs(self, prefix: str = "") -> Iterator[BlobInfo]:
+        return self.inner.list_blobs(prefix)
+
+    def iter_range(self, name: str, start: int, end: int, info: Optional[BlobInfo] = None, chunk_size: int = DOWNLOAD_CHUNK_BYTES) -> Iterator[bytes]:
+        info = info or self.inner.stat(name)
+        if info is None:
+            raise FileNotFoundError(name)
+        path = self._cached(info)
+        if path is None:
+            self._fill_in_background(info, chunk_size)
+            yield from self.inner.iter_range(name, start, end, info, chunk_size)
+            return
+        with open(path, "rb") as f:
+            yield from _iter_file_range(f, start, end, chunk_size)
+
+    def download_to_file(self, name: str, file_obj: BinaryIO, info: Optional[BlobInfo] = None, chunk_size: Optional[int] = None):
+        info = info or self.inner.stat(name)
+        if info is None:
+            raise FileNotFoundError(name)
+        path = self._cached(info) or self._fill(info, chunk_size)
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, file_obj, chunk_size or DOWNLOAD_CHUNK_BYTES)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+def build_storage_backend(cached: bool = True) -> StorageBackend:
+    """Backend selected by STORAGE_BACKEND ("gcs" or "local"); remote ones get the disk cache unless cached=False."""
+    if STORAGE_BACKEND == "local":
+        return LocalStorageBackend(LOCAL_STORAGE_DIR)
+    if STORAGE_BACKEND != "gcs":
+        raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND!r}")
+    backend = GCSStorageBackend(BUCKET_NAME)
+    if cached and STORAGE_CACHE_MAX_BYTES > 0:
+        backend = CachedStorageBackend(backend, STORAGE_CACHE_DIR, STORAGE_CACHE_MAX_BYTES)
+    return backend
+
+
+# Shared by every service; the conversion workers build their own from the same settings.
+storage_backend = build_storage_backend()
@@ -0,0 +1,215 @@
+"""
+Benchmark: exact vs. HNSW vector search over KG entities at several table sizes.
+
+Fills a scratch table shaped like ps_kg_entity (entity_type, content_vec vector(768))
+with synthetic clustered vectors, growing it through each of --sizes. At every size
+the partial HNSW indexes of migrations/008_kg_entity_vector_index.sql are built, and
+the three vector searches the services run (ResearchPaper by l2 distance; Paragraph
+and the claim-like types by cosine distance) are timed as a sequential scan and
+through the index at each --ef-search value, with p50/p95 latency and recall@k
+against the exact results. The scratch tables are dropped at the end.
+
+Building HNSW indexes over millions of 768-dimension vectors takes a long time and
+benefits from a large --maintenance-work-mem; use smaller --sizes for a quick run.
+
+Usage (from the backend directory):
+    python -m benchmarks.kg_vector_search_benchmark --sizes 100000,1000000,5000000
+    python -m benchmarks.kg_vector_search_benchmark --sizes 20000 --queries 20
+"""
+import argparse
+import asyncio
+import math
+import random
+import statistics
+import time
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import bindparam, text
+
+from app.config.db_config import AsyncSessionLocal, async_engine
+from app.config.kg_config import EMBEDDING_DIMENSIONS
+
+TABLE = "kg_vector_benchmark_entity"
+CENTER_TABLE = "kg_vector_benchmark_center"
+NOISE_TABLE = "kg_vector_benchmark_noise"
+CENTERS = 256
+NOISE_VECTORS = 4096
+INSERT_CHUNK = 250_000
+
+# Same predicates and operator classes as migration 008.
+INDEXES = {
+    "paper": ("vector_l2_ops", "entity_type = 'ResearchPaper'"),
+    "paragraph": ("vector_cosine_ops", "entity_type = 'Paragraph'"),
+    "claim_like": ("vector_cosine_ops", "entity_type IN ('Claim', 'Methodology', 'Key Concept', 'Result')"),
+}
+DISTANCE_OPERATORS = {"vector_l2_ops": "<->", "vector_cosine_ops": "<=>"}
+
+
+def _unit_vector(dim: int) -> list[float]:
+    vector = [random.gauss(0, 1) for _ in range(dim)]
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector]
+
+
+def _noise(dim: int, scale: float) -> list[float]:
+    return [random.gauss(0, scale / math.sqrt(dim)) for _ in range(dim)]
+
+
+async def _create_tables(dim: int) -> list[list[float]]:
+    """Creates the scratch tables and the cluster centers / noise vectors rows are built from."""
+    centers = [_unit_vector(dim) for _ in range(CENTERS)]
+    vector_type = Vector(dim)
+    async with AsyncSessionLocal() as db:
+        await db.execute(text(f"DROP TABLE IF EXISTS {TABLE}, {CENTER_TABLE}, {NOISE_TABLE}"))
+        await db.execute(text(f"CREATE UNLOGGED TABLE {TABLE} (id BIGINT PRIMARY KEY, entity_type VARCHAR(100), content_vec vector({dim}))"))
+        await db.execute(text(f"CREATE UNLOGGED TABLE {CENTER_TABLE} (id INTEGER PRIMARY KEY, v vector({dim}))"))
+        await db.execute(text(f"CREATE UNLOGGED TABLE {NOISE_TABLE} (id INTEGER PRIMARY KEY, v vector({dim}))"))
+        insert_center = text(f"INSERT INTO {CENTER_TABLE} (id, v) VALUES (:id, :v)").bindparams(bindparam("v", type_=vector_type))
+        insert_noise = text(f"INSERT INTO {NOISE_TABLE} (id, v) VALUES (:id, :v)").bindparams(bindparam("v", type_=vector_type))
+        await db.execute(insert_center, [{"id": i, "v": v} for i, v in enumerate(centers)])
+        await db.execute(insert_noise, [{"id": i, "v": _noise(dim, 0.35)} for i in range(NOISE_VECTORS)])
+        await db.commit()
+    return centers
+
+
+async def _grow_to(start: int, size: int):
+    """
+    Inserts rows [start, size): 5% ResearchPaper, 55% Paragraph, 40% claim-like, each a
+    cluster center plus two noise vectors, generated server-side.
+    """
+    statement = text(f"""
+        INSERT INTO {TABLE} (id, entity_type, content_vec)
+        SELECT g,
+               CASE WHEN g % 20 = 0 THEN 'ResearchPaper'
+                    WHEN g % 20 < 12 THEN 'Paragraph'
+                    ELSE (ARRAY['Claim', 'Methodology', 'Key Concept', 'Result'])[g % 4 + 1] END,
+               c.v + n1.v + n2.v
+        FROM generate_series(CAST(:lo AS BIGINT), CAST(:hi AS BIGINT) - 1) AS g
+        JOIN {CENTER_TABLE} c ON c.id = g % {CENTERS}
+        JOIN {NOISE_TABLE} n1 ON n1.id = (g / {CENTERS}) % {NOISE_VECTORS}
+        JOIN {NOISE_TABLE} n2 ON n2.id = (g * 7919) % {NOISE_VECTORS}
+    """)
+    for lo in range(start, size, INSERT_CHUNK):
+        async with AsyncSessionLocal() as db:
+            await db.execute(statement, {"lo": lo, "hi": min(lo + INSERT_CHUNK, size)})
+            await db.commit()
+
+
+async def _build_indexes(maintenance_work_mem: str) -> float:
+    async with AsyncSessionLocal() as db:
+        start = time.perf_counter()
+        await db.execute(text(f"SET maintenance_work_mem = '{maintenance_work_mem}'"))
+        for name, (opclass, predicate) in INDEXES.items():
+            await db.execute(text(f"DROP INDEX IF EXISTS ix_{TABLE}_{name}"))
+            await db.execute(text(
+                f"CREATE INDEX ix_{TABLE}_{name} ON {TABLE} USING hnsw (content_vec {opclass}) "
+                f"WITH (m = 16, ef_construction = 64) WHERE {predicate}"
+            ))
+        await db.execute(text(f"ANALYZE {TABLE}"))
+        await db.commit()
+        return time.perf_counter() - start
+
+
+def _search_statement(name: str, k: int, dim: int, explain: bool = False):
+    opclass, predicate = INDEXES[name]
+    sql = (
+        f"SELECT id FROM {TABLE} WHERE {predicate} "
+        f"ORDER BY content_vec {DISTANCE_OPERATORS[opclass]} :q LIMIT {k}"
+    )
+    if explain:
+        sql = "EXPLAIN " + sql
+    return text(sql).bindparams(bindparam("q", type_=Vector(dim)))
+
+
+async def _run_query(name: str, query: list[float], k: int, dim: int, ef_search: int | None) -> tuple[list[int], float]:
+    """One search in its own transaction; ef_search None forces the exact sequential scan."""
+    async with AsyncSessionLocal() as db:
+        if ef_search is None:
+            await db.execute(text("SET LOCAL enable_indexscan = off"))
+        else:
+            await db.execute(text("SELECT set_config('hnsw.ef_search', :ef, true)"), {"ef": str(max(ef_search, k))})
+        start = time.perf_counter()
+        result = await db.execute(_search_statement(name, k, dim), {"q": query})
+        ids = list(result.scalars().all())
+        elapsed = time.perf_counter() - start
+        await db.commit()
+    return ids, elapsed
+
+
+async def _uses_index(name: str, query: list[float], k: int, dim: int) -> bool:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(_search_statement(name, k, dim, explain=True), {"q": query})
+        plan = "\n".join(result.scalars().all())
+    return f"ix_{TABLE}_{name}" in plan
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def _measure(centers: list[list[float]], args):
+    queries = [
+        [c + n for c, n in zip(random.choice(centers), _noise(args.dim, 0.5))]
+        for _ in range(args.queries)
+    ]
+    print(f"{'search':<12}{'mode':<16}{'p50 ms':>10}{'p95 ms':>10}{'recall@' + str(args.k):>12}")
+    for name in INDEXES:
+        if not await _uses_index(name, queries[0], args.k, args.dim):
+            print(f"{name:<12}(planner does not use the HNSW index at this size)")
+        exact, exact_times = [], []
+        for query in queries:
+            ids, elapsed = await _run_query(name, query, args.k, args.dim, None)
+            exact.append(set(ids))
+            exact_times.append(elapsed)
+        rows = [("exact (seqscan)", exact_times, 1.0)]
+        for ef_search in args.ef_search:
+            times, recalls = [], []
+            for query, expected in zip(queries, exact):
+                ids, elapsed = await _run_query(name, query, args.k, args.dim, ef_search)
+                times.append(elapsed)
+                recalls.append(len(expected & set(ids)) / len(expected) if expected else 1.0)
+            rows.append((f"ef_search={ef_search}", times, statistics.mean(recalls)))
+        for mode, times, recall in rows:
+            print(
+                f"{name:<12}{mode:<16}{_percentile(times, 0.5) * 1000:>10.2f}"
+                f"{_percentile(times, 0.95) * 1000:>10.2f}{recall:>12.3f}"
+            )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100000,1000000,5000000", help="comma-separated entity counts, ascending")
+    parser.add_argument("--queries", type=int, default=50, help="queries per search and mode")
+    parser.add_argument("--k", type=int, default=10, help="results per query")
+    parser.add_argument("--ef-search", default="40,100,200", help="comma-separated hnsw.ef_search values")
+    parser.add_argument("--dim", type=int, default=EMBEDDING_DIMENSIONS, help="embedding dimension")
+    parser.add_argument("--maintenance-work-mem", default="1GB", help="memory for index builds")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch tables")
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    args.ef_search = [int(ef) for ef in args.ef_search.split(",")]
+
+    async_engine.sync_engine.echo = False
+    random.seed(0)
+    centers = await _create_tables(args.dim)
+    try:
+        rows = 0
+        for size in sizes:
+            start = time.perf_counter()
+            await _grow_to(rows, size)
+            rows = size
+            load_time = time.perf_counter() - start
+            build_time = await _build_indexes(args.maintenance_work_mem)
+            print(f"\n{size} entities (load {load_time:.1f}s, index build {build_time:.1f}s)")
+            await _measure(centers, args)
+    finally:
+        if not args.keep:
+            async with AsyncSessionLocal() as db:
+                await db.execute(text(f"DROP TABLE IF EXISTS {TABLE}, {CENTER_TABLE}, {NOISE_TABLE}"))
+                await db.commit()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+"""
+Benchmark: per-paragraph vs. batched Round 3 extraction.
+
+Runs the Round 3 entity extraction over a corpus of markdown/text files (e.g. docling
+exports of a few papers) in both modes and reports Gemini calls, prompt/output tokens
+and wall time, plus how closely the batched results match the per-paragraph ones:
+micro precision/recall/F1 over (entity_type, relationship_type) pairs and over
+normalized entity names, per paragraph. Nothing is written to the database, and the
+LLM response cache is bypassed so that both modes make real calls.
+
+Usage (from the backend directory):
+    python -m benchmarks.round3_batching_benchmark path/to/corpus --min-type-f1 0.9
+"""
+import argparse
+import asyncio
+import re
+import sys
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from app.config.kg_config import KG_ROUND3_CONCURRENCY
+from app.services.knowledge_graph.kg_llm_cache_service import kg_llm_cache_service
+from app.services.knowledge_graph.knowledge_graph_service import KGService
+
+
+def _load_corpus(corpus_dir: Path) -> list[tuple[str, str]]:
+    """Returns (section_text, file_name) pairs, splitting files on markdown headings."""
+    sections = []
+    for path in sorted(corpus_dir.glob("*")):
+        if path.suffix not in (".md", ".txt"):
+            continue
+        text = path.read_text(encoding="utf-8")
+        for section_text in re.split(r"^#+ .*$", text, flags=re.MULTILINE):
+            if section_text.strip():
+                sections.append((section_text, path.name))
+    return sections
+
+
+def _usage(kg_service: KGService) -> tuple[int, int, int]:
+    helper = kg_service.helper_service
+    return helper.llm_calls, helper.prompt_tokens, helper.output_tokens
+
+
+async def _per_paragraph(kg_service: KGService, paragraphs: list[str]) -> list:
+    semaphore = asyncio.Semaphore(KG_ROUND3_CONCURRENCY)
+
+    async def analyze(para_text: str):
+        async with semaphore:
+            return await kg_service._analyze_paragraph(para_text)
+
+    return list(await asyncio.gather(*(analyze(para_text) for para_text in paragraphs)))
+
+
+async def _batched(kg_service: KGService, jobs: list[tuple[str, uuid.UUID]]) -> tuple[list, int]:
+    """Mirrors _process_round_3_batch without the writes. Returns results in job order and the fallback count."""
+    semaphore = asyncio.Semaphore(KG_ROUND3_CONCURRENCY)
+    fallbacks = 0
+
+    async def analyze(batch: list[tuple[str, uuid.UUID]]):
+        nonlocal fallbacks
+        async with semaphore:
+            para_texts = [para_text for para_text, _ in batch]
+            if len(batch) == 1:
+                return [await kg_service._analyze_paragraph(para_texts[0])]
+            analyses = await kg_service._analyze_paragraph_batch(para_texts)
+            results = []
+            for index, para_text in enumerate(para_texts):
+                if index not in analyses:
+                    fallbacks += 1
+                    results.append(await kg_service._analyze_paragraph(para_text))
+                else:
+                    results.append(analyses[index])
+            return results
+
+    batches = kg_service._batch_paragraph_jobs(jobs)
+    results = await asyncio.gather(*(analyze(batch) for batch in batches))
+    return [analysis for batch_results in results for analysis in batch_results], fallbacks
+
+
+def _features(analysis, kind: str) -> Counter:
+    if not analysis:
+        return Counter()
+    if kind == "type":
+        return Counter((e.entity_type, e.relationship_type) for e in analysis.classified_entities)
+    return Counter(" ".join((e.name or "").lower().split()) for e in analysis.classified_entities)
+
+
+def _f1(reference: list, candidate: list, kind: str) -> tuple[float, float, float]:
+    matched = expected = produced = 0
+    for ref, cand in zip(reference, candidate):
+        ref_features, cand_features = _features(ref, kind), _features(cand, kind)
+        matched += sum((ref_features & cand_features).values())
+        expected += sum(ref_features.values())
+        produced += sum(cand_features.values())
+    precision = matched / produced if produced else 1.0
+    recall = matched / expected if expected else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", type=Path, help="directory of .md/.txt files")
+    parser.add_argument("--min-type-f1", type=float, default=0.0, help="exit non-zero if the type-level F1 is below this")
+    args = parser.parse_args()
+
+    kg_llm_cache_service.enabled = False
+    kg_service = KGService()
+
+    jobs = []  # [(paragraph_text, section_key)], one key per section as Round 2 would assign
+    for section_text, _ in _load_corpus(args.corpus):
+        section_key = uuid.uuid4()
+        jobs.extend((para_text, section_key) for para_text in await kg_service._split_paragraphs(section_text))
+    paragraphs = [para_text for para_text, _ in jobs]
+    if not paragraphs:
+        sys.exit(f"No paragraphs found in {args.corpus}")
+    print(f"corpus: {len(paragraphs)} paragraphs in {len({key for _, key in jobs})} sections")
+
+    start_usage, start = _usage(kg_service), time.perf_counter()
+    reference = await _per_paragraph(kg_service, paragraphs)
+    per_paragraph_time = time.perf_counter() - start
+    mid_usage = _usage(kg_service)
+
+    start = time.perf_counter()
+    candidate, fallbacks = await _batched(kg_service, jobs)
+    batched_time = time.perf_counter() - start
+    end_usage = _usage(kg_service)
+
+    before = [b - a for a, b in zip(start_usage, mid_usage)]
+    after = [b - a for a, b in zip(mid_usage, end_usage)]
+    print(f"{'mode':<15}{'calls':>8}{'prompt tok':>12}{'output tok':>12}{'time':>10}")
+    print(f"{'per-paragraph':<15}{before[0]:>8}{before[1]:>12}{before[2]:>12}{per_paragraph_time:>9.1f}s")
+    print(f"{'batched':<15}{after[0]:>8}{after[1]:>12}{after[2]:>12}{batched_time:>9.1f}s")
+    print(f"batched fallbacks to single-paragraph calls: {fallbacks}")
+
+    type_scores = _f1(reference, candidate, "type")
+    name_scores = _f1(reference, candidate, "name")
+    print("agreement with per-paragraph mode (precision / recall / F1):")
+    print(f"  entity+relationship types: {type_scores[0]:.3f} / {type_scores[1]:.3f} / {type_scores[2]:.3f}")
+    print(f"  entity names:              {name_scores[0]:.3f} / {name_scores[1]:.3f} / {name_scores[2]:.3f}")
+
+    if type_scores[2] < args.min_type_f1:
+        sys.exit(f"type-level F1 {type_scores[2]:.3f} is below --min-type-f1 {args.min_type_f1}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,27 @@
+-- Background KG ingestion jobs with per-file progress (POST /ps/kg/construct).
+
+CREATE TABLE IF NOT EXISTS ps_kg_ingestion_job (
+    guid          UUID PRIMARY KEY,
+    status        VARCHAR(50) NOT NULL DEFAULT 'pending',
+    created_date  TIMESTAMPTZ DEFAULT now(),
+    last_update   TIMESTAMPTZ DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_ps_kg_ingestion_job_status ON ps_kg_ingestion_job (status);
+
+CREATE TABLE IF NOT EXISTS ps_kg_ingestion_job_file (
+    guid              UUID PRIMARY KEY,
+    job_guid          UUID NOT NULL,
+    file_guid         UUID NOT NULL,
+    status            VARCHAR(50) NOT NULL DEFAULT 'pending',
+    current_round     INTEGER DEFAULT 0,
+    paragraphs_done   INTEGER DEFAULT 0,
+    paragraphs_total  INTEGER DEFAULT 0,
+    errors            JSON,
+    started_date      TIMESTAMPTZ,
+    finished_date     TIMESTAMPTZ,
+    created_date      TIMESTAMPTZ DEFAULT now(),
+    last_update       TIMESTAMPTZ DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_ps_kg_ingestion_job_file_job_guid ON ps_kg_ingestion_job_file (job_guid);
+CREATE INDEX IF NOT EXISTS ix_ps_kg_ingestion_job_file_file_guid ON ps_kg_ingestion_job_file (file_guid);
+CREATE INDEX IF NOT EXISTS ix_ps_kg_ingestion_job_file_status ON ps_kg_ingestion_job_file (status);
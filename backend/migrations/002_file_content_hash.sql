@@ -0,0 +1,15 @@
+-- Content-addressed deduplication of uploaded files and KG ingestion.
+
+ALTER TABLE ps_file_item ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+ALTER TABLE ps_file_item ADD COLUMN IF NOT EXISTS kg_file_guid UUID;
+CREATE INDEX IF NOT EXISTS ix_ps_file_item_content_hash ON ps_file_item (content_hash);
+CREATE INDEX IF NOT EXISTS ix_ps_file_item_kg_file_guid ON ps_file_item (kg_file_guid);
+
+-- Files ingested before this migration already own a KG under their own guid.
+UPDATE ps_file_item f
+SET kg_file_guid = f.guid
+WHERE f.kg_file_guid IS NULL
+  AND EXISTS (
+      SELECT 1 FROM ps_kg_entity e
+      WHERE e.file_guid = f.guid AND e.entity_type = 'ResearchPaper'
+  );
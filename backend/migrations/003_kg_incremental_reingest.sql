@@ -0,0 +1,7 @@
+-- Incremental re-ingestion: content fingerprints on KG entities and re-ingest jobs.
+
+ALTER TABLE ps_kg_entity ADD COLUMN IF NOT EXISTS fingerprint VARCHAR(64);
+CREATE INDEX IF NOT EXISTS ix_ps_kg_entity_fingerprint ON ps_kg_entity (fingerprint);
+
+ALTER TABLE ps_kg_ingestion_job_file ADD COLUMN IF NOT EXISTS mode VARCHAR(50) NOT NULL DEFAULT 'construct';
+ALTER TABLE ps_kg_ingestion_job_file ADD COLUMN IF NOT EXISTS previous_file_guid UUID;
@@ -0,0 +1,26 @@
+-- Content-addressed embedding store shared across KG entities.
+
+CREATE TABLE IF NOT EXISTS ps_kg_embedding (
+    content_hash VARCHAR(64) NOT NULL,
+    model_name VARCHAR(100) NOT NULL,
+    content_vec VECTOR,
+    created_date TIMESTAMPTZ DEFAULT now(),
+    PRIMARY KEY (content_hash, model_name)
+);
+
+ALTER TABLE ps_kg_entity ADD COLUMN IF NOT EXISTS embedding_hash VARCHAR(64);
+CREATE INDEX IF NOT EXISTS ix_ps_kg_entity_embedding_hash ON ps_kg_entity (embedding_hash);
+
+-- Key existing entities the same way kg_fingerprint.content_fingerprint does:
+-- SHA-256 of the content with whitespace runs collapsed to one space.
+UPDATE ps_kg_entity
+SET embedding_hash = encode(sha256(convert_to(btrim(regexp_replace(coalesce(content, ''), '\s+', ' ', 'g')), 'UTF8')), 'hex')
+WHERE embedding_hash IS NULL;
+
+-- Seed the store with the vectors already computed.
+INSERT INTO ps_kg_embedding (content_hash, model_name, content_vec)
+SELECT DISTINCT ON (embedding_hash) embedding_hash, 'text-embedding-004', content_vec
+FROM ps_kg_entity
+WHERE embedding_hash IS NOT NULL AND content_vec IS NOT NULL
+ORDER BY embedding_hash
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,17 @@
+-- Entity-resolution index for referenced papers. Populate it (and merge the
+-- duplicate ResearchPaper entities created before it existed) with:
+--   python -m scripts.merge_duplicate_papers
+
+CREATE TABLE IF NOT EXISTS ps_kg_paper_index (
+    paper_guid UUID PRIMARY KEY,
+    file_guid UUID,
+    norm_title TEXT NOT NULL,
+    first_author VARCHAR(255),
+    year INTEGER,
+    author_year_key VARCHAR(300),
+    title_key VARCHAR(300),
+    created_date TIMESTAMPTZ DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_ps_kg_paper_index_file_guid ON ps_kg_paper_index (file_guid);
+CREATE INDEX IF NOT EXISTS ix_ps_kg_paper_index_author_year_key ON ps_kg_paper_index (author_year_key);
+CREATE INDEX IF NOT EXISTS ix_ps_kg_paper_index_title_key ON ps_kg_paper_index (title_key);
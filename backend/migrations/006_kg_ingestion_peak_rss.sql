@@ -0,0 +1,3 @@
+-- Peak RSS of the conversion worker, recorded per ingested file.
+
+ALTER TABLE ps_kg_ingestion_job_file ADD COLUMN IF NOT EXISTS peak_rss_bytes BIGINT;
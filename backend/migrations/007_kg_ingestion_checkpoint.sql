@@ -0,0 +1,12 @@
+-- Checkpoints for resumable KG construction.
+
+CREATE TABLE IF NOT EXISTS ps_kg_ingestion_checkpoint (
+    file_guid UUID PRIMARY KEY,
+    content_hash VARCHAR(64),
+    paper_guid UUID,
+    rounds_completed INTEGER DEFAULT 0,
+    sections_completed INTEGER DEFAULT 0,
+    paragraphs_completed INTEGER DEFAULT 0,
+    created_date TIMESTAMPTZ DEFAULT now(),
+    last_update TIMESTAMPTZ DEFAULT now()
+);
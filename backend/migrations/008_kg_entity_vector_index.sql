@@ -0,0 +1,37 @@
+-- Fixed-dimension entity embeddings and HNSW indexes for vector search.
+--
+-- pgvector can only index a column with a declared dimension; text-embedding-004
+-- vectors have 768. Vectors of any other size (none are written by the current
+-- pipeline) cannot be cast and are cleared first.
+--
+-- Indexes are partial, one per group of entity types searched together, and use the
+-- distance each search orders by:
+--   ResearchPaper                            l2      (KGSearchService paper search)
+--   Paragraph                                cosine  (KGCitationSearchService seeds)
+--   Claim, Methodology, Key Concept, Result  cosine  (KGCitationSearchService seeds)
+-- The Paragraph search of search_and_explain (l2, restricted to a few files) is
+-- served by the file_guid index instead.
+--
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction: apply this file with
+-- plain `psql -f` (no --single-transaction). Building the indexes on a large table
+-- is much faster with a higher maintenance_work_mem, e.g. SET maintenance_work_mem = '2GB'.
+
+UPDATE ps_kg_entity
+SET content_vec = NULL
+WHERE content_vec IS NOT NULL AND vector_dims(content_vec) <> 768;
+
+ALTER TABLE ps_kg_entity ALTER COLUMN content_vec TYPE vector(768);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ps_kg_entity_vec_research_paper
+    ON ps_kg_entity USING hnsw (content_vec vector_l2_ops) WITH (m = 16, ef_construction = 64)
+    WHERE entity_type = 'ResearchPaper';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ps_kg_entity_vec_paragraph
+    ON ps_kg_entity USING hnsw (content_vec vector_cosine_ops) WITH (m = 16, ef_construction = 64)
+    WHERE entity_type = 'Paragraph';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ps_kg_entity_vec_claim_like
+    ON ps_kg_entity USING hnsw (content_vec vector_cosine_ops) WITH (m = 16, ef_construction = 64)
+    WHERE entity_type IN ('Claim', 'Methodology', 'Key Concept', 'Result');
+
+ANALYZE ps_kg_entity;
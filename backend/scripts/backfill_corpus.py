@@ -0,0 +1,286 @@
+"""
+Bulk KG ingestion of a corpus of PDFs, for seeding a deployment.
+
+Reads PDFs from a local directory (--dir; each file is uploaded to storage first) or
+from a prefix of the configured storage backend (--prefix; objects already uploaded,
+e.g. copied into the bucket with gsutil). Every file goes through the same
+KGService.construct_kg_for_file as the API: docling conversion in the process pool,
+LLM and embedding calls admitted by the shared Vertex AI rate limiters, and entities
+written in bulk by KGBulkWriter. Several files are ingested at once (--concurrency),
+so the rate limiters, not the file order, set the pace.
+
+Runs can be restarted: files already in the KG are skipped, a file whose content was
+ingested under another name is linked to that KG, and an interrupted construction
+resumes from its last checkpoint.
+
+--shard i/N keeps the files whose name hashes to i modulo N, so N machines given the
+same corpus split it between them without coordinating.
+
+Usage (from the backend directory):
+    python -m scripts.backfill_corpus --dir ~/papers --concurrency 16
+    python -m scripts.backfill_corpus --prefix corpus/ --shard 0/4
+    python -m scripts.backfill_corpus --prefix corpus/ --shard 1/4 --dry-run
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+from app.config.db_config import AsyncSessionLocal, async_engine
+from app.config.kg_config import KG_CONVERSION_WORKERS
+from app.models.file.ps_file_item import PSFileItemCreate, PSFileItemDB
+from app.services.file_upload.file_upload_service import FileUploadService
+from app.services.knowledge_graph.kg_conversion_service import kg_conversion_service
+from app.services.knowledge_graph.kg_ingestion_progress import KGIngestionProgress
+from app.services.knowledge_graph.knowledge_graph_service import KGService
+from app.services.storage.storage_backend import storage_backend
+
+PDF_MIME_TYPE = "application/pdf"
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+class CorpusFile:
+    """One PDF of the corpus: its object name in storage and, for --dir, its local path."""
+
+    def __init__(self, name: str, path: Optional[Path] = None, content_type: Optional[str] = None):
+        self.name = name
+        self.path = path
+        self.content_type = content_type or PDF_MIME_TYPE
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {value!r}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be in [0, N), got {value!r}")
+    return index, count
+
+
+def in_shard(name: str, index: int, count: int) -> bool:
+    """Stable across machines and runs, unlike hash()."""
+    digest = hashlib.sha1(name.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count == index
+
+
+def _list_directory(root: Path, object_prefix: str) -> list[CorpusFile]:
+    files = []
+    for path in sorted(root.rglob("*")):
+        if path.is_file() and path.suffix.lower() == ".pdf" and not path.name.startswith("."):
+            files.append(CorpusFile(object_prefix + path.relative_to(root).as_posix(), path))
+    return files
+
+
+def _list_prefix(prefix: str) -> list[CorpusFile]:
+    return [
+        CorpusFile(info.name, content_type=info.content_type)
+        for info in storage_backend.list_blobs(prefix)
+        if info.name.lower().endswith(".pdf")
+    ]
+
+
+def _sha256_file(path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+class BackfillStats:
+    """Counters shared by the workers, printed as a progress line."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.ingested = 0
+        self.skipped = 0
+        self.failed = 0
+        self.paragraphs = 0
+        self.in_flight = 0
+        self.failures: list[tuple[str, str]] = []
+        self.start = time.monotonic()
+
+    @property
+    def finished(self) -> int:
+        return self.ingested + self.skipped + self.failed
+
+    def line(self) -> str:
+        elapsed = time.monotonic() - self.start
+        # Skipped files take no time, so only processed files count towards the rate.
+        processed = self.ingested + self.failed
+        files_per_hour = processed / elapsed * 3600 if elapsed else 0.0
+        remaining = self.total - self.finished
+        eta = _format_duration(remaining / (processed / elapsed)) if processed else "?"
+        return (
+            f"[{_format_duration(elapsed)}] {self.finished}/{self.total} files "
+            f"(ingested {self.ingested}, skipped {self.skipped}, failed {self.failed}, running {self.in_flight}) | "
+            f"{files_per_hour:.1f} files/h, {self.paragraphs / elapsed if elapsed else 0.0:.1f} paragraphs/s | "
+            f"ETA {eta}"
+        )
+
+
+class BackfillProgress(KGIngestionProgress):
+    """Feeds one file's paragraph count and errors into the shared stats."""
+
+    def __init__(self, stats: BackfillStats, name: str):
+        self.stats = stats
+        self.name = name
+        self.last_error: Optional[str] = None
+
+    async def paragraph_done(self):
+        self.stats.paragraphs += 1
+
+    async def add_error(self, message: str):
+        self.last_error = message
+        print(f"{self.name}: {message}")
+
+
+class CorpusBackfill:
+
+    def __init__(self, stats: BackfillStats):
+        self.stats = stats
+        self.file_upload_service = FileUploadService()
+        self.kg_service = KGService()
+
+    async def _register(self, corpus_file: CorpusFile, db) -> PSFileItemDB:
+        """Returns the file record for a corpus file, uploading and creating it when needed."""
+        if corpus_file.path is None:
+            existing = await self.file_upload_service.get_file_by_name(db, corpus_file.name)
+            if existing:
+                return existing
+            record = PSFileItemCreate(
+                file_name=corpus_file.name,
+                file_url=storage_backend.url(corpus_file.name),
+                mime_type=corpus_file.content_type
+            )
+        else:
+            # Hashing first makes a re-run skip the upload of files it already has.
+            content_hash = await asyncio.to_thread(_sha256_file, corpus_file.path)
+            existing = await self.file_upload_service.get_file_by_hash(db, content_hash)
+            if existing:
+                return existing
+            record = await self.file_upload_service.upload_path(str(corpus_file.path), corpus_file.name, corpus_file.content_type)
+        return await self.file_upload_service.create_file_upload_record(db, record)
+
+    async def ingest(self, corpus_file: CorpusFile):
+        progress = BackfillProgress(self.stats, corpus_file.name)
+        async with AsyncSessionLocal() as db:
+            try:
+                file_item = await self._register(corpus_file, db)
+                if file_item.kg_file_guid:
+                    self.stats.skipped += 1
+                    return
+                self.stats.in_flight += 1
+                try:
+                    succeeded = await self.kg_service.construct_kg_for_file(file_item.guid, db, progress)
+                finally:
+                    self.stats.in_flight -= 1
+            except Exception as e:
+                await db.rollback()
+                await progress.add_error(str(e))
+                succeeded = False
+
+        if succeeded:
+            self.stats.ingested += 1
+        else:
+            self.stats.failed += 1
+            self.stats.failures.append((corpus_file.name, progress.last_error or "construction failed"))
+
+    async def run(self, files: list[CorpusFile], concurrency: int):
+        queue: asyncio.Queue = asyncio.Queue()
+        for corpus_file in files:
+            queue.put_nowait(corpus_file)
+
+        async def worker():
+            while True:
+                try:
+                    corpus_file = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await self.ingest(corpus_file)
+
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+
+
+async def _report(stats: BackfillStats, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        print(stats.line(), flush=True)
+
+
+def _init_vertexai():
+    project, region = os.getenv("GCP_PROJECT_ID"), os.getenv("GCP_REGION")
+    if project and region:
+        import vertexai
+        vertexai.init(project=project, location=region)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dir", type=Path, help="local directory searched recursively for PDFs")
+    source.add_argument("--prefix", help="object name prefix in the configured storage backend")
+    parser.add_argument("--object-prefix", default="", help="with --dir: prefix for the uploaded object names")
+    parser.add_argument("--shard", type=parse_shard, default=(0, 1), help="process shard i of N (e.g. 0/4)")
+    parser.add_argument("--concurrency", type=int, default=8, help="files ingested at the same time")
+    parser.add_argument("--conversion-workers", type=int, default=KG_CONVERSION_WORKERS, help="docling conversion processes")
+    parser.add_argument("--limit", type=int, help="stop after this many files of the shard")
+    parser.add_argument("--progress-interval", type=float, default=30.0, help="seconds between progress lines")
+    parser.add_argument("--dry-run", action="store_true", help="list the shard's files without ingesting them")
+    args = parser.parse_args()
+
+    if args.dir is not None:
+        if not args.dir.is_dir():
+            sys.exit(f"Not a directory: {args.dir}")
+        files = _list_directory(args.dir, args.object_prefix)
+    else:
+        files = await asyncio.to_thread(_list_prefix, args.prefix)
+    total = len(files)
+    index, count = args.shard
+    files = [f for f in files if in_shard(f.name, index, count)]
+    if args.limit is not None:
+        files = files[:args.limit]
+    print(f"Shard {index}/{count}: {len(files)} of {total} PDF(s).")
+
+    if args.dry_run:
+        for corpus_file in files:
+            print(corpus_file.name)
+        return
+    if not files:
+        return
+
+    _init_vertexai()
+    async_engine.sync_engine.echo = False
+    kg_conversion_service.max_workers = args.conversion_workers
+    await kg_conversion_service.start()
+
+    stats = BackfillStats(len(files))
+    reporter = asyncio.create_task(_report(stats, args.progress_interval))
+    try:
+        await CorpusBackfill(stats).run(files, args.concurrency)
+    finally:
+        reporter.cancel()
+        kg_conversion_service.shutdown()
+        await async_engine.dispose()
+
+    print(stats.line())
+    for name, error in stats.failures:
+        print(f"FAILED {name}: {error}")
+    if stats.failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+"""
+One-off backfill: merge duplicate ResearchPaper entities and rebuild the paper index.
+
+Before the resolution index existed, every citation created its own ResearchPaper
+entity. This job parses every ResearchPaper, groups them with the same blocking keys
+and trigram matching used at ingestion time, re-points the duplicates' relationships
+at one canonical entity per paper (an ingested file's paper where there is one) and
+deletes the rest. ps_kg_paper_index is then rebuilt from the surviving papers.
+
+Usage (from the backend directory):
+    python -m scripts.merge_duplicate_papers --dry-run
+    python -m scripts.merge_duplicate_papers
+"""
+import argparse
+import asyncio
+from collections import defaultdict
+
+from sqlalchemy import select, delete, insert
+
+from app.config.db_config import AsyncSessionLocal, async_engine
+from app.models.knowledge_graph.ps_kg_entity import PSKgEntityDB
+from app.models.knowledge_graph.ps_kg_paper_index import PSKgPaperIndexDB
+from app.services.knowledge_graph.kg_paper_resolver import PaperKey, match_score, merge_papers
+
+# Blocks larger than this (e.g. a very common surname with no year) are only
+# compared within their other blocking key, to keep the pairwise pass bounded.
+MAX_BLOCK_SIZE = 500
+
+
+def _cluster(keys: dict) -> list[list]:
+    """Union-find over papers that share a blocking key and match."""
+    parent = {guid: guid for guid in keys}
+
+    def find(guid):
+        while parent[guid] != guid:
+            parent[guid] = parent[parent[guid]]
+            guid = parent[guid]
+        return guid
+
+    blocks = defaultdict(list)
+    for guid, key in keys.items():
+        if not key.norm_title:
+            continue
+        blocks[("title", key.title_key)].append(guid)
+        if key.author_year_key:
+            blocks[("author_year", key.author_year_key)].append(guid)
+
+    for members in blocks.values():
+        if len(members) < 2 or len(members) > MAX_BLOCK_SIZE:
+            continue
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                if find(a) != find(b) and match_score(keys[a], keys[b]) > 0:
+                    parent[find(a)] = find(b)
+
+    clusters = defaultdict(list)
+    for guid in keys:
+        clusters[find(guid)].append(guid)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="report the merges without writing them")
+    args = parser.parse_args()
+
+    async_engine.sync_engine.echo = False
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(PSKgEntityDB.guid, PSKgEntityDB.file_guid, PSKgEntityDB.content, PSKgEntityDB.name)
+            .where(PSKgEntityDB.entity_type == "ResearchPaper")
+        )
+        papers = result.all()
+        keys = {row.guid: PaperKey.from_content(row.content, row.name) for row in papers}
+        file_guids = {row.guid: row.file_guid for row in papers}
+        print(f"Loaded {len(papers)} ResearchPaper entities.")
+
+        merged = 0
+        for members in _cluster(keys):
+            ingested = [guid for guid in members if file_guids[guid]]
+            canonical = ingested[0] if ingested else members[0]
+            # Papers of distinct ingested files keep their own entities.
+            duplicates = [guid for guid in members if guid != canonical and not file_guids[guid]]
+            if not duplicates:
+                continue
+            print(f"{keys[canonical].norm_title!r}: merging {len(duplicates)} duplicate(s) into {canonical}")
+            merged += len(duplicates)
+            if not args.dry_run:
+                await merge_papers(canonical, duplicates, db.execute)
+                for guid in duplicates:
+                    del keys[guid]
+
+        if args.dry_run:
+            print(f"Dry run: {merged} duplicate paper entities would be merged.")
+            await db.rollback()
+        else:
+            await db.execute(delete(PSKgPaperIndexDB))
+            rows = [
+                {
+                    "paper_guid": guid,
+                    "file_guid": file_guids[guid],
+                    "norm_title": key.norm_title,
+                    "first_author": key.first_author,
+                    "year": key.year,
+                    "author_year_key": key.author_year_key,
+                    "title_key": key.title_key,
+                }
+                for guid, key in keys.items() if key.norm_title
+            ]
+            if rows:
+                await db.execute(insert(PSKgPaperIndexDB), rows)
+            await db.commit()
+            print(f"Merged {merged} duplicate paper entities; indexed {len(rows)} papers.")
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+Job status built from the persisted job and job file rows.
+
+Run from the backend directory with `python -m unittest discover tests`.
+"""
+import uuid
+import unittest
+from datetime import datetime, timezone
+from app.models.knowledge_graph.ps_kg_ingestion_job import PSKgIngestionJobDB, PSKgIngestionJobFileDB
+from app.services.knowledge_graph.kg_ingestion_job_service import KGIngestionJobService
+
+
+class FakeResult:
+    def __init__(self, rows: list):
+        self._rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return list(self._rows)
+
+
+class FakeSession:
+    """Serves one job and its file rows the way AsyncSession.get / execute would."""
+
+    def __init__(self, job: PSKgIngestionJobDB, files: list[PSKgIngestionJobFileDB]):
+        self.job = job
+        self.files = files
+
+    async def get(self, model, guid):
+        return self.job if model is PSKgIngestionJobDB and guid == self.job.guid else None
+
+    async def execute(self, statement):
+        return FakeResult(self.files)
+
+
+class GetJobTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        # get_job only reads through the session; skip building KGService.
+        self.service = KGIngestionJobService.__new__(KGIngestionJobService)
+
+    async def test_job_status_is_built_from_db_rows(self):
+        now = datetime.now(timezone.utc)
+        job = PSKgIngestionJobDB(guid=uuid.uuid4(), status="running", created_date=now, last_update=now)
+        done = PSKgIngestionJobFileDB(
+            guid=uuid.uuid4(), job_guid=job.guid, file_guid=uuid.uuid4(), mode="construct",
+            status="completed", current_round=3, paragraphs_done=12, paragraphs_total=12,
+            errors=[], peak_rss_bytes=512 * 2**20, started_date=now, finished_date=now
+        )
+        failed = PSKgIngestionJobFileDB(
+            guid=uuid.uuid4(), job_guid=job.guid, file_guid=uuid.uuid4(), mode="reingest",
+            previous_file_guid=uuid.uuid4(), status="failed", current_round=2,
+            paragraphs_done=3, paragraphs_total=9, errors=["Round 3: timeout"]
+        )
+
+        status = await self.service.get_job(FakeSession(job, [done, failed]), job.guid)
+
+        self.assertEqual(status.guid, job.guid)
+        self.assertEqual(status.status, "running")
+        self.assertEqual([f.guid for f in status.files], [done.guid, failed.guid])
+        self.assertEqual(status.files[0].paragraphs_done, 12)
+        self.assertEqual(status.files[0].peak_rss_bytes, 512 * 2**20)
+        self.assertEqual(status.files[1].previous_file_guid, failed.previous_file_guid)
+        self.assertEqual(status.files[1].errors, ["Round 3: timeout"])
+
+    async def test_unknown_job_returns_none(self):
+        now = datetime.now(timezone.utc)
+        job = PSKgIngestionJobDB(guid=uuid.uuid4(), status="pending", created_date=now, last_update=now)
+
+        self.assertIsNone(await self.service.get_job(FakeSession(job, []), uuid.uuid4()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+"""
+Tiered LLM response cache: promotion from the SQLite tier into memory.
+
+Run from the backend directory with `python -m unittest discover tests`.
+"""
+import os
+import time
+import tempfile
+import unittest
+from unittest.mock import patch
+from app.services.knowledge_graph import kg_llm_cache_service as cache_module
+from app.services.knowledge_graph.kg_llm_cache_service import InMemoryLRUCache, KGLLMCacheService, SQLiteLLMCache
+
+
+class PromotionTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.memory = InMemoryLRUCache(max_entries=8, ttl_seconds=100)
+        self.sqlite = SQLiteLLMCache(os.path.join(directory.name, "llm.sqlite3"), max_entries=8, ttl_seconds=100)
+        self.addCleanup(self.sqlite._conn.close)
+        self.cache = KGLLMCacheService([self.memory, self.sqlite])
+
+    async def test_promoted_entry_keeps_its_remaining_ttl(self):
+        created_at = time.time() - 90
+        await self.sqlite.set("key", "response", created_at)
+
+        self.assertEqual(await self.cache.get("key"), "response")
+        self.assertEqual(await self.memory.get_entry("key"), ("response", created_at))
+
+        # 20s later the SQLite row is past its TTL, and so is the promoted copy.
+        with patch.object(cache_module.time, "time", return_value=created_at + 110):
+            self.assertIsNone(await self.cache.get("key"))
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    async def test_new_entries_start_a_fresh_ttl(self):
+        before = time.time()
+        await self.cache.set("key", "response")
+
+        value, created_at = await self.memory.get_entry("key")
+        self.assertEqual(value, "response")
+        self.assertGreaterEqual(created_at, before)
+        self.assertGreaterEqual((await self.sqlite.get_entry("key"))[1], before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Search query embedding cache: normalization, single-flight and cancellation.
+
+Run from the backend directory with `python -m unittest discover tests`.
+"""
+import asyncio
+import unittest
+from unittest.mock import patch
+from app.services.knowledge_graph import kg_query_embedding_cache as cache_module
+from app.services.knowledge_graph.kg_query_embedding_cache import KGQueryEmbeddingCache
+
+
+class GatedEmbedder:
+    """Stands in for kg_embedding_service; every call blocks until `release` is set."""
+
+    def __init__(self):
+        self.calls: list[str] = []
+        self.release = asyncio.Event()
+
+    async def embed(self, text: str) -> list[float]:
+        self.calls.append(text)
+        await self.release.wait()
+        return [float(len(text))]
+
+
+class QueryEmbeddingCacheTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.embedder = GatedEmbedder()
+        patcher = patch.object(cache_module, "kg_embedding_service", self.embedder)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = KGQueryEmbeddingCache(max_entries=8, ttl_seconds=60)
+
+    async def test_equivalent_queries_share_one_call(self):
+        self.embedder.release.set()
+        first = await self.cache.embed("attention  is all\tyou need")
+        second = await self.cache.embed(" attention is all you need ")
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.embedder.calls, ["attention is all you need"])
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    async def test_concurrent_queries_wait_for_the_leader(self):
+        leader = asyncio.create_task(self.cache.embed("query"))
+        waiter = asyncio.create_task(self.cache.embed("query"))
+        await asyncio.sleep(0)
+        self.embedder.release.set()
+
+        self.assertEqual(await asyncio.gather(leader, waiter), [[5.0], [5.0]])
+        self.assertEqual(len(self.embedder.calls), 1)
+
+    async def test_waiter_takes_over_when_the_leader_is_cancelled(self):
+        leader = asyncio.create_task(self.cache.embed("query"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(self.cache.embed("query"))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+        self.embedder.release.set()
+
+        self.assertEqual(await asyncio.wait_for(waiter, timeout=1), [5.0])
+        self.assertEqual(len(self.embedder.calls), 2)
+        self.assertEqual(self.cache._inflight, {})
+
+    async def test_cancelled_waiter_does_not_cancel_the_leader(self):
+        leader = asyncio.create_task(self.cache.embed("query"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(self.cache.embed("query"))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        self.embedder.release.set()
+
+        self.assertEqual(await asyncio.wait_for(leader, timeout=1), [5.0])
+        self.assertEqual(len(self.embedder.calls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
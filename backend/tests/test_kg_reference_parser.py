@@ -0,0 +1,108 @@
+"""
+Rule-based reference parsing across the common bibliography styles.
+
+Run from the backend directory with `python -m unittest discover tests`.
+"""
+import unittest
+from app.services.knowledge_graph.kg_reference_parser import parse_reference
+
+
+class ParseReferenceTest(unittest.TestCase):
+    def assertParsed(self, entry: str, title: str, authors: list[str], year: int):
+        details = parse_reference(entry)
+        self.assertIsNotNone(details, entry)
+        self.assertEqual(details.title, title)
+        self.assertEqual(details.authors, authors)
+        self.assertEqual(details.year, year)
+        return details
+
+    def test_acl(self):
+        self.assertParsed(
+            "Ashish Vaswani, Noam Shazeer, Niki Parmar, and Jakob Uszkoreit. 2017. Attention is all you need. "
+            "In Advances in Neural Information Processing Systems, pages 5998–6008.",
+            "Attention is all you need",
+            ["Ashish Vaswani", "Noam Shazeer", "Niki Parmar", "Jakob Uszkoreit"],
+            2017,
+        )
+
+    def test_ieee(self):
+        details = self.assertParsed(
+            "[1] A. Vaswani, N. Shazeer, and N. Parmar, \"Attention is all you need,\" in Proc. NeurIPS, 2017, pp. 5998–6008.",
+            "Attention is all you need",
+            ["A. Vaswani", "N. Shazeer", "N. Parmar"],
+            2017,
+        )
+        self.assertEqual(details.publication_venue, "Proc. NeurIPS, 2017, pp. 5998–6008")
+
+    def test_apa(self):
+        self.assertParsed(
+            "Vaswani, A., Shazeer, N., & Parmar, N. (2017). Attention is all you need. "
+            "Advances in Neural Information Processing Systems, 30, 5998–6008.",
+            "Attention is all you need",
+            ["Vaswani, A.", "Shazeer, N.", "Parmar, N."],
+            2017,
+        )
+
+    def test_vancouver(self):
+        self.assertParsed(
+            "1. Vaswani A, Shazeer N, Parmar N. Attention is all you need. Adv Neural Inf Process Syst. 2017;30:5998-6008.",
+            "Attention is all you need",
+            ["Vaswani A", "Shazeer N", "Parmar N"],
+            2017,
+        )
+
+    def test_icml_title_after_single_initial(self):
+        details = self.assertParsed(
+            "Smith, J. Deep nets for graphs. In ICML, 2020.",
+            "Deep nets for graphs",
+            ["Smith, J."],
+            2020,
+        )
+        self.assertEqual(details.publication_venue, "ICML, 2020")
+
+    def test_icml_title_after_two_initials(self):
+        self.assertParsed(
+            "Kingma, D. P. and Ba, J. Adam: A method for stochastic optimization. In ICLR, 2015.",
+            "Adam: A method for stochastic optimization",
+            ["Kingma, D. P.", "Ba, J."],
+            2015,
+        )
+
+    def test_neurips_title_after_hyphenated_initials(self):
+        self.assertParsed(
+            "Devlin, J., Chang, M.-W., Lee, K., and Toutanova, K. BERT: Pre-training of deep bidirectional "
+            "transformers for language understanding. In NAACL, 2019.",
+            "BERT: Pre-training of deep bidirectional transformers for language understanding",
+            ["Devlin, J.", "Chang, M.-W.", "Lee, K.", "Toutanova, K."],
+            2019,
+        )
+
+    def test_et_al_and_arxiv_venue(self):
+        details = self.assertParsed(
+            "Brown, T. B. et al. Language models are few-shot learners. arXiv preprint arXiv:2005.14165, 2020.",
+            "Language models are few-shot learners",
+            ["Brown, T. B."],
+            2020,
+        )
+        self.assertEqual(details.publication_venue, "arXiv preprint arXiv:2005.14165, 2020")
+
+    def test_papers_from_one_venue_keep_their_own_titles(self):
+        first = parse_reference("Smith, J. Deep nets for graphs. In ICML, 2020.")
+        second = parse_reference("Doe, A. Sparse attention at scale. In ICML, 2020.")
+
+        self.assertNotEqual(first.title, second.title)
+
+    def test_venue_as_title_is_left_to_the_llm(self):
+        for entry in [
+            "Smith, J. In ICML, 2020.",
+            "Jacob Devlin and Ming-Wei Chang. In NAACL, 2019.",
+            "Doe, J. Proceedings of the Workshop on Graph Learning. 2019.",
+            "Doe, J. arXiv preprint arXiv:2005.14165, 2020.",
+            "Jane Doe. 2021. NeurIPS 2021. Curran Associates.",
+        ]:
+            with self.subTest(entry=entry):
+                self.assertIsNone(parse_reference(entry))
+
+
+if __name__ == "__main__":
+    unittest.main()
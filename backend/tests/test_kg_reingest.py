@@ -0,0 +1,94 @@
+"""
+Entity retirement during incremental re-ingestion.
+
+Run from the backend directory with `python -m unittest discover tests`.
+"""
+import uuid
+import unittest
+from sqlalchemy.sql import Delete, Select
+from app.models.knowledge_graph.ps_kg_entity import PSKgEntityDB
+from app.models.knowledge_graph.ps_kg_relationship import PSKgRelationshipDB
+from app.services.knowledge_graph.knowledge_graph_service import KGService
+
+
+class FakeResult:
+    def __init__(self, rows: list, rowcount: int = 0):
+        self._rows = rows
+        self.rowcount = rowcount
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return list(self._rows)
+
+
+class GraphWriter:
+    """
+    Stands in for KGBulkWriter over an in-memory graph. Relationship lookups are
+    answered from the statement's bound parameters: guid lists select sources, a
+    string selects the relationship type. Deletes are recorded.
+    """
+
+    def __init__(self, relationships: list[tuple[uuid.UUID, uuid.UUID, str]]):
+        self.relationships = relationships
+        self.deleted_entities: set[uuid.UUID] = set()
+        self.deleted_relationships_touching: set[uuid.UUID] = set()
+
+    async def execute(self, statement):
+        params = statement.compile().params
+        guids = {guid for value in params.values() if isinstance(value, (list, tuple, set)) for guid in value}
+        if isinstance(statement, Select):
+            types = {value for value in params.values() if isinstance(value, str)}
+            targets = [
+                target for source, target, rel_type in self.relationships
+                if source in guids and (not types or rel_type in types)
+            ]
+            return FakeResult(targets)
+        if isinstance(statement, Delete) and statement.table.name == PSKgRelationshipDB.__tablename__:
+            self.deleted_relationships_touching |= guids
+            return FakeResult([])
+        if isinstance(statement, Delete) and statement.table.name == PSKgEntityDB.__tablename__:
+            self.deleted_entities |= guids
+            return FakeResult([], rowcount=len(guids))
+        raise AssertionError(f"unexpected statement: {statement}")
+
+
+class RetireEntitiesTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        # _retire_entities only touches the writer; skip the Vertex AI clients.
+        self.service = KGService.__new__(KGService)
+
+    async def test_changed_references_section_retires_its_citations(self):
+        references, citation, cited_paper = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        writer = GraphWriter([
+            (references, citation, "CONTAINS_REFERENCE"),
+            (citation, cited_paper, "REFERENCES"),
+        ])
+
+        await self.service._retire_entities([], [references], writer)
+
+        self.assertIn(citation, writer.deleted_entities)
+        self.assertIn(citation, writer.deleted_relationships_touching)
+        self.assertNotIn(cited_paper, writer.deleted_entities)
+
+    async def test_retired_section_keeps_its_paragraphs_for_relinking(self):
+        section, paragraph = uuid.uuid4(), uuid.uuid4()
+        writer = GraphWriter([(section, paragraph, "CONTAINS_PARAGRAPH")])
+
+        await self.service._retire_entities([], [section], writer)
+
+        self.assertEqual(writer.deleted_entities, {section})
+
+    async def test_orphaned_citations_are_retired_with_their_references(self):
+        citation, cited_paper = uuid.uuid4(), uuid.uuid4()
+        writer = GraphWriter([(citation, cited_paper, "REFERENCES")])
+
+        await self.service._retire_entities([], [], writer, [citation])
+
+        self.assertEqual(writer.deleted_entities, {citation})
+        self.assertIn(citation, writer.deleted_relationships_touching)
+
+
+if __name__ == "__main__":
+    unittest.main()
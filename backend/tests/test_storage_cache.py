@@ -0,0 +1,53 @@
+"""
+On-disk blob cache in front of a remote storage backend.
+
+Run from the backend directory with `python -m unittest discover tests`.
+"""
+import io
+import tempfile
+import unittest
+from app.services.storage.storage_backend import CachedStorageBackend, LocalStorageBackend
+
+
+class RecordingBackend(LocalStorageBackend):
+    """A local backend that records the chunk size of every full download."""
+
+    def __init__(self, root: str):
+        super().__init__(root)
+        self.downloads: list[int] = []
+
+    def download_to_file(self, name, file_obj, info=None, chunk_size=None):
+        self.downloads.append(chunk_size)
+        super().download_to_file(name, file_obj, info, chunk_size)
+
+
+class CachedStorageBackendTest(unittest.TestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.addCleanup(cache_dir.cleanup)
+        self.inner = RecordingBackend(root.name)
+        self.inner.upload(io.BytesIO(b"%PDF-1.7 paper"), "paper.pdf")
+        self.cache = CachedStorageBackend(self.inner, cache_dir.name, max_bytes=1024)
+
+    def test_fill_downloads_in_the_requested_chunks(self):
+        out = io.BytesIO()
+        self.cache.download_to_file("paper.pdf", out, chunk_size=256 * 1024)
+
+        self.assertEqual(out.getvalue(), b"%PDF-1.7 paper")
+        self.assertEqual(self.inner.downloads, [256 * 1024])
+
+    def test_second_download_is_served_from_disk(self):
+        info = self.cache.stat("paper.pdf")
+        self.cache.download_to_file("paper.pdf", io.BytesIO(), info)
+        out = io.BytesIO()
+        self.cache.download_to_file("paper.pdf", out, info)
+
+        self.assertEqual(out.getvalue(), b"%PDF-1.7 paper")
+        self.assertEqual(len(self.inner.downloads), 1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()